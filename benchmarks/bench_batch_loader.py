@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Throughput, in files per second, of loading a folder of annotation files:
+PascalVocReader.getShapes() file by file against batchLoader in one
+process and in a process pool.
+
+Usage: python benchmarks/bench_batch_loader.py [files] [objects per file]
+"""
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+from pascal_voc_io import PascalVocReader, PascalVocWriter
+from batchLoader import findAnnotations, loadAnnotations
+
+DEFAULT_FILES = 2000
+DEFAULT_OBJECTS = 30
+
+
+def makeFiles(folder, files, objects):
+    rng = random.Random(0)
+    for n in range(files):
+        writer = PascalVocWriter('imgs', 'img%05d' % n, (1080, 1920, 3),
+                                 localImgPath='imgs/img%05d.jpg' % n)
+        for _ in range(objects):
+            writer.addRotatedBndBox(round(rng.uniform(0, 1920), 4),
+                                    round(rng.uniform(0, 1080), 4),
+                                    round(rng.uniform(5, 200), 4),
+                                    round(rng.uniform(5, 200), 4),
+                                    round(rng.uniform(0, math.pi), 6),
+                                    rng.choice(['car', 'ship', 'plane']), 0)
+        writer.save(os.path.join(folder, 'img%05d.xml' % n))
+
+
+def main(argv):
+    files = int(argv[1]) if len(argv) > 1 else DEFAULT_FILES
+    objects = int(argv[2]) if len(argv) > 2 else DEFAULT_OBJECTS
+    folder = tempfile.mkdtemp()
+    try:
+        makeFiles(folder, files, objects)
+        paths = findAnnotations(folder)
+        cpus = os.cpu_count() if hasattr(os, 'cpu_count') else 1
+        print('%d files of %d objects, %d CPUs' % (files, objects, cpus))
+
+        start = time.time()
+        for path in paths:
+            PascalVocReader(path).getShapes()
+        elapsed = time.time() - start
+        print('  %-28s %8.0f files/s' % ('PascalVocReader.getShapes', files / elapsed))
+
+        for processes in sorted(set([1, 4, cpus])):
+            start = time.time()
+            batch = loadAnnotations(folder, processes=processes)
+            elapsed = time.time() - start
+            assert len(batch) == files * objects
+            print('  %-28s %8.0f files/s' % ('loadAnnotations, %d process%s' % (
+                processes, '' if processes == 1 else 'es'), files / elapsed))
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
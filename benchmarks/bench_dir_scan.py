@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Time listing a directory tree: the previous os.walk + sort against the
+streaming scanner, cold and with a warm scan cache.
+
+Usage: python benchmarks/bench_dir_scan.py [directory]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+from dirScanner import iterImages
+
+DIRS = 100
+FILES = 500
+
+
+def makeTree(root):
+    for i in range(DIRS):
+        sub = os.path.join(root, 'seq_%03d' % i)
+        os.makedirs(sub)
+        for j in range(FILES):
+            open(os.path.join(sub, 'frame_%05d.jpg' % j), 'w').close()
+
+
+def walkAndSort(folderPath):
+    images = []
+    for root, dirs, files in os.walk(folderPath):
+        for name in files:
+            if name.lower().endswith(('.jpeg', '.jpg', '.png', '.bmp')):
+                images.append(os.path.abspath(os.path.join(root, name)))
+    images.sort(key=lambda x: x.lower())
+    return images
+
+
+def timeScan(folderPath, cache=None):
+    start = time.time()
+    scan = iterImages(folderPath, cache)
+    next(scan)
+    first = time.time() - start
+    count = 1 + sum(1 for _ in scan)
+    return first, time.time() - start, count
+
+
+def main(argv):
+    tmp = None
+    if len(argv) > 1:
+        folderPath = argv[1]
+    else:
+        tmp = folderPath = tempfile.mkdtemp()
+        makeTree(folderPath)
+    try:
+        start = time.time()
+        count = len(walkAndSort(folderPath))
+        elapsed = (time.time() - start) * 1000
+        print('os.walk + sort    first image %7.1f ms  all %7.1f ms  (%d images)' % (
+            elapsed, elapsed, count))
+        cache = {}
+        for label in ('scanner, cold', 'scanner, cached'):
+            first, total, count = timeScan(folderPath, cache)
+            print('%-17s first image %7.1f ms  all %7.1f ms  (%d images)' % (
+                label, first * 1000, total * 1000, count))
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
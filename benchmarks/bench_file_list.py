@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Time filling the file dock for a large directory: one QListWidgetItem per
+image (the previous approach) against FileListModel behind a QListView.
+
+Usage: QT_QPA_PLATFORM=offscreen python benchmarks/bench_file_list.py [size]
+"""
+import os
+import sys
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+
+try:
+    from PyQt5.QtWidgets import QApplication, QListView, QListWidget, QListWidgetItem
+except ImportError:
+    from PyQt4.QtGui import QApplication, QListView, QListWidget, QListWidgetItem
+
+from fileListModel import FileListModel
+from imageList import ImageList
+
+DEFAULT_SIZE = 500000
+
+
+def main(argv):
+    size = int(argv[1]) if len(argv) > 1 else DEFAULT_SIZE
+    app = QApplication(argv[:1])
+    paths = ['/data/scenes/tile_%08d.png' % i for i in range(size)]
+
+    widget = QListWidget()
+    start = time.time()
+    for path in paths:
+        widget.addItem(QListWidgetItem(path))
+    app.processEvents()
+    items = time.time() - start
+
+    view = QListView()
+    view.setUniformItemSizes(True)
+    view.setLayoutMode(QListView.Batched)
+    view.setBatchSize(1000)
+    model = FileListModel()
+    view.setModel(model)
+    start = time.time()
+    model.setImageList(ImageList(paths))
+    view.show()
+    app.processEvents()
+    modelTime = time.time() - start
+    # Batched layout finishes in the background after the first paint.
+    app.processEvents()
+
+    print('entries:            %d' % size)
+    print('QListWidget items:  %.1f ms' % (items * 1000))
+    print('FileListModel:      %.1f ms (includes building the ImageList)' % (modelTime * 1000))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
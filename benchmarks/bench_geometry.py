@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Time the rotated-box conversions of boxGeometry on many boxes: the scalar
+functions called once per box, as the reader and writer did, against the
+numpy array versions.
+
+Usage: python benchmarks/bench_geometry.py [boxes]
+"""
+import math
+import os
+import random
+import sys
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+
+import boxGeometry as geo
+
+DEFAULT_COUNT = 1000000
+
+
+def timed(func):
+    start = time.time()
+    func()
+    return time.time() - start
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else DEFAULT_COUNT
+    numpy = geo.loadNumpy()
+    if numpy is None:
+        print('numpy is not installed')
+        return
+    rng = random.Random(0)
+    boxes = [(rng.uniform(0, 8000), rng.uniform(0, 8000), rng.uniform(5, 300),
+              rng.uniform(5, 300), rng.uniform(0, math.pi)) for _ in range(count)]
+    columns = numpy.array(boxes).T
+    corners = geo.boxCornersArray(*columns)
+    cornerLists = corners.tolist()
+    x, y = 4000.0, 4000.0
+
+    cases = [
+        ('box -> corners',
+         lambda: [geo.boxCorners(*b) for b in boxes],
+         lambda: geo.boxCornersArray(*columns)),
+        ('corners -> box',
+         lambda: [geo.cornersToBox(c) for c in cornerLists],
+         lambda: geo.cornersToBoxArray(corners)),
+        ('envelope',
+         lambda: [geo.boxEnvelope(*b) for b in boxes],
+         lambda: geo.boxEnvelopeArray(*columns)),
+        ('normalize angle',
+         lambda: [geo.normalizeAngle(b[4] + 3.0) for b in boxes],
+         lambda: geo.normalizeAngleArray(columns[4] + 3.0)),
+        ('point in box',
+         lambda: [geo.pointInBox(x, y, *b) for b in boxes],
+         lambda: geo.pointInBoxArray(x, y, *columns)),
+    ]
+    print('%d boxes, ms' % count)
+    print('  %-16s %10s %10s %8s' % ('', 'scalar', 'numpy', 'speedup'))
+    for name, scalar, array in cases:
+        s, a = timed(scalar), timed(array)
+        print('  %-16s %10.1f %10.1f %7.0fx' % (name, s * 1000, a * 1000, s / a))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
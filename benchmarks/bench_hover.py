@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Time hover hit-testing on a canvas full of rotated boxes: the previous scan
+over every visible shape against the canvas' spatial index.
+
+Usage: QT_QPA_PLATFORM=offscreen python benchmarks/bench_hover.py [counts...]
+"""
+import math
+import os
+import random
+import sys
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+
+try:
+    from PyQt5.QtGui import QImage, QMouseEvent, QPixmap
+    from PyQt5.QtCore import QEvent, QPoint, QPointF, Qt
+    from PyQt5.QtWidgets import QApplication
+except ImportError:
+    from PyQt4.QtGui import QApplication, QImage, QMouseEvent, QPixmap
+    from PyQt4.QtCore import QEvent, QPoint, QPointF, Qt
+
+from canvas import Canvas
+from shape import Shape
+
+DEFAULT_COUNTS = [100, 1000, 10000]
+IMAGE_SIZE = 4000
+MOVES = 200
+
+
+def makeShapes(count, rng):
+    shapes = []
+    for _ in range(count):
+        cx = rng.uniform(50, IMAGE_SIZE - 50)
+        cy = rng.uniform(50, IMAGE_SIZE - 50)
+        w, h = rng.uniform(10, 60), rng.uniform(10, 60)
+        angle = rng.uniform(0, math.pi)
+        cos, sin = math.cos(angle), math.sin(angle)
+        shape = Shape(label='box')
+        for dx, dy in ((-w, -h), (w, -h), (w, h), (-w, h)):
+            shape.addPoint(QPointF(cx + (dx * cos - dy * sin) / 2,
+                                   cy + (dx * sin + dy * cos) / 2))
+        shape.direction = angle
+        shape.close()
+        shapes.append(shape)
+    return shapes
+
+
+def scanAll(canvas, pos):
+    """The hit test mouseMoveEvent used before the spatial index."""
+    for shape in reversed([s for s in canvas.shapes if canvas.isVisible(s)]):
+        if shape.nearestVertex(pos, canvas.epsilon) is not None:
+            return shape
+        if shape.containsPoint(pos):
+            return shape
+    return None
+
+
+def main(argv):
+    counts = [int(a) for a in argv[1:]] or DEFAULT_COUNTS
+    app = QApplication(argv[:1])
+    rng = random.Random(0)
+    canvas = Canvas()
+    image = QImage(IMAGE_SIZE, IMAGE_SIZE, QImage.Format_RGB32)
+    canvas.loadPixmap(QPixmap.fromImage(image))
+    canvas.resize(IMAGE_SIZE, IMAGE_SIZE)
+    positions = [QPoint(rng.randint(0, IMAGE_SIZE - 1),
+                        rng.randint(0, IMAGE_SIZE - 1)) for _ in range(MOVES)]
+
+    print('%8s %14s %14s' % ('shapes', 'scan (ms)', 'grid (ms)'))
+    for count in counts:
+        canvas.loadShapes(makeShapes(count, rng))
+
+        start = time.time()
+        for pos in positions:
+            scanAll(canvas, canvas.transformPos(QPointF(pos)))
+        scan = (time.time() - start) / MOVES
+
+        start = time.time()
+        for pos in positions:
+            event = QMouseEvent(QEvent.MouseMove, pos, Qt.NoButton,
+                                Qt.NoButton, Qt.NoModifier)
+            canvas.mouseMoveEvent(event)
+        grid = (time.time() - start) / MOVES
+        print('%8d %14.3f %14.3f' % (count, scan * 1000, grid * 1000))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Time next/prev navigation on a synthetic image list: the previous
+list.index() lookup against ImageList's path-to-index map.
+
+Usage: python benchmarks/bench_image_list.py [list size]
+"""
+import os
+import sys
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+from imageList import ImageList
+
+DEFAULT_SIZE = 1000000
+STEPS = 200
+
+
+def main(argv):
+    size = int(argv[1]) if len(argv) > 1 else DEFAULT_SIZE
+    paths = ['/data/scenes/tile_%08d.png' % i for i in range(size)]
+
+    start = time.time()
+    images = ImageList(paths)
+    build = time.time() - start
+
+    # Navigate around the end of the list, the worst case for list.index().
+    targets = paths[-STEPS:]
+
+    start = time.time()
+    for path in targets:
+        paths.index(path)
+    scan = (time.time() - start) / STEPS
+
+    start = time.time()
+    for path in targets:
+        images.setCurrent(path)
+        images.next()
+    mapped = (time.time() - start) / STEPS
+
+    print('entries:             %d' % size)
+    print('ImageList build:     %.1f ms' % (build * 1000))
+    print('list.index per step: %.3f ms' % (scan * 1000))
+    print('ImageList per step:  %.6f ms' % (mapped * 1000))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
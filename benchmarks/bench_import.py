@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Import time of the Qt-free core modules, each measured in a fresh
+interpreter, against the GUI modules that pull in PyQt. Also checks that
+no core module imports Qt. Bytecode is cached in a temporary directory and
+a first, unmeasured run fills it, so the times are those of an installed
+copy rather than of compiling the sources.
+
+Usage: python benchmarks/bench_import.py [runs]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+
+DEFAULT_RUNS = 7
+CORE_MODULES = ['boxGeometry', 'shapeStore', 'imageSize', 'pascal_voc_io',
+                'labelFile', 'datasetIndex', 'batchLoader']
+GUI_MODULES = ['shape', 'canvas']
+
+SCRIPT = '''
+import sys, time
+sys.path.insert(0, %r)
+start = time.perf_counter()
+import %s
+elapsed = time.perf_counter() - start
+qt = any(name.split('.')[0] in ('PyQt4', 'PyQt5') for name in sys.modules)
+sys.stdout.write('%%f %%d' %% (elapsed, qt))
+'''
+
+
+def importTime(module, runs, env):
+    times = []
+    for _ in range(runs + 1):
+        out = subprocess.check_output([sys.executable, '-c', SCRIPT % (libs_path, module)],
+                                      env=env)
+        elapsed, qt = out.split()
+        times.append(float(elapsed))
+    times = sorted(times[1:])
+    return times[len(times) // 2], qt == b'1'
+
+
+def main(argv):
+    runs = int(argv[1]) if len(argv) > 1 else DEFAULT_RUNS
+    cacheDir = tempfile.mkdtemp()
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=cacheDir)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    try:
+        print('median of %d runs, fresh interpreter each' % runs)
+        for group, modules in (('core', CORE_MODULES), ('gui', GUI_MODULES)):
+            for module in modules:
+                elapsed, qt = importTime(module, runs, env)
+                print('  %-4s %-16s %8.1f ms%s' % (group, module, elapsed * 1000,
+                                                  '  imports Qt' if qt else ''))
+    finally:
+        shutil.rmtree(cacheDir)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
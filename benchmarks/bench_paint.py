@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Time Canvas.paintEvent frames on a dense scene: the whole image zoomed out,
+with and without level-of-detail outlines, a viewport sized region at full
+zoom, where shapes outside the exposed rect are culled, and the dirty rect
+of a single dragged shape.
+
+Usage: QT_QPA_PLATFORM=offscreen python benchmarks/bench_paint.py [shapes]
+"""
+import os
+import random
+import sys
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+sys.path.insert(0, dir_name)
+
+try:
+    from PyQt5.QtGui import QImage, QPixmap, QRegion
+    from PyQt5.QtCore import QPoint, QRect
+    from PyQt5.QtWidgets import QApplication
+except ImportError:
+    from PyQt4.QtGui import QApplication, QImage, QPixmap, QRegion
+    from PyQt4.QtCore import QPoint, QRect
+
+from bench_hover import IMAGE_SIZE, makeShapes
+from canvas import Canvas
+
+DEFAULT_COUNT = 10000
+FRAMES = 5
+VIEWPORT = QRect(1500, 1500, 1200, 800)
+
+
+def frameTime(canvas, rect):
+    target = QImage(rect.size(), QImage.Format_ARGB32_Premultiplied)
+    start = time.time()
+    for _ in range(FRAMES):
+        canvas.render(target, QPoint(), QRegion(rect))
+    return (time.time() - start) / FRAMES
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else DEFAULT_COUNT
+    app = QApplication(argv[:1])
+    canvas = Canvas()
+    image = QImage(IMAGE_SIZE, IMAGE_SIZE, QImage.Format_RGB32)
+    image.fill(0xff808080)
+    canvas.loadPixmap(QPixmap.fromImage(image))
+    canvas.loadShapes(makeShapes(count, random.Random(0)))
+
+    canvas.scale = 0.25
+    canvas.resize(canvas.sizeHint())
+    whole = canvas.rect()
+    canvas.lodSize = 0
+    full = frameTime(canvas, whole)
+    canvas.lodSize = 16
+    lod = frameTime(canvas, whole)
+
+    canvas.scale = 1.0
+    canvas.resize(canvas.sizeHint())
+    canvas.lodSize = 0
+    wholeFrame = frameTime(canvas, canvas.rect())
+    viewport = frameTime(canvas, VIEWPORT)
+    drag = frameTime(canvas, canvas.shapeRect(canvas.shapes[count // 2]))
+
+    print('%d shapes on a %dx%d image, ms per frame' % (count, IMAGE_SIZE, IMAGE_SIZE))
+    print('  zoom 25%%, whole image, full detail  %8.1f' % (full * 1000))
+    print('  zoom 25%%, whole image, outlines     %8.1f' % (lod * 1000))
+    print('  zoom 100%%, whole widget             %8.1f' % (wholeFrame * 1000))
+    print('  zoom 100%%, %dx%d viewport         %8.1f' % (
+        VIEWPORT.width(), VIEWPORT.height(), viewport * 1000))
+    print('  zoom 100%%, one dragged shape        %8.1f' % (drag * 1000))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
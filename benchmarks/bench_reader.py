@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Compare parse time and peak memory of the tree-based PascalVocReader with the
+streaming (iterparse) mode on synthetic robndbox annotations.
+
+Usage: python benchmarks/bench_reader.py [object counts...]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+from pascal_voc_io import PascalVocWriter
+from pascal_voc_io import PascalVocReader
+
+DEFAULT_COUNTS = [100, 5000, 20000]
+
+
+def makeXML(path, count):
+    writer = PascalVocWriter('bench', 'bench', (8000, 8000, 3),
+                             localImgPath='bench.png')
+    for i in range(count):
+        writer.addRotatedBndBox(40.5 + i % 7900, 60.25 + i % 7900, 30.0, 12.5,
+                                (i % 314) / 100.0, 'ship', i % 2)
+    writer.save(path)
+
+
+def measure(func):
+    # Time and memory are taken in separate runs; tracemalloc slows
+    # allocation-heavy code down considerably.
+    start = time.time()
+    count = func()
+    elapsed = time.time() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def tree(path):
+    return len(PascalVocReader(path).getShapes())
+
+
+def streaming(path):
+    return len(PascalVocReader(path, streaming=True).getShapes())
+
+
+def generator(path):
+    count = 0
+    for _ in PascalVocReader(path, streaming=True).iterShapes():
+        count += 1
+    return count
+
+
+def main(argv):
+    counts = [int(c) for c in argv[1:]] or DEFAULT_COUNTS
+    tmpdir = tempfile.mkdtemp()
+    try:
+        print('%8s %-12s %10s %12s' % ('objects', 'mode', 'time(ms)', 'peak(KiB)'))
+        for count in counts:
+            path = os.path.join(tmpdir, 'bench_%d.xml' % count)
+            makeXML(path, count)
+            for name, func in (('tree', tree), ('streaming', streaming),
+                               ('generator', generator)):
+                parsed, elapsed, peak = measure(lambda: func(path))
+                assert parsed == count
+                print('%8d %-12s %10.1f %12.1f' %
+                      (count, name, elapsed * 1000, peak / 1024.0))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
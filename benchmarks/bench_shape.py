@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Time hit-testing and painting static shapes with Shape's cached geometry
+against rebuilding it on every call (what Shape did before).
+
+Usage: QT_QPA_PLATFORM=offscreen python benchmarks/bench_shape.py [shapes]
+"""
+import os
+import random
+import sys
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+sys.path.insert(0, dir_name)
+
+try:
+    from PyQt5.QtGui import QImage, QPainter
+    from PyQt5.QtCore import QPointF
+    from PyQt5.QtWidgets import QApplication
+except ImportError:
+    from PyQt4.QtGui import QApplication, QImage, QPainter
+    from PyQt4.QtCore import QPointF
+
+from bench_hover import makeShapes
+
+DEFAULT_COUNT = 5000
+ROUNDS = 5
+
+
+def run(shapes, points, painter, cached):
+    start = time.time()
+    for _ in range(ROUNDS):
+        for shape in shapes:
+            if not cached:
+                shape.invalidate()
+            for point in points:
+                shape.containsPoint(point)
+            shape.boundingRect()
+    hit = (time.time() - start) / ROUNDS
+
+    start = time.time()
+    for _ in range(ROUNDS):
+        for shape in shapes:
+            if not cached:
+                shape.invalidate()
+            shape.paint(painter)
+    paint = (time.time() - start) / ROUNDS
+    return hit, paint
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else DEFAULT_COUNT
+    app = QApplication(argv[:1])
+    rng = random.Random(0)
+    shapes = makeShapes(count, rng)
+    points = [QPointF(rng.uniform(0, 4000), rng.uniform(0, 4000))
+              for _ in range(4)]
+    image = QImage(4000, 4000, QImage.Format_ARGB32)
+    painter = QPainter(image)
+    try:
+        for label, cached in (('rebuilt', False), ('cached', True)):
+            hit, paint = run(shapes, points, painter, cached)
+            print('%-8s hit-test %7.1f ms  paint %7.1f ms  (%d shapes)' % (
+                label, hit * 1000, paint * 1000, count))
+    finally:
+        painter.end()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
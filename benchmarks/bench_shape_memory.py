@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Measure the per-shape memory footprint of closed four-point Shapes, as the
+canvas holds them after loading an annotation file, and the time taken to
+create and to copy them.
+
+Python allocations are counted with tracemalloc; the resident set size,
+where /proc is available, also includes the Qt side of the points.
+
+Usage: QT_QPA_PLATFORM=offscreen python benchmarks/bench_shape_memory.py [shapes]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+
+try:
+    from PyQt5.QtCore import QPointF
+except ImportError:
+    from PyQt4.QtCore import QPointF
+
+from shape import Shape
+
+DEFAULT_COUNT = 100000
+
+
+def resident():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, AttributeError):
+        return None
+
+
+def makeShapes(count):
+    shapes = []
+    for i in range(count):
+        x, y = float(i % 4000), float(i // 4000)
+        shape = Shape(label='box')
+        shape.points = [QPointF(x, y), QPointF(x + 10, y),
+                        QPointF(x + 10, y + 10), QPointF(x, y + 10)]
+        shape.isRotated = False
+        shape.close()
+        shapes.append(shape)
+    return shapes
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else DEFAULT_COUNT
+    gc.collect()
+    rss = resident()
+    start = time.time()
+    shapes = makeShapes(count)
+    create = time.time() - start
+    rssAfter = resident()
+
+    start = time.time()
+    copies = [shape.copy() for shape in shapes]
+    copy = time.time() - start
+    del shapes, copies
+    gc.collect()
+
+    # tracemalloc slows allocation down, so it gets a run of its own.
+    tracemalloc.start()
+    shapes = makeShapes(count)
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print('%d shapes' % count)
+    print('  python bytes per shape   %8.0f' % (float(traced) / count))
+    if rss is not None and rssAfter is not None:
+        print('  resident bytes per shape %8.0f' % (float(rssAfter - rss) / count))
+    print('  create (ms)              %8.1f' % (create * 1000))
+    print('  copy (ms)                %8.1f' % (copy * 1000))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
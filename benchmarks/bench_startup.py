@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Startup time of the application, each run in a fresh interpreter:
+time to import roLabelImg, time until the main window first paints and
+time until the canvas first paints the image given on the command line.
+Times are measured from just before the interpreter is started, with
+bytecode cached as in an installed copy.
+
+Usage: python benchmarks/bench_startup.py [runs] [image]
+
+Without a display, run it with QT_QPA_PLATFORM=offscreen.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+root_path = os.path.abspath(os.path.join(dir_name, '..'))
+
+DEFAULT_RUNS = 5
+DEFAULT_IMAGE = os.path.join(root_path, 'demo', 'demo3.jpg')
+
+SCRIPT = '''
+import os, sys, time
+start = %r
+root = %r
+sys.path.insert(0, os.path.join(root, 'libs'))
+sys.path.insert(0, root)
+os.chdir(root)
+import roLabelImg
+from roLabelImg import QEvent, QObject, QTimer, QApplication
+imported = time.time()
+times = {}
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            if obj is win and 'window' not in times:
+                times['window'] = time.time()
+            elif obj is win.canvas and not win.canvas.pixmap.isNull() \\
+                    and 'image' not in times:
+                times['image'] = time.time()
+                QTimer.singleShot(0, QApplication.instance().quit)
+        return False
+
+app, win = roLabelImg.get_main_app(['roLabelImg.py', %r])
+# Nothing is painted before the event loop runs.
+watcher = FirstPaint()
+app.installEventFilter(watcher)
+QTimer.singleShot(30000, app.quit)
+app.exec_()
+sys.stdout.write('%%f %%f %%f' %% (imported - start, times.get('window', 0) - start,
+                                 times.get('image', 0) - start))
+os._exit(0)
+'''
+
+
+def startupTimes(image, env):
+    script = SCRIPT % (time.time(), root_path, image)
+    out = subprocess.check_output([sys.executable, '-c', script], env=env)
+    return [float(value) for value in out.split()]
+
+
+def main(argv):
+    runs = int(argv[1]) if len(argv) > 1 else DEFAULT_RUNS
+    image = os.path.abspath(argv[2]) if len(argv) > 2 else DEFAULT_IMAGE
+    # A separate home keeps the user's settings and caches out of it.
+    home = tempfile.mkdtemp()
+    env = dict(os.environ, HOME=home, PYTHONPYCACHEPREFIX=os.path.join(home, 'pyc'))
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    try:
+        # Fill the bytecode cache.
+        startupTimes(image, env)
+        results = zip(*[startupTimes(image, env) for _ in range(runs)])
+        print('median of %d runs, %s' % (runs, os.path.basename(image)))
+        for name, times in zip(('import', 'window', 'first image'), results):
+            times = sorted(times)
+            print('  %-12s %8.0f ms' % (name, times[len(times) // 2] * 1000))
+    finally:
+        shutil.rmtree(home)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
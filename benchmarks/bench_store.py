@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Compare the parsed-annotation tuples of PascalVocReader.getShapes with a
+ShapeStore filled by getStore: parse time, memory held by the result, and
+writing the boxes back out through the writer's dicts or the store.
+
+Usage: python benchmarks/bench_store.py [object counts...]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+sys.path.insert(0, dir_name)
+from pascal_voc_io import PascalVocWriter
+from pascal_voc_io import PascalVocReader
+
+from bench_reader import makeXML
+
+DEFAULT_COUNTS = [1000, 20000]
+
+
+def held(func):
+    """Return (result, seconds, bytes still allocated by the result)."""
+    start = time.time()
+    func()
+    elapsed = time.time() - start
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, size
+
+
+def writeTuples(shapes):
+    writer = PascalVocWriter('bench', 'bench', (8000, 8000, 3),
+                             localImgPath='bench.png')
+    for label, points, angle, isRotated, _, _, difficult in shapes:
+        (x0, y0), (x1, y1), (x2, y2) = points[:3]
+        writer.addRotatedBndBox((x0 + x2) / 2, (y0 + y2) / 2,
+                                ((x1 - x0) ** 2 + (y1 - y0) ** 2) ** 0.5,
+                                ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5,
+                                angle, label, difficult)
+    return writer.toXML()
+
+
+def writeStore(store):
+    writer = PascalVocWriter('bench', 'bench', (8000, 8000, 3),
+                             localImgPath='bench.png')
+    writer.addStore(store)
+    return writer.toXML()
+
+
+def timed(func, arg):
+    start = time.time()
+    func(arg)
+    return time.time() - start
+
+
+def main(argv):
+    counts = [int(c) for c in argv[1:]] or DEFAULT_COUNTS
+    tmpdir = tempfile.mkdtemp()
+    try:
+        print('%8s %-8s %10s %12s %10s' % ('objects', 'result', 'parse(ms)',
+                                          'held(KiB)', 'write(ms)'))
+        for count in counts:
+            path = os.path.join(tmpdir, 'bench_%d.xml' % count)
+            makeXML(path, count)
+            shapes, parse, size = held(
+                lambda: PascalVocReader(path, streaming=True).getShapes())
+            write = timed(writeTuples, shapes)
+            print('%8d %-8s %10.1f %12.1f %10.1f' % (
+                count, 'tuples', parse * 1000, size / 1024.0, write * 1000))
+            store, parse, size = held(
+                lambda: PascalVocReader(path, streaming=True).getStore())
+            write = timed(writeStore, store)
+            print('%8d %-8s %10.1f %12.1f %10.1f' % (
+                count, 'store', parse * 1000, size / 1024.0, write * 1000))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
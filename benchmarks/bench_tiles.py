@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Time painting a very large image with a single full-resolution QPixmap
+against the tiled pyramid backend, zoomed out to fit and at 100% zoom.
+
+Usage: QT_QPA_PLATFORM=offscreen python benchmarks/bench_tiles.py [side]
+"""
+import os
+import sys
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+
+try:
+    from PyQt5.QtGui import QColor, QImage, QPainter, QPixmap, QRegion
+    from PyQt5.QtCore import QPoint, QRect, QThreadPool
+    from PyQt5.QtWidgets import QApplication
+except ImportError:
+    from PyQt4.QtGui import (QApplication, QColor, QImage, QPainter, QPixmap,
+                             QRegion)
+    from PyQt4.QtCore import QPoint, QRect, QThreadPool
+
+from canvas import Canvas
+from tiledImage import TiledImage
+
+DEFAULT_SIDE = 8192
+FRAMES = 3
+VIEWPORT = (1200, 800)
+
+
+def makeImage(side):
+    image = QImage(side, side, QImage.Format_RGB32)
+    painter = QPainter(image)
+    step = 256
+    for y in range(0, side, step):
+        for x in range(0, side, step):
+            painter.fillRect(x, y, step, step,
+                             QColor((x // step * 37) % 256, (y // step * 59) % 256, 128))
+    painter.end()
+    return image
+
+
+def frameTime(canvas, rect):
+    target = QImage(rect.size(), QImage.Format_ARGB32_Premultiplied)
+    start = time.time()
+    canvas.render(target, QPoint(), QRegion(rect))
+    first = time.time() - start
+    start = time.time()
+    for _ in range(FRAMES):
+        canvas.render(target, QPoint(), QRegion(rect))
+    return first, (time.time() - start) / FRAMES
+
+
+def measure(canvas, image, tiled):
+    start = time.time()
+    if tiled:
+        canvas.loadPixmap(TiledImage(image, canvas.tileCache))
+        QThreadPool.globalInstance().waitForDone()
+        QApplication.processEvents()
+    else:
+        canvas.loadPixmap(QPixmap.fromImage(image))
+    load = time.time() - start
+
+    results = [load]
+    side = image.width()
+    for scale, rect in ((1000.0 / side, None),
+                        (1.0, QRect(side // 2, side // 2, VIEWPORT[0], VIEWPORT[1]))):
+        canvas.scale = scale
+        canvas.resize(canvas.sizeHint())
+        results.extend(frameTime(canvas, rect or canvas.rect()))
+    return results
+
+
+def main(argv):
+    side = int(argv[1]) if len(argv) > 1 else DEFAULT_SIDE
+    app = QApplication(argv[:1])
+    image = makeImage(side)
+    canvas = Canvas()
+    print('%dx%d image, ms (first frame / later frames)' % (side, side))
+    for label, tiled in (('pixmap', False), ('tiles', True)):
+        load, fitFirst, fit, fullFirst, full = measure(canvas, image, tiled)
+        print('  %-7s load %7.1f  fit %7.1f / %7.1f  100%% viewport %7.1f / %7.1f' % (
+            label, load * 1000, fitFirst * 1000, fit * 1000,
+            fullFirst * 1000, full * 1000))
+    print('  tile cache holds %d tiles, %.0f MB' % (
+        len(canvas.tileCache), canvas.tileCache.totalBytes / 1048576.0))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Compare PascalVocWriter.save, which emits the indented document in one pass,
+with the previous ElementTree + prettify + codecs path.
+
+Usage: python benchmarks/bench_writer.py [object counts...]
+"""
+import codecs
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+from pascal_voc_io import PascalVocWriter
+
+DEFAULT_COUNTS = [10, 1000, 20000]
+REPEAT = 5
+
+
+def makeWriter(count):
+    writer = PascalVocWriter('bench', 'bench', (8000, 8000, 3),
+                             localImgPath='bench.png')
+    for i in range(count):
+        if i % 4 == 0:
+            writer.addBndBox(10 + i % 7000, 10 + i % 7000, 60 + i % 7000,
+                             40 + i % 7000, 'car', i % 2)
+        else:
+            writer.addRotatedBndBox(40.5 + i % 7900, 60.25 + i % 7900, 30.0,
+                                    12.5, (i % 314) / 100.0, 'ship', i % 2)
+    return writer
+
+
+def legacySave(writer, path):
+    root = writer.genXML()
+    writer.appendObjects(root)
+    out_file = codecs.open(path, 'w', encoding='utf-8')
+    out_file.write(writer.prettify(root).decode('utf8'))
+    out_file.close()
+
+
+def best(func):
+    times = []
+    for _ in range(REPEAT):
+        start = time.time()
+        func()
+        times.append(time.time() - start)
+    return min(times)
+
+
+def main(argv):
+    counts = [int(c) for c in argv[1:]] or DEFAULT_COUNTS
+    tmpdir = tempfile.mkdtemp()
+    try:
+        print('%8s %12s %12s %8s' % ('objects', 'legacy(ms)', 'save(ms)', 'speedup'))
+        for count in counts:
+            writer = makeWriter(count)
+            legacyPath = os.path.join(tmpdir, 'legacy.xml')
+            path = os.path.join(tmpdir, 'direct.xml')
+            legacy = best(lambda: legacySave(writer, legacyPath))
+            direct = best(lambda: writer.save(path))
+            with open(legacyPath, 'rb') as a, open(path, 'rb') as b:
+                same = a.read() == b.read()
+            print('%8d %12.2f %12.2f %7.1fx%s' %
+                  (count, legacy * 1000, direct * 1000, legacy / direct,
+                   '' if same else '  (output differs)'))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
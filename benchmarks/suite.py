@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Benchmark suite for regression tracking. It times the following on
+synthetic data from synthData.py:
+- the annotation reader and writer
+- rotated-box conversion
+- batch loading
+- canvas painting and hover hit-testing
+- listing and opening a directory
+
+Each case is run once to warm up and then a fixed number of times. Results
+are written as JSON. Given the results of an earlier run with --compare,
+each case's median is compared against it. Cases slower by more than the
+threshold are reported, and the exit status is 1.
+
+The Qt cases are skipped when PyQt cannot be imported. They run with a
+temporary HOME, so the user's settings and caches are left alone.
+
+Usage: QT_QPA_PLATFORM=offscreen python benchmarks/suite.py [--quick]
+           [--output results.json] [--compare baseline.json]
+           [--threshold 1.25] [case name prefixes...]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+root_path = os.path.abspath(os.path.join(dir_name, '..'))
+libs_path = os.path.join(root_path, 'libs')
+sys.path.insert(0, libs_path)
+sys.path.insert(0, root_path)
+sys.path.insert(0, dir_name)
+
+import boxGeometry
+from batchLoader import loadAnnotations
+from pascal_voc_io import PascalVocReader
+from synthData import makeBoxes, makeDataset, writeAnnotation
+
+DEFAULT_OUTPUT = 'benchmark-results.json'
+DEFAULT_THRESHOLD = 1.25
+# (repeats, scale) for full and --quick runs; sizes below are multiplied by scale.
+FULL = (7, 1.0)
+QUICK = (3, 0.2)
+
+CASES = []
+
+
+def case(name, unit, needsQt=False):
+    """
+        Register a benchmark. The decorated function gets (scale, workdir)
+        and returns (func, units): func is what is timed and units how many
+        items, of unit, one call handles.
+    """
+    def register(setup):
+        CASES.append((name, unit, needsQt, setup))
+        return setup
+    return register
+
+
+def scaled(count, scale):
+    return max(1, int(count * scale))
+
+
+@case('reader.getShapes', 'objects')
+def readerShapes(scale, workdir):
+    count = scaled(5000, scale)
+    path = os.path.join(workdir, 'reader.xml')
+    writeAnnotation(path, makeBoxes(count, random.Random(0)))
+    return (lambda: PascalVocReader(path).getShapes()), count
+
+
+@case('reader.getStore', 'objects')
+def readerStore(scale, workdir):
+    count = scaled(5000, scale)
+    path = os.path.join(workdir, 'store.xml')
+    writeAnnotation(path, makeBoxes(count, random.Random(0)))
+    return (lambda: PascalVocReader(path, streaming=True).getStore()), count
+
+
+@case('writer.save', 'objects')
+def writerSave(scale, workdir):
+    count = scaled(5000, scale)
+    boxes = makeBoxes(count, random.Random(0))
+    path = os.path.join(workdir, 'writer.xml')
+    return (lambda: writeAnnotation(path, boxes)), count
+
+
+@case('geometry.boxCorners', 'boxes')
+def geometryCorners(scale, workdir):
+    boxes = [box[1:6] for box in makeBoxes(scaled(100000, scale), random.Random(0))]
+
+    def run():
+        boxCorners = boxGeometry.boxCorners
+        for cx, cy, w, h, angle in boxes:
+            boxCorners(cx, cy, w, h, angle)
+    return run, len(boxes)
+
+
+@case('geometry.cornersToBox', 'boxes')
+def geometryBoxes(scale, workdir):
+    corners = [boxGeometry.boxCorners(*box[1:6])
+               for box in makeBoxes(scaled(100000, scale), random.Random(0))]
+
+    def run():
+        cornersToBox = boxGeometry.cornersToBox
+        for points in corners:
+            cornersToBox(points)
+    return run, len(corners)
+
+
+@case('geometry.boxCornersArray', 'boxes')
+def geometryArrays(scale, workdir):
+    if boxGeometry.loadNumpy() is None:
+        return None
+    count = scaled(1000000, scale)
+    columns = list(zip(*[box[1:6] for box in makeBoxes(count, random.Random(0))]))
+    columns = [boxGeometry.loadNumpy().array(column) for column in columns]
+    return (lambda: boxGeometry.boxCornersArray(*columns)), count
+
+
+@case('batch.loadAnnotations', 'files')
+def batchLoad(scale, workdir):
+    folder = os.path.join(workdir, 'batch')
+    files = scaled(500, scale)
+    makeDataset(folder, files, 50, withImages=False)
+    return (lambda: loadAnnotations(folder, processes=1)), files
+
+
+@case('dir.scan', 'images')
+def dirScan(scale, workdir):
+    from dirScanner import iterImages
+    folder = os.path.join(workdir, 'scan')
+    count = scaled(20000, scale)
+    for n in range(count):
+        sub = os.path.join(folder, 'seq_%03d' % (n // 500))
+        if not os.path.isdir(sub):
+            os.makedirs(sub)
+        open(os.path.join(sub, 'frame_%05d.jpg' % n), 'w').close()
+    return (lambda: sum(1 for _ in iterImages(folder))), count
+
+
+def makeCanvas(count):
+    from PyQt5.QtGui import QImage, QPixmap
+    from bench_hover import IMAGE_SIZE as SIDE, makeShapes
+    from canvas import Canvas
+    canvas = Canvas()
+    image = QImage(SIDE, SIDE, QImage.Format_RGB32)
+    image.fill(0xff808080)
+    canvas.loadPixmap(QPixmap.fromImage(image))
+    canvas.loadShapes(makeShapes(count, random.Random(0)))
+    return canvas
+
+
+@case('canvas.paint', 'frames', needsQt=True)
+def canvasPaint(scale, workdir):
+    from PyQt5.QtGui import QImage, QRegion
+    from PyQt5.QtCore import QPoint
+    canvas = makeCanvas(scaled(5000, scale))
+    canvas.scale = 0.25
+    canvas.resize(canvas.sizeHint())
+    target = QImage(canvas.size(), QImage.Format_ARGB32_Premultiplied)
+    region = QRegion(canvas.rect())
+    return (lambda: canvas.render(target, QPoint(), region)), 1
+
+
+@case('canvas.hover', 'moves', needsQt=True)
+def canvasHover(scale, workdir):
+    from PyQt5.QtGui import QMouseEvent
+    from PyQt5.QtCore import QEvent, QPoint, Qt
+    from bench_hover import IMAGE_SIZE as SIDE
+    canvas = makeCanvas(scaled(10000, scale))
+    canvas.resize(SIDE, SIDE)
+    rng = random.Random(1)
+    events = [QMouseEvent(QEvent.MouseMove, QPoint(rng.randint(0, SIDE - 1),
+                                                   rng.randint(0, SIDE - 1)),
+                          Qt.NoButton, Qt.NoButton, Qt.NoModifier)
+              for _ in range(200)]
+
+    def run():
+        for event in events:
+            canvas.mouseMoveEvent(event)
+    return run, len(events)
+
+
+@case('dir.open', 'directories', needsQt=True)
+def dirOpen(scale, workdir):
+    from PyQt5.QtWidgets import QApplication
+    import roLabelImg
+    folder = os.path.join(workdir, 'open')
+    makeDataset(folder, scaled(200, scale), 50, size=(640, 480))
+    app = QApplication.instance()
+
+    def run():
+        # A new window each time, so no listing or image is cached.
+        shutil.rmtree(os.path.join(os.path.expanduser('~'), '.roLabelImg', 'scan'),
+                      ignore_errors=True)
+        win = roLabelImg.MainWindow(None, os.path.join(root_path, 'data',
+                                                       'predefined_classes.txt'))
+        start = time.perf_counter()
+        win.importDirImages(folder)
+        while win.dirScanner.isScanning() or not win.filePath:
+            app.processEvents()
+        elapsed = time.perf_counter() - start
+        win.close()
+        win.deleteLater()
+        app.processEvents()
+        return elapsed
+    return run, 1
+
+
+def timeCase(func, repeats):
+    func()
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        # A case may time only part of its call and return that.
+        runs.append(result if isinstance(result, float) else elapsed)
+    return runs
+
+
+def environment(quick):
+    info = {'python': platform.python_version(), 'platform': platform.platform(),
+            'machine': platform.machine(), 'cpus': os.cpu_count(),
+            'quick': quick, 'numpy': boxGeometry.loadNumpy() is not None,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    try:
+        info['commit'] = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=root_path,
+            stderr=subprocess.STDOUT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    try:
+        from PyQt5.QtCore import QT_VERSION_STR
+        info['qt'] = QT_VERSION_STR
+    except ImportError:
+        pass
+    return info
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every case against baseline; return the regressions."""
+    regressions = []
+    print('\n%-28s %12s %12s %8s' % ('against baseline', 'before ms', 'after ms', 'ratio'))
+    for name, result in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            continue
+        ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else 1.0
+        flag = ''
+        if ratio > threshold:
+            flag = '  SLOWER'
+            regressions.append(name)
+        print('%-28s %12.3f %12.3f %8.2f%s' % (name, before['median_ms'],
+                                                result['median_ms'], ratio, flag))
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Run the benchmark suite.')
+    parser.add_argument('cases', nargs='*', help='only run cases starting with these')
+    parser.add_argument('--quick', action='store_true', help='smaller data, fewer repeats')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--compare', metavar='BASELINE')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv[1:])
+    repeats, scale = QUICK if args.quick else FULL
+
+    workdir = tempfile.mkdtemp()
+    home = os.environ.get('HOME')
+    os.environ['HOME'] = os.path.join(workdir, 'home')
+    try:
+        try:
+            from PyQt5.QtWidgets import QApplication
+            app = QApplication(argv[:1])
+        except ImportError:
+            app = None
+        results = {}
+        print('%-28s %12s %12s %16s' % ('case', 'median ms', 'min ms', 'throughput'))
+        for name, unit, needsQt, setup in CASES:
+            if args.cases and not any(name.startswith(prefix) for prefix in args.cases):
+                continue
+            if needsQt and app is None:
+                print('%-28s skipped, needs PyQt5' % name)
+                continue
+            prepared = setup(scale, workdir)
+            if prepared is None:
+                print('%-28s skipped' % name)
+                continue
+            func, units = prepared
+            runs = sorted(timeCase(func, repeats))
+            median = runs[len(runs) // 2]
+            results[name] = {'median_ms': median * 1000, 'min_ms': runs[0] * 1000,
+                             'runs_ms': [run * 1000 for run in runs],
+                             'units': units, 'unit': unit,
+                             'per_second': units / median if median else None}
+            print('%-28s %12.3f %12.3f %10.0f %s/s' % (name, median * 1000, runs[0] * 1000,
+                                                      units / median if median else 0, unit))
+    finally:
+        if home is None:
+            del os.environ['HOME']
+        else:
+            os.environ['HOME'] = home
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(args.quick), 'results': results},
+                  f, indent=2, sort_keys=True)
+    print('results written to %s' % args.output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
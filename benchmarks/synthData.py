@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Synthetic datasets for the benchmarks: images and annotation files with a
+chosen number of objects, a mix of bndbox and robndbox entries, all drawn
+from a seeded random generator so every run sees the same data.
+
+Usage: python benchmarks/synthData.py folder [images] [objects per image]
+"""
+import math
+import os
+import random
+import sys
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+libs_path = os.path.join(dir_name, '..', 'libs')
+sys.path.insert(0, libs_path)
+from pascal_voc_io import PascalVocWriter, XML_EXT
+
+DEFAULT_IMAGES = 100
+DEFAULT_OBJECTS = 50
+IMAGE_SIZE = (1920, 1080)
+LABELS = ['car', 'ship', 'plane', 'person', 'storage-tank']
+# Share of the objects written as rotated boxes.
+ROTATED_FRACTION = 0.7
+
+
+def makeBoxes(count, rng, size=IMAGE_SIZE):
+    """
+        Return count boxes as (label, cx, cy, w, h, angle, rotated,
+        difficult); axis-aligned boxes have angle 0.
+    """
+    width, height = size
+    boxes = []
+    for _ in range(count):
+        w = rng.uniform(8, max(9, width / 10.0))
+        h = rng.uniform(8, max(9, height / 10.0))
+        cx = rng.uniform(w / 2, width - w / 2)
+        cy = rng.uniform(h / 2, height - h / 2)
+        rotated = rng.random() < ROTATED_FRACTION
+        angle = rng.uniform(0, math.pi) if rotated else 0.0
+        boxes.append((rng.choice(LABELS), cx, cy, w, h, angle, rotated,
+                      rng.random() < 0.05))
+    return boxes
+
+
+def writeAnnotation(path, boxes, size=IMAGE_SIZE, imagePath=None):
+    """Write boxes from makeBoxes() to an annotation file at path."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    if imagePath is None:
+        imagePath = os.path.splitext(path)[0] + '.png'
+    writer = PascalVocWriter(os.path.basename(os.path.dirname(imagePath)), name,
+                             (size[1], size[0], 3), localImgPath=imagePath)
+    for label, cx, cy, w, h, angle, rotated, difficult in boxes:
+        if rotated:
+            writer.addRotatedBndBox(round(cx, 4), round(cy, 4), round(w, 4),
+                                    round(h, 4), round(angle, 6), label, int(difficult))
+        else:
+            writer.addBndBox(int(max(1, cx - w / 2)), int(max(1, cy - h / 2)),
+                             int(cx + w / 2), int(cy + h / 2), label, int(difficult))
+    writer.save(path)
+
+
+def writeImage(path, size=IMAGE_SIZE, seed=0):
+    """
+        Write a flat-coloured image of size to path; the format follows the
+        extension. Needs Qt.
+    """
+    try:
+        from PyQt5.QtGui import QColor, QImage
+    except ImportError:
+        from PyQt4.QtGui import QColor, QImage
+    rng = random.Random(seed)
+    image = QImage(size[0], size[1], QImage.Format_RGB32)
+    image.fill(QColor(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+    if not image.save(path):
+        raise IOError('cannot write %s' % path)
+
+
+def makeDataset(folder, images=DEFAULT_IMAGES, objects=DEFAULT_OBJECTS,
+                size=IMAGE_SIZE, seed=0, withImages=True):
+    """
+        Fill folder with images img00000.png ... and an annotation file of
+        objects boxes next to each; returns the image paths. Without images,
+        only the annotation files are written.
+    """
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    rng = random.Random(seed)
+    paths = []
+    for n in range(images):
+        imagePath = os.path.join(folder, 'img%05d.png' % n)
+        if withImages:
+            writeImage(imagePath, size, seed + n)
+        writeAnnotation(os.path.splitext(imagePath)[0] + XML_EXT,
+                        makeBoxes(objects, rng, size), size, imagePath)
+        paths.append(imagePath)
+    return paths
+
+
+def main(argv):
+    if len(argv) < 2:
+        print(__doc__.strip())
+        return
+    images = int(argv[2]) if len(argv) > 2 else DEFAULT_IMAGES
+    objects = int(argv[3]) if len(argv) > 3 else DEFAULT_OBJECTS
+    makeDataset(argv[1], images, objects)
+    print('wrote %d images of %d objects to %s' % (images, objects, argv[1]))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,102 @@
+try:
+    from PyQt5.QtCore import *
+except ImportError:
+    from PyQt4.QtCore import *
+
+import threading
+
+from pascal_voc_io import writeFileAtomic
+import tracing
+
+
+class SaveSignals(QObject):
+    # (path, error message or None)
+    finished = pyqtSignal(object, object)
+
+
+class SaveTask(QRunnable):
+    """Writes the data queued for one path, if a task before it has not."""
+
+    def __init__(self, saver, path):
+        super(SaveTask, self).__init__()
+        self.saver = saver
+        self.path = path
+
+    def run(self):
+        data = self.saver.takePending(self.path)
+        if data is None:
+            return
+        error = None
+        try:
+            with tracing.span('AnnotationSaver.write'):
+                writeFileAtomic(self.path, data)
+        except (IOError, OSError) as e:
+            error = e.strerror or str(e)
+        except Exception as e:
+            # Anything else must still be reported, or the path would look
+            # busy for the rest of the session.
+            error = str(e) or e.__class__.__name__
+        finally:
+            self.saver.writeDone(self.path)
+        self.saver.signals.finished.emit(self.path, error)
+
+
+class AnnotationSaver(QObject):
+    """
+        Writes annotation files on a worker thread, one at a time, each
+        atomically through writeFileAtomic. Saving a path whose earlier data
+        is still queued replaces that data, so it is written once. Emits
+        saved(path) when the data is on disk or saveFailed(path, message).
+    """
+    saved = pyqtSignal(object)
+    saveFailed = pyqtSignal(object, object)
+
+    def __init__(self, parent=None):
+        super(AnnotationSaver, self).__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = SaveSignals(self)
+        self.signals.finished.connect(self.taskFinished)
+        self._lock = threading.Lock()
+        # path -> bytes not yet picked up by a task
+        self._pending = {}
+        # path -> bytes a task is writing
+        self._writing = {}
+
+    def save(self, path, data):
+        with self._lock:
+            queued = path in self._pending
+            self._pending[path] = data
+        if not queued:
+            self.pool.start(SaveTask(self, path))
+        else:
+            tracing.count('AnnotationSaver.coalesced')
+
+    def isSaving(self, path):
+        with self._lock:
+            return path in self._pending or path in self._writing
+
+    def pendingData(self, path):
+        """Return the newest data saved for path that is not on disk yet, or None."""
+        with self._lock:
+            return self._pending.get(path, self._writing.get(path))
+
+    def waitForDone(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+    def takePending(self, path):
+        with self._lock:
+            data = self._pending.pop(path, None)
+            if data is not None:
+                self._writing[path] = data
+            return data
+
+    def writeDone(self, path):
+        with self._lock:
+            self._writing.pop(path, None)
+
+    def taskFinished(self, path, error):
+        if error is None:
+            self.saved.emit(path)
+        else:
+            self.saveFailed.emit(path, error)
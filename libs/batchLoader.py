@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Headless loading of many annotation files at once, for training pipelines
+and other scripts. Nothing here imports Qt or prints.
+
+    batch = loadAnnotations('dataset/labels', processes=8)
+    arrays = batch.arrays()      # numpy columns, one row per object
+    batch.images[arrays['imageId'][0]]['path']
+"""
+import os
+from array import array
+
+from pascal_voc_io import PascalVocReader, XML_EXT
+from boxGeometry import loadNumpy
+from shapeStore import ROTATED, DIFFICULT
+
+FLOAT_COLUMNS = ('cx', 'cy', 'w', 'h', 'angle')
+
+
+def findAnnotations(folder):
+    """Return the annotation files under folder, sorted like the file list."""
+    paths = []
+    for root, dirs, files in os.walk(folder):
+        for name in files:
+            if name.lower().endswith(XML_EXT):
+                paths.append(os.path.join(root, name))
+    paths.sort(key=lambda path: path.lower())
+    return paths
+
+
+def _intOrNone(text):
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def loadAnnotation(path):
+    """
+        Parse one annotation file; returns (metadata, ShapeStore). Rows are
+        in the order the writer puts them: bndboxes, then robndboxes.
+    """
+    reader = PascalVocReader(path, streaming=True)
+    store = reader.getStore()
+    header = reader.header
+    info = {
+        'xml': path,
+        'folder': header.get('folder'),
+        'filename': header.get('filename'),
+        'path': header.get('path'),
+        'width': _intOrNone(header.get('width')),
+        'height': _intOrNone(header.get('height')),
+        'depth': _intOrNone(header.get('depth')),
+        'verified': reader.verified,
+    }
+    return info, store
+
+
+def _loadOne(path):
+    # Runs in the worker processes; errors travel back as text so one
+    # broken file does not abort the whole batch.
+    try:
+        return path, loadAnnotation(path), None
+    except Exception as e:
+        return path, None, '%s: %s' % (type(e).__name__, e)
+
+
+class AnnotationBatch(object):
+    """
+        Objects of many files as parallel arrays: imageId, labelId, cx, cy,
+        w, h, angle, difficult and rotated, one entry per object.
+        images[imageId] holds the metadata of each file along with the
+        slice of rows (start, count) it owns; labels[labelId] is the label
+        name. Files that failed to parse are listed in errors as
+        (path, message) and have no image entry.
+    """
+
+    def __init__(self):
+        self.imageId = array('i')
+        self.labelId = array('i')
+        self.cx = array('d')
+        self.cy = array('d')
+        self.w = array('d')
+        self.h = array('d')
+        self.angle = array('d')
+        self.difficult = array('B')
+        self.rotated = array('B')
+        self.images = []
+        self.labels = []
+        self.errors = []
+        self._labelIds = {}
+
+    def __len__(self):
+        return len(self.imageId)
+
+    def add(self, info, store):
+        """Append the objects of one file, read by loadAnnotation."""
+        imageId = len(self.images)
+        count = len(store)
+        info = dict(info, start=len(self), count=count)
+        self.images.append(info)
+        mapping = []
+        for label in store.labels:
+            labelId = self._labelIds.get(label)
+            if labelId is None:
+                labelId = self._labelIds[label] = len(self.labels)
+                self.labels.append(label)
+            mapping.append(labelId)
+        self.imageId.extend(array('i', [imageId]) * count)
+        self.labelId.extend(array('i', [mapping[i] for i in store.labelIds]))
+        for name in FLOAT_COLUMNS:
+            getattr(self, name).extend(getattr(store, name))
+        flags = store.flags
+        self.difficult.extend(array('B', [bool(f & DIFFICULT) for f in flags]))
+        self.rotated.extend(array('B', [bool(f & ROTATED) for f in flags]))
+
+    def arrays(self):
+        """Return the columns as a dict of numpy arrays sharing their memory."""
+        numpy = loadNumpy()
+        if numpy is None:
+            raise ImportError('AnnotationBatch.arrays() needs numpy')
+        columns = {}
+        for name in ('imageId', 'labelId') + FLOAT_COLUMNS + ('difficult', 'rotated'):
+            column = getattr(self, name)
+            dtype = {'i': numpy.int32, 'd': numpy.float64, 'B': numpy.uint8}[column.typecode]
+            columns[name] = numpy.frombuffer(column, dtype=dtype) if column \
+                else numpy.zeros(0, dtype=dtype)
+        columns['difficult'] = columns['difficult'].view(numpy.bool_)
+        columns['rotated'] = columns['rotated'].view(numpy.bool_)
+        return columns
+
+
+def loadAnnotations(paths, processes=None, chunksize=16):
+    """
+        Load a list of annotation files, or every one under a directory,
+        into an AnnotationBatch. Files are parsed in a pool of processes
+        (os.cpu_count() by default) and merged in the order given.
+        processes=1 parses in the calling process.
+    """
+    if isinstance(paths, str) and os.path.isdir(paths):
+        paths = findAnnotations(paths)
+    paths = list(paths)
+    if processes is None:
+        processes = os.cpu_count() if hasattr(os, 'cpu_count') else 1
+    processes = max(1, min(processes or 1, len(paths)))
+
+    batch = AnnotationBatch()
+    if processes == 1:
+        results = map(_loadOne, paths)
+        pool = None
+    else:
+        # Imported here as it makes up most of the import time otherwise.
+        from multiprocessing import Pool
+        pool = Pool(processes)
+        results = pool.imap(_loadOne, paths, chunksize)
+    try:
+        for path, loaded, error in results:
+            if loaded is None:
+                batch.errors.append((path, error))
+            else:
+                batch.add(*loaded)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return batch
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Rotated box geometry. A box is (cx, cy, w, h, angle) as robndbox files
+store it: its corners are those of the w x h box around (cx, cy), rotated
+by angle radians, clockwise on screen, starting from the top left one.
+
+The scalar functions work on plain floats. The functions ending in Array
+take numpy arrays, or anything numpy.asarray accepts, and work on all the
+boxes at once; they need numpy, which the rest of the tool does not. numpy
+is only imported when one of them is first called, since importing it takes
+far longer than everything else the annotation I/O needs.
+"""
+import math
+
+_numpyModule = False
+
+
+def rotatePoint(xc, yc, xp, yp, theta):
+    """Rotate (xp, yp) by -theta about (xc, yc)."""
+    xoff = xp - xc
+    yoff = yp - yc
+    cosTheta = math.cos(theta)
+    sinTheta = math.sin(theta)
+    pResx = cosTheta * xoff + sinTheta * yoff
+    pResy = - sinTheta * xoff + cosTheta * yoff
+    return xc + pResx, yc + pResy
+
+
+def boxCorners(cx, cy, w, h, angle):
+    """Return the four corners of a box as (x, y) tuples."""
+    return [rotatePoint(cx, cy, cx - w / 2, cy - h / 2, -angle),
+            rotatePoint(cx, cy, cx + w / 2, cy - h / 2, -angle),
+            rotatePoint(cx, cy, cx + w / 2, cy + h / 2, -angle),
+            rotatePoint(cx, cy, cx - w / 2, cy + h / 2, -angle)]
+
+
+def boxSides(corners):
+    """Return (w, h), the lengths of the first and second edge."""
+    (x0, y0), (x1, y1), (x2, y2) = corners[0], corners[1], corners[2]
+    return (math.sqrt((x0 - x1) ** 2 + (y0 - y1) ** 2),
+            math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2))
+
+
+def normalizeAngle(angle):
+    """Fold angle into [0, pi); a box turned half way round is the same box."""
+    return angle % math.pi
+
+
+def cornersToBox(corners):
+    """Return (cx, cy, w, h, angle) of the box with these corners."""
+    (x0, y0), (x1, y1), (x2, y2) = corners[0], corners[1], corners[2]
+    w, h = boxSides(corners)
+    angle = normalizeAngle(math.atan2(y1 - y0, x1 - x0))
+    return (x0 + x2) / 2.0, (y0 + y2) / 2.0, w, h, angle
+
+
+def envelope(points):
+    """Return the axis-aligned (x1, y1, x2, y2) around points."""
+    xs = [x for x, y in points]
+    ys = [y for x, y in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def boxEnvelope(cx, cy, w, h, angle):
+    """Return the axis-aligned (x1, y1, x2, y2) around a box."""
+    cos, sin = abs(math.cos(angle)), abs(math.sin(angle))
+    ex = (w * cos + h * sin) / 2.0
+    ey = (w * sin + h * cos) / 2.0
+    return cx - ex, cy - ey, cx + ex, cy + ey
+
+
+def pointInBox(x, y, cx, cy, w, h, angle):
+    """Whether (x, y) lies inside the box or on its edge."""
+    lx, ly = rotatePoint(cx, cy, x, y, angle)
+    return abs(lx - cx) <= w / 2.0 and abs(ly - cy) <= h / 2.0
+
+
+def angleBetween(cx, cy, x1, y1, x2, y2):
+    """
+        Return the signed angle at (cx, cy) from (x2, y2) to (x1, y1), or 0
+        when either point sits on the centre.
+    """
+    dx1, dy1 = x1 - cx, y1 - cy
+    dx2, dy2 = x2 - cx, y2 - cy
+    c = math.sqrt(dx1 * dx1 + dy1 * dy1) * math.sqrt(dx2 * dx2 + dy2 * dy2)
+    if c == 0:
+        return 0
+    angle = math.acos(max(-1.0, min(1.0, (dx1 * dx2 + dy1 * dy2) / c)))
+    return angle if dx1 * dy2 - dx2 * dy1 > 0 else -angle
+
+
+def loadNumpy():
+    """Return the numpy module, imported on first use, or None without it."""
+    global _numpyModule
+    if _numpyModule is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpyModule = numpy
+    return _numpyModule
+
+
+def _numpy():
+    np = loadNumpy()
+    if np is None:
+        raise ImportError('the batched box functions need numpy')
+    return np
+
+
+def boxCornersArray(cx, cy, w, h, angle):
+    """Return an (N, 4, 2) array of the corners of N boxes."""
+    np = _numpy()
+    cx, cy, w, h, angle = [np.asarray(a, dtype=float)
+                           for a in (cx, cy, w, h, angle)]
+    cos, sin = np.cos(angle), np.sin(angle)
+    # Corner offsets from the centre before rotation, in corner order.
+    dx = np.multiply.outer(w / 2.0, [-1.0, 1.0, 1.0, -1.0])
+    dy = np.multiply.outer(h / 2.0, [-1.0, -1.0, 1.0, 1.0])
+    cos, sin = cos[..., None], sin[..., None]
+    corners = np.empty(dx.shape + (2,))
+    corners[..., 0] = cx[..., None] + (cos * dx - sin * dy)
+    corners[..., 1] = cy[..., None] + (sin * dx + cos * dy)
+    return corners
+
+
+def cornersToBoxArray(corners):
+    """Return (cx, cy, w, h, angle) arrays for an (N, 4, 2) corner array."""
+    np = _numpy()
+    corners = np.asarray(corners, dtype=float)
+    p0, p1, p2 = corners[..., 0, :], corners[..., 1, :], corners[..., 2, :]
+    cx, cy = (p0 + p2).T / 2.0
+    w = np.hypot(*(p1 - p0).T)
+    h = np.hypot(*(p2 - p1).T)
+    angle = normalizeAngleArray(np.arctan2(p1[..., 1] - p0[..., 1],
+                                           p1[..., 0] - p0[..., 0]))
+    return cx, cy, w, h, angle
+
+
+def normalizeAngleArray(angle):
+    return _numpy().mod(angle, math.pi)
+
+
+def boxEnvelopeArray(cx, cy, w, h, angle):
+    """Return an (N, 4) array of the (x1, y1, x2, y2) around N boxes."""
+    np = _numpy()
+    cx, cy, w, h, angle = [np.asarray(a, dtype=float)
+                           for a in (cx, cy, w, h, angle)]
+    cos, sin = np.abs(np.cos(angle)), np.abs(np.sin(angle))
+    ex = (w * cos + h * sin) / 2.0
+    ey = (w * sin + h * cos) / 2.0
+    return np.stack([cx - ex, cy - ey, cx + ex, cy + ey], axis=-1)
+
+
+def pointInBoxArray(x, y, cx, cy, w, h, angle):
+    """
+        Whether each point lies inside the matching box. The arguments are
+        broadcast against each other, so one point can be tested against
+        many boxes or many points against one box.
+    """
+    np = _numpy()
+    dx = np.asarray(x, dtype=float) - cx
+    dy = np.asarray(y, dtype=float) - cy
+    cos, sin = np.cos(angle), np.sin(angle)
+    lx = cos * dx + sin * dy
+    ly = -sin * dx + cos * dy
+    return (np.abs(lx) <= np.asarray(w) / 2.0) & (np.abs(ly) <= np.asarray(h) / 2.0)
@@ -11,7 +11,12 @@ except ImportError:
 
 from shape import Shape
 from lib import distance
+from spatialIndex import SpatialGrid
+from tiledImage import TiledImage, TileCache, TILED_PIXELS
+from imageLoader import PreviewImage
+from boxGeometry import angleBetween
 import math
+import tracing
 
 CURSOR_DEFAULT = Qt.ArrowCursor
 CURSOR_POINT = Qt.PointingHandCursor
@@ -22,12 +27,18 @@ CURSOR_GRAB = Qt.OpenHandCursor
 # class Canvas(QGLWidget):
 
 
+def shapeBounds(shape):
+    rect = shape.boundingRect()
+    return (rect.left(), rect.top(), rect.right(), rect.bottom())
+
+
 class Canvas(QWidget):
     zoomRequest = pyqtSignal(int)
     scrollRequest = pyqtSignal(int, int)
     newShape = pyqtSignal()
     selectionChanged = pyqtSignal(bool)
-    shapeMoved = pyqtSignal()
+    # The shape whose geometry was just edited.
+    shapeMoved = pyqtSignal(object)
     drawingPolygon = pyqtSignal(bool)
 
     hideRRect = pyqtSignal(bool)
@@ -45,6 +56,8 @@ class Canvas(QWidget):
         # Initialise local state.
         self.mode = self.EDIT
         self.shapes = []
+        # Bounding rects of self.shapes for hover and click hit-testing.
+        self.spatialIndex = SpatialGrid()
         self.current = None
         self.selectedShape = None  # save the selected shape here
         self.selectedShapeCopy = None
@@ -54,6 +67,8 @@ class Canvas(QWidget):
         self.offsets = QPointF(), QPointF()
         self.scale = 1.0
         self.pixmap = QPixmap()
+        # Tiles of large images, shared by whichever one is loaded.
+        self.tileCache = TileCache()
         self.visible = {}
         self._hideBackround = False
         self.hideBackround = False
@@ -66,6 +81,8 @@ class Canvas(QWidget):
         # Set widget options.
         self.setMouseTracking(True)
         self.setFocusPolicy(Qt.WheelFocus)
+        # Every edit of a shape's geometry is announced by shapeMoved.
+        self.shapeMoved.connect(self.reindexEditedShapes)
         self.verified = False
         # judge can draw rotate rect
         self.canDrawRotatedRect = True
@@ -73,6 +90,9 @@ class Canvas(QWidget):
         self.hideNormal = False
         self.canOutOfBounding = False
         self.showCenter = False
+        # Shapes smaller than this many screen pixels are painted as plain
+        # outlines in one batch, without vertex handles; 0 disables it.
+        self.lodSize = 16
 
     def enterEvent(self, ev):
         self.overrideCursor(self._cursor)
@@ -106,6 +126,36 @@ class Canvas(QWidget):
     def selectedVertex(self):
         return self.hVertex is not None
 
+    def indexShape(self, shape):
+        if shape.points:
+            self.spatialIndex.insert(shape, shapeBounds(shape))
+
+    def reindexShapes(self):
+        self.spatialIndex.clear()
+        for shape in self.shapes:
+            self.indexShape(shape)
+
+    def reindexEditedShapes(self, shape):
+        if shape in self.spatialIndex:
+            self.indexShape(shape)
+
+    def shapesIn(self, rect, margin=0.0):
+        """Shapes whose bounding rect meets rect grown by margin, in paint order."""
+        if len(self.spatialIndex) != len(self.shapes):
+            self.reindexShapes()
+        return self.spatialIndex.queryRect(
+            rect.left() - margin, rect.top() - margin,
+            rect.right() + margin, rect.bottom() + margin)
+
+    def shapesAt(self, point, margin=0.0):
+        """Visible shapes whose bounding rect grown by margin holds point, topmost first."""
+        if len(self.spatialIndex) != len(self.shapes):
+            # self.shapes was changed behind our back.
+            self.reindexShapes()
+        return [shape for shape in
+                self.spatialIndex.query(point.x(), point.y(), margin)
+                if self.isVisible(shape)]
+
     def mouseMoveEvent(self, ev):
         """Update line with last point and current coordinates."""
         pos = self.transformPos(ev.pos())
@@ -117,6 +167,7 @@ class Canvas(QWidget):
 
             self.overrideCursor(CURSOR_DRAW)
             if self.current:
+                dirty = self.drawingRect()
                 color = self.lineColor
                 if self.outOfPixmap(pos):
                     # Don't allow the user to draw outside the pixmap.
@@ -131,7 +182,7 @@ class Canvas(QWidget):
                     self.current.highlightVertex(0, Shape.NEAR_VERTEX)
                 self.line[1] = pos
                 self.line.line_color = color
-                self.repaint()
+                self.update(dirty | self.drawingRect())
                 self.current.highlightClear()
                 self.status.emit("width is %d, height is %d." % (pos.x()-self.line[0].x(), pos.y()-self.line[0].y()))
             return
@@ -149,9 +200,10 @@ class Canvas(QWidget):
             #     self.selectedShapeCopy = self.selectedShape.copy()
             #     self.repaint()
             if self.selectedVertex() and self.selectedShape.isRotated:
+                dirty = self.shapeRect(self.hShape)
                 self.boundedRotateShape(pos)
-                self.shapeMoved.emit()
-                self.repaint()
+                self.shapeMoved.emit(self.hShape)
+                self.update(dirty | self.shapeRect(self.hShape))
             self.status.emit("(%d,%d)." % (pos.x(), pos.y()))
             return
 
@@ -163,14 +215,16 @@ class Canvas(QWidget):
                 #     return
                 # else:
                 # print("meiyou chujie")
+                dirty = self.shapeRect(self.hShape)
                 self.boundedMoveVertex(pos)
-                self.shapeMoved.emit()
-                self.repaint()
+                self.shapeMoved.emit(self.hShape)
+                self.update(dirty | self.shapeRect(self.hShape))
             elif self.selectedShape and self.prevPoint:
                 self.overrideCursor(CURSOR_MOVE)
+                dirty = self.shapeRect(self.selectedShape)
                 self.boundedMoveShape(self.selectedShape, pos)
-                self.shapeMoved.emit()
-                self.repaint()
+                self.shapeMoved.emit(self.selectedShape)
+                self.update(dirty | self.shapeRect(self.selectedShape))
                 self.status.emit("(%d,%d)." % (pos.x(), pos.y()))
             return
 
@@ -179,7 +233,9 @@ class Canvas(QWidget):
         # - Highlight vertex
         # Update shape/vertex fill and tooltip value accordingly.
         self.setToolTip("Image")
-        for shape in reversed([s for s in self.shapes if self.isVisible(s)]):
+        # Only the previously and newly highlighted shapes need repainting.
+        dirty = self.shapeRect(self.hShape)
+        for shape in self.shapesAt(pos, self.epsilon):
             # Look for a nearby vertex to highlight. If that fails,
             # check if we happen to be inside a shape.
             index = shape.nearestVertex(pos, self.epsilon)
@@ -191,7 +247,7 @@ class Canvas(QWidget):
                 self.overrideCursor(CURSOR_POINT)
                 # self.setToolTip("Click & drag to move point.")
                 # self.setStatusTip(self.toolTip())
-                self.update()
+                self.update(dirty | self.shapeRect(shape))
                 break
             elif shape.containsPoint(pos):
                 if self.selectedVertex():
@@ -201,12 +257,12 @@ class Canvas(QWidget):
                 #     "Click & drag to move shape '%s'" % shape.label)
                 # self.setStatusTip(self.toolTip())
                 self.overrideCursor(CURSOR_GRAB)
-                self.update()
+                self.update(dirty | self.shapeRect(shape))
                 break
         else:  # Nothing found, clear highlights, reset state.
             if self.hShape:
                 self.hShape.highlightClear()
-                self.update()
+                self.update(dirty)
             self.hVertex, self.hShape = None, None
         
         self.status.emit("(%d,%d)." % (pos.x(), pos.y()))
@@ -215,6 +271,8 @@ class Canvas(QWidget):
     def mousePressEvent(self, ev):
         pos = self.transformPos(ev.pos())
         # print('sldkfj %d %d' % (pos.x(), pos.y()))
+        hiding = self._hideBackround
+        dirty = self.shapeRect(self.selectedShape)
         if ev.button() == Qt.LeftButton:
             self.hideBackroundShapes(True)
             if self.drawing():
@@ -222,7 +280,7 @@ class Canvas(QWidget):
             else:                
                 self.selectShapePoint(pos)
                 self.prevPoint = pos
-                self.repaint()
+                self.updateHiding(hiding, dirty | self.shapeRect(self.selectedShape))
         elif ev.button() == Qt.RightButton and self.editing():
             self.selectShapePoint(pos)
             self.hideBackroundShapes(True)
@@ -231,18 +289,21 @@ class Canvas(QWidget):
             #     self.selectedShape.rotate(10)
 
             self.prevPoint = pos
-            self.repaint()
+            self.updateHiding(hiding, dirty | self.shapeRect(self.selectedShape))
 
     def mouseReleaseEvent(self, ev):  
+        hiding = self._hideBackround
         self.hideBackroundShapes(False)      
+        self.updateHiding(hiding)
         if ev.button() == Qt.RightButton and not self.selectedVertex():            
             menu = self.menus[bool(self.selectedShapeCopy)]
             self.restoreCursor()
             if not menu.exec_(self.mapToGlobal(ev.pos()))\
                and self.selectedShapeCopy:
                 # Cancel the move by deleting the shadow copy.
+                dirty = self.shapeRect(self.selectedShapeCopy)
                 self.selectedShapeCopy = None
-                self.repaint()
+                self.update(dirty)
         elif ev.button() == Qt.LeftButton and self.selectedShape:
             self.overrideCursor(CURSOR_GRAB)
         elif ev.button() == Qt.LeftButton:
@@ -253,16 +314,19 @@ class Canvas(QWidget):
     def endMove(self, copy=False):
         assert self.selectedShape and self.selectedShapeCopy
         shape = self.selectedShapeCopy
+        dirty = self.shapeRect(shape) | self.shapeRect(self.selectedShape)
         #del shape.fill_color
         #del shape.line_color
         if copy:
             self.shapes.append(shape)
+            self.indexShape(shape)
             self.selectedShape.selected = False
             self.selectedShape = shape
-            self.repaint()
         else:
             self.selectedShape.points = [p for p in shape.points]
+            self.indexShape(self.selectedShape)
         self.selectedShapeCopy = None
+        self.update(dirty)
 
     def hideBackroundShapes(self, value):
         # print("hideBackroundShapes")
@@ -271,7 +335,16 @@ class Canvas(QWidget):
             # Only hide other shapes if there is a current selection.
             # Otherwise the user will not be able to select a shape.
             self.setHiding(True)
-            self.repaint()
+
+    def updateHiding(self, hiding, dirty=None):
+        """
+            Repaint dirty, or the whole canvas if the other shapes were
+            hidden or shown since _hideBackround was hiding.
+        """
+        if self._hideBackround != hiding:
+            self.update()
+        elif dirty is not None and not dirty.isEmpty():
+            self.update(dirty)
 
     def handleDrawing(self, pos):
         if self.current and self.current.reachMaxPoints() is False:
@@ -289,12 +362,13 @@ class Canvas(QWidget):
             if self.current.isClosed():
                 self.finalise()
         elif not self.outOfPixmap(pos):
+            hiding = self._hideBackround
             self.current = Shape()
             self.current.addPoint(pos)
             self.line.points = [pos, pos]
             self.setHiding()
             self.drawingPolygon.emit(True)
-            self.update()
+            self.updateHiding(hiding, self.drawingRect())
 
     def setHiding(self, enable=True):
         self._hideBackround = self.hideBackround if enable else False
@@ -315,7 +389,7 @@ class Canvas(QWidget):
         self.selectedShape = shape
         self.setHiding()
         self.selectionChanged.emit(True)
-        self.update()
+        self.update(self.shapeRect(shape))
 
     def selectShapePoint(self, point):
         """Select the first shape created which contains this point."""
@@ -331,8 +405,8 @@ class Canvas(QWidget):
             self.selectionChanged.emit(True)
 
             return
-        for shape in reversed(self.shapes):
-            if self.isVisible(shape) and shape.containsPoint(point):
+        for shape in self.shapesAt(point):
+            if shape.containsPoint(point):
                 shape.selected = True
                 self.selectedShape = shape
                 self.calculateOffsets(shape, point)
@@ -437,22 +511,8 @@ class Canvas(QWidget):
             self.prevPoint = pos
 
     def getAngle(self, center, p1, p2):
-        dx1 = p1.x() - center.x();
-        dy1 = p1.y() - center.y();
-
-        dx2 = p2.x() - center.x();
-        dy2 = p2.y() - center.y();
-
-        c = math.sqrt(dx1*dx1 + dy1*dy1) * math.sqrt(dx2*dx2 + dy2*dy2)
-        if c == 0: return 0
-        y = (dx1*dx2+dy1*dy2)/c
-        if y>1: return 0
-        angle = math.acos(y)
-
-        if (dx1*dy2-dx2*dy1)>0:   
-            return angle
-        else:
-            return -angle
+        return angleBetween(center.x(), center.y(), p1.x(), p1.y(),
+                            p2.x(), p2.y())
 
     def boundedMoveShape(self, shape, pos):
         if shape.isRotated and self.canOutOfBounding:
@@ -518,18 +578,20 @@ class Canvas(QWidget):
 
     def deSelectShape(self):
         if self.selectedShape:
-            self.selectedShape.selected = False
+            shape = self.selectedShape
+            shape.selected = False
             self.selectedShape = None
             self.setHiding(False)
             self.selectionChanged.emit(False)
-            self.update()
+            self.update(self.shapeRect(shape))
 
     def deleteSelected(self):
         if self.selectedShape:
             shape = self.selectedShape
             self.shapes.remove(self.selectedShape)
+            self.spatialIndex.remove(shape)
             self.selectedShape = None
-            self.update()
+            self.update(self.shapeRect(shape))
             return shape
 
     def copySelectedShape(self):
@@ -540,6 +602,7 @@ class Canvas(QWidget):
             shape.selected = True
             self.selectedShape = shape
             self.boundedShiftShape(shape)
+            self.indexShape(shape)
             return shape
 
     def boundedShiftShape(self, shape):
@@ -556,6 +619,7 @@ class Canvas(QWidget):
         if not self.pixmap:
             return super(Canvas, self).paintEvent(event)
 
+        started = tracing.now()
         p = self._painter
         p.begin(self)
         p.setRenderHint(QPainter.Antialiasing)
@@ -565,16 +629,35 @@ class Canvas(QWidget):
         p.scale(self.scale, self.scale)
         p.translate(self.offsetToCenter())
 
-        p.drawPixmap(0, 0, self.pixmap)
+        # Only the part of the image under the exposed rect is drawn, and
+        # only the shapes that reach into it.
+        exposed = self.exposedRect(event.rect())
+        if isinstance(self.pixmap, (TiledImage, PreviewImage)):
+            self.pixmap.paint(p, exposed, self.scale)
+        else:
+            source = exposed.toAlignedRect().adjusted(-1, -1, 1, 1) & self.pixmap.rect()
+            if not source.isEmpty():
+                p.drawPixmap(source, self.pixmap, source)
         Shape.scale = self.scale
-        for shape in self.shapes:
+        outlines = {}
+        for shape in self.shapesIn(exposed, self.paintMargin()):
             if (shape.selected or not self._hideBackround) and self.isVisible(shape):
                 if (shape.isRotated and not self.hideRotated) or (not shape.isRotated and not self.hideNormal):
                     shape.fill = shape.selected or shape == self.hShape
-                    shape.paint(p)
+                    if not shape.fill and self.isTiny(shape):
+                        color = shape.line_color
+                        outlines.setdefault(color.rgba(), (color, []))[1].extend(
+                            shape.outlineLines())
+                    else:
+                        shape.paint(p)
                 elif self.showCenter:
                     shape.fill = shape.selected or shape == self.hShape
                     shape.paintNormalCenter(p)
+        for color, lines in outlines.values():
+            pen = QPen(color)
+            pen.setWidth(max(1, int(round(2.0 / self.scale))))
+            p.setPen(pen)
+            p.drawLines(lines)
 
         if self.current:
             self.current.paint(p)
@@ -592,11 +675,12 @@ class Canvas(QWidget):
             p.setPen(color)
             brush = QBrush(Qt.BDiagPattern)
             p.setBrush(brush)
-            p.drawRect(leftTop.x(), leftTop.y(), rectWidth, rectHeight)
+            p.drawRect(QRectF(leftTop.x(), leftTop.y(), rectWidth, rectHeight))
             
             #draw dialog line of rectangle
             p.setPen(self.lineColor)
-            p.drawLine(leftTop.x(),rightBottom.y(),rightBottom.x(),leftTop.y())
+            p.drawLine(QPointF(leftTop.x(), rightBottom.y()),
+                       QPointF(rightBottom.x(), leftTop.y()))
 
         self.setAutoFillBackground(True)
         if self.verified:
@@ -609,6 +693,50 @@ class Canvas(QWidget):
             self.setPalette(pal)
 
         p.end()
+        tracing.record('Canvas.paintEvent', started)
+
+    def exposedRect(self, rect):
+        """Map a widget rect to painter-logical (image) coordinates."""
+        s = self.scale
+        offset = self.offsetToCenter()
+        return QRectF(rect.x() / s - offset.x(), rect.y() / s - offset.y(),
+                      rect.width() / s, rect.height() / s)
+
+    def paintMargin(self):
+        """Room around a shape's outline for handles, center square and pen."""
+        return 2.0 * Shape.point_size / self.scale + 2
+
+    def widgetRect(self, rect):
+        """Map an image rect to the widget rect showing it, margin included."""
+        s = self.scale
+        offset = self.offsetToCenter()
+        m = self.paintMargin()
+        return QRectF((rect.x() - m + offset.x()) * s,
+                      (rect.y() - m + offset.y()) * s,
+                      (rect.width() + 2 * m) * s,
+                      (rect.height() + 2 * m) * s).toAlignedRect()
+
+    def shapeRect(self, shape):
+        """The widget area a shape is painted in; empty for no shape."""
+        if shape is None or not shape.points:
+            return QRect()
+        return self.widgetRect(shape.boundingRect())
+
+    def drawingRect(self):
+        """The widget area of the shape being drawn and its rubber band."""
+        points = list(self.line.points)
+        if self.current:
+            points.extend(self.current.points)
+        if not points:
+            return QRect()
+        xs = [p.x() for p in points]
+        ys = [p.y() for p in points]
+        return self.widgetRect(QRectF(QPointF(min(xs), min(ys)),
+                                      QPointF(max(xs), max(ys))))
+
+    def isTiny(self, shape):
+        rect = shape.boundingRect()
+        return max(rect.width(), rect.height()) * self.scale < self.lodSize
 
     def transformPos(self, point):
         """Convert from widget-logical coordinates to painter-logical coordinates."""
@@ -629,14 +757,17 @@ class Canvas(QWidget):
 
     def finalise(self):
         assert self.current
+        hiding = self._hideBackround
+        dirty = self.drawingRect()
         self.current.isRotated = self.canDrawRotatedRect
         # print(self.canDrawRotatedRect)
         self.current.close()
         self.shapes.append(self.current)
+        self.indexShape(self.current)
         self.current = None
         self.setHiding(False)
         self.newShape.emit()
-        self.update()
+        self.updateHiding(hiding, dirty)
 
     def closeEnough(self, p1, p2):
         #d = distance(p1 - p2)
@@ -746,22 +877,22 @@ class Canvas(QWidget):
         elif key == Qt.Key_Z and self.selectedShape and\
              self.selectedShape.isRotated and not self.rotateOutOfBound(0.1):
             self.selectedShape.rotate(0.1)
-            self.shapeMoved.emit() 
+            self.shapeMoved.emit(self.selectedShape)
             self.update()  
         elif key == Qt.Key_X and self.selectedShape and\
              self.selectedShape.isRotated and not self.rotateOutOfBound(0.01):
             self.selectedShape.rotate(0.01) 
-            self.shapeMoved.emit()
+            self.shapeMoved.emit(self.selectedShape)
             self.update()  
         elif key == Qt.Key_C and self.selectedShape and\
              self.selectedShape.isRotated and not self.rotateOutOfBound(-0.01):
             self.selectedShape.rotate(-0.01) 
-            self.shapeMoved.emit()
+            self.shapeMoved.emit(self.selectedShape)
             self.update()  
         elif key == Qt.Key_V and self.selectedShape and\
              self.selectedShape.isRotated and not self.rotateOutOfBound(-0.1):
             self.selectedShape.rotate(-0.1)
-            self.shapeMoved.emit()
+            self.shapeMoved.emit(self.selectedShape)
             self.update()
         elif key == Qt.Key_R:
             self.hideRotated = not self.hideRotated
@@ -788,36 +919,16 @@ class Canvas(QWidget):
 
     def moveOnePixel(self, direction):
         # print(self.selectedShape.points)
-        if direction == 'Left' and not self.moveOutOfBound(QPointF(-1.0, 0)):
-            # print("move Left one pixel")
-            self.selectedShape.points[0] += QPointF(-1.0, 0)
-            self.selectedShape.points[1] += QPointF(-1.0, 0)
-            self.selectedShape.points[2] += QPointF(-1.0, 0)
-            self.selectedShape.points[3] += QPointF(-1.0, 0)
-            self.selectedShape.center += QPointF(-1.0, 0)
-        elif direction == 'Right' and not self.moveOutOfBound(QPointF(1.0, 0)):
-            # print("move Right one pixel")
-            self.selectedShape.points[0] += QPointF(1.0, 0)
-            self.selectedShape.points[1] += QPointF(1.0, 0)
-            self.selectedShape.points[2] += QPointF(1.0, 0)
-            self.selectedShape.points[3] += QPointF(1.0, 0)
-            self.selectedShape.center += QPointF(1.0, 0)
-        elif direction == 'Up' and not self.moveOutOfBound(QPointF(0, -1.0)):
-            # print("move Up one pixel")
-            self.selectedShape.points[0] += QPointF(0, -1.0)
-            self.selectedShape.points[1] += QPointF(0, -1.0)
-            self.selectedShape.points[2] += QPointF(0, -1.0)
-            self.selectedShape.points[3] += QPointF(0, -1.0)
-            self.selectedShape.center += QPointF(0, -1.0)
-        elif direction == 'Down' and not self.moveOutOfBound(QPointF(0, 1.0)):
-            # print("move Down one pixel")
-            self.selectedShape.points[0] += QPointF(0, 1.0)
-            self.selectedShape.points[1] += QPointF(0, 1.0)
-            self.selectedShape.points[2] += QPointF(0, 1.0)
-            self.selectedShape.points[3] += QPointF(0, 1.0)
-            self.selectedShape.center += QPointF(0, 1.0)
-        self.shapeMoved.emit()
-        self.repaint()
+        dirty = self.shapeRect(self.selectedShape)
+        step = {'Left': QPointF(-1.0, 0), 'Right': QPointF(1.0, 0),
+                'Up': QPointF(0, -1.0), 'Down': QPointF(0, 1.0)}.get(direction)
+        if step is not None and not self.moveOutOfBound(step):
+            # Points are replaced rather than changed in place; copies of
+            # a shape share them.
+            self.selectedShape.moveBy(step)
+            self.selectedShape.center = self.selectedShape.center + step
+        self.shapeMoved.emit(self.selectedShape)
+        self.update(dirty | self.shapeRect(self.selectedShape))
 
     def moveOutOfBound(self, step):
         points = [p1+p2 for p1, p2 in zip(self.selectedShape.points, [step]*4)]
@@ -831,6 +942,7 @@ class Canvas(QWidget):
     def undoLastLine(self):
         assert self.shapes
         self.current = self.shapes.pop()
+        self.spatialIndex.remove(self.current)
         self.current.setOpen()
         self.line.points = [self.current[-1], self.current[0]]
         self.drawingPolygon.emit(True)
@@ -838,26 +950,61 @@ class Canvas(QWidget):
     def resetAllLines(self):
         assert self.shapes
         self.current = self.shapes.pop()
+        self.spatialIndex.remove(self.current)
         self.current.setOpen()
         self.line.points = [self.current[-1], self.current[0]]
         self.drawingPolygon.emit(True)
+        dirty = self.drawingRect()
         self.current = None
         self.drawingPolygon.emit(False)
+        self.update(dirty)
+
+    def imagePixmap(self, image):
+        """Return what to draw image with: a tile pyramid when it is very large."""
+        self.tileCache.clear()
+        if image.width() * image.height() > TILED_PIXELS:
+            pixmap = TiledImage(image, self.tileCache)
+            pixmap.levelsReady.connect(self.update)
+            return pixmap
+        return QPixmap.fromImage(image)
+
+    def loadImage(self, image):
+        self.loadPixmap(self.imagePixmap(image))
+
+    def loadPreview(self, preview, fullSize):
+        """Show a reduced decode of an image of fullSize until swapImage()."""
+        self.loadPixmap(PreviewImage(preview, fullSize))
+
+    def swapImage(self, image):
+        """Replace the image under the current shapes, which are kept."""
+        self.pixmap = self.imagePixmap(image)
         self.update()
 
     def loadPixmap(self, pixmap):
         self.pixmap = pixmap
         self.shapes = []
-        self.repaint()
+        self.spatialIndex.clear()
+        self.update()
 
-    def loadShapes(self, shapes):
+    def loadShapes(self, shapes, bounds=None):
+        """
+            Show shapes; bounds, if given, holds their (x1, y1, x2, y2)
+            rects, e.g. from a ShapeStore, so they are indexed without
+            building their outlines.
+        """
         self.shapes = list(shapes)
+        if bounds is None:
+            self.reindexShapes()
+        else:
+            self.spatialIndex.clear()
+            for shape, rect in zip(self.shapes, bounds):
+                self.spatialIndex.insert(shape, rect)
         self.current = None
-        self.repaint()
+        self.update()
 
     def setShapeVisible(self, shape, value):
         self.visible[shape] = value
-        self.repaint()
+        self.update()
 
     def overrideCursor(self, cursor):
         self.restoreCursor()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+On-disk index of a dataset: image size, annotation status and per-label
+object counts for every image, kept in an sqlite database so the file list
+can show badges and filter without opening any annotation file.
+
+Rows remember the mtimes of the image and of its annotation; refresh() only
+re-reads files whose mtime changed since they were indexed.
+"""
+import os
+import sqlite3
+
+from imageSize import readImageShape
+from pascal_voc_io import PascalVocReader
+
+STATUS_NONE, STATUS_ANNOTATED, STATUS_VERIFIED = range(3)
+
+SCHEMA_VERSION = 1
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS images (
+    path TEXT PRIMARY KEY,
+    image_mtime INTEGER,
+    width INTEGER,
+    height INTEGER,
+    depth INTEGER,
+    xml_path TEXT,
+    xml_mtime INTEGER,
+    verified INTEGER NOT NULL DEFAULT 0,
+    objects INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS labels (
+    path TEXT NOT NULL,
+    label TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (path, label)
+);
+CREATE INDEX IF NOT EXISTS labels_by_label ON labels (label);
+'''
+
+STATUS_NAMES = {
+    'unlabeled': STATUS_NONE,
+    'annotated': STATUS_ANNOTATED,
+    'verified': STATUS_VERIFIED,
+}
+
+
+def mtime(path):
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return getattr(st, 'st_mtime_ns', int(st.st_mtime * 1e9))
+
+
+def parseQuery(text):
+    """
+        Split file list filter text into (name text, label, status). Words
+        of the form label:NAME and is:unlabeled|annotated|verified select by
+        index contents; everything else matches file names.
+    """
+    words = []
+    label = status = None
+    for word in text.split():
+        lower = word.lower()
+        if lower.startswith('label:') and len(word) > 6:
+            label = word[6:]
+        elif lower.startswith('is:') and lower[3:] in STATUS_NAMES:
+            status = STATUS_NAMES[lower[3:]]
+        else:
+            words.append(word)
+    return u' '.join(words), label, status
+
+
+class DatasetIndex(object):
+    """
+        sqlite backed index keyed on absolute image paths. A connection
+        belongs to the thread that created it; background refreshes open
+        their own DatasetIndex on the same file.
+    """
+
+    def __init__(self, dbPath):
+        self.dbPath = dbPath
+        parent = os.path.dirname(dbPath)
+        if parent and not os.path.isdir(parent):
+            os.makedirs(parent)
+        self.conn = sqlite3.connect(dbPath, timeout=10)
+        # Readers are not blocked while a refresh is writing.
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.executescript('DROP TABLE IF EXISTS images;'
+                                    'DROP TABLE IF EXISTS labels;')
+            self.conn.execute('PRAGMA user_version=%d' % SCHEMA_VERSION)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def status(self, path, xmlPath=None):
+        """
+            Return the STATUS_* value of path, or None if it is not indexed
+            or was indexed against another annotation file than xmlPath.
+        """
+        row = self.conn.execute(
+            'SELECT xml_mtime, verified, xml_path FROM images WHERE path=?',
+            (path,)).fetchone()
+        if row is None or (xmlPath is not None and row[2] != xmlPath):
+            return None
+        if row[0] is None:
+            return STATUS_NONE
+        return STATUS_VERIFIED if row[1] else STATUS_ANNOTATED
+
+    def record(self, path):
+        """Return the indexed fields of path as a dict, or None."""
+        cursor = self.conn.execute(
+            'SELECT width, height, depth, xml_path, verified, objects '
+            'FROM images WHERE path=?', (path,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        record = dict(zip([d[0] for d in cursor.description], row))
+        record['labels'] = self.labelCounts(path)
+        return record
+
+    def labelCounts(self, path=None):
+        """Return {label: object count} for one image or the whole index."""
+        if path is None:
+            rows = self.conn.execute(
+                'SELECT label, SUM(count) FROM labels GROUP BY label')
+        else:
+            rows = self.conn.execute(
+                'SELECT label, count FROM labels WHERE path=?', (path,))
+        return dict(rows)
+
+    def paths(self, label=None, status=None):
+        """Return the set of indexed paths with the given label and status."""
+        sql = 'SELECT path FROM images'
+        where, args = [], []
+        if label is not None:
+            sql = 'SELECT DISTINCT images.path FROM images ' \
+                  'JOIN labels ON labels.path = images.path'
+            where.append('labels.label = ?')
+            args.append(label)
+        if status == STATUS_NONE:
+            where.append('xml_mtime IS NULL')
+        elif status == STATUS_ANNOTATED:
+            where.append('xml_mtime IS NOT NULL AND verified = 0')
+        elif status == STATUS_VERIFIED:
+            where.append('xml_mtime IS NOT NULL AND verified = 1')
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        return set(row[0] for row in self.conn.execute(sql, args))
+
+    def isStale(self, imagePath, xmlPath):
+        row = self.conn.execute(
+            'SELECT image_mtime, xml_path, xml_mtime FROM images WHERE path=?',
+            (imagePath,)).fetchone()
+        return row is None or row[0] != mtime(imagePath) or \
+            row[1] != xmlPath or row[2] != mtime(xmlPath)
+
+    def update(self, imagePath, xmlPath, commit=True, contents=None):
+        """
+            Re-read imagePath and its annotation file into the index. When
+            the caller already knows what the file holds, it passes contents
+            as (verified, {label: object count}) and the file is not parsed.
+        """
+        imageMtime = mtime(imagePath)
+        row = self.conn.execute(
+            'SELECT image_mtime, width, height, depth FROM images WHERE path=?',
+            (imagePath,)).fetchone()
+        if row is not None and row[0] == imageMtime:
+            shape = [row[2], row[1], row[3]]
+        else:
+            shape = readImageShape(imagePath) or [None, None, None]
+
+        xmlMtime = mtime(xmlPath)
+        verified = False
+        counts = {}
+        if xmlMtime is not None and contents is not None:
+            verified, counts = contents
+        elif xmlMtime is not None:
+            reader = PascalVocReader(xmlPath, streaming=True)
+            try:
+                counts = reader.getStore().labelCounts()
+            except Exception:
+                # A broken file still counts as annotated.
+                counts = {}
+            verified = reader.verified
+
+        self.conn.execute(
+            'INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (imagePath, imageMtime, shape[1], shape[0], shape[2], xmlPath,
+             xmlMtime, int(bool(verified)), sum(counts.values())))
+        self.conn.execute('DELETE FROM labels WHERE path=?', (imagePath,))
+        self.conn.executemany(
+            'INSERT INTO labels VALUES (?, ?, ?)',
+            [(imagePath, label, count) for label, count in counts.items()
+             if label is not None])
+        if commit:
+            self.conn.commit()
+
+    def refresh(self, items, cancelled=None, batchSize=500):
+        """
+            Bring the index up to date for (imagePath, xmlPath) pairs. Yields
+            the image paths changed by each committed batch.
+        """
+        changed = []
+        for imagePath, xmlPath in items:
+            if cancelled is not None and cancelled():
+                break
+            if not self.isStale(imagePath, xmlPath):
+                continue
+            self.update(imagePath, xmlPath, commit=False)
+            changed.append(imagePath)
+            if len(changed) >= batchSize:
+                self.conn.commit()
+                yield changed
+                changed = []
+        self.conn.commit()
+        if changed:
+            yield changed
@@ -0,0 +1,100 @@
+try:
+    from PyQt5.QtCore import *
+except ImportError:
+    from PyQt4.QtCore import *
+
+import sqlite3
+
+from datasetIndex import DatasetIndex
+from labelFile import LabelFile
+
+
+class IndexSignals(QObject):
+    # (task id, list of image paths whose index rows changed)
+    updated = pyqtSignal(int, object)
+    # (task id, completed without being cancelled)
+    finished = pyqtSignal(int, bool)
+
+
+class IndexTask(QRunnable):
+    """
+        Refreshes the dataset index for a list of images on a worker thread,
+        using its own connection to the database.
+    """
+
+    def __init__(self, taskId, dbPath, imagePaths, saveDir, signals):
+        super(IndexTask, self).__init__()
+        self.taskId = taskId
+        self.dbPath = dbPath
+        self.imagePaths = imagePaths
+        self.saveDir = saveDir
+        self.signals = signals
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def isCancelled(self):
+        return self.cancelled
+
+    def run(self):
+        items = ((path, LabelFile.annotationPath(path, self.saveDir))
+                 for path in self.imagePaths)
+        try:
+            index = DatasetIndex(self.dbPath)
+            try:
+                for changed in index.refresh(items, self.isCancelled):
+                    self.signals.updated.emit(self.taskId, changed)
+            finally:
+                index.close()
+        except (sqlite3.Error, OSError):
+            self.cancelled = True
+        self.signals.finished.emit(self.taskId, not self.cancelled)
+
+
+class DatasetIndexer(QObject):
+    """
+        Runs one IndexTask at a time; starting a refresh cancels the one in
+        progress and signals from it are ignored.
+    """
+    updated = pyqtSignal(object)
+    finished = pyqtSignal(bool)
+
+    def __init__(self, dbPath, parent=None):
+        super(DatasetIndexer, self).__init__(parent)
+        self.dbPath = dbPath
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = IndexSignals(self)
+        self.signals.updated.connect(self.onUpdated)
+        self.signals.finished.connect(self.onFinished)
+        self.taskId = 0
+        self.task = None
+
+    def refresh(self, imagePaths, saveDir=None):
+        self.cancel()
+        self.taskId += 1
+        self.task = IndexTask(self.taskId, self.dbPath, list(imagePaths),
+                              saveDir, self.signals)
+        self.pool.start(self.task)
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def isIndexing(self):
+        return self.task is not None
+
+    def waitForDone(self, msecs=-1):
+        self.cancel()
+        self.pool.waitForDone(msecs)
+
+    def onUpdated(self, taskId, paths):
+        if taskId == self.taskId and self.task is not None:
+            self.updated.emit(paths)
+
+    def onFinished(self, taskId, completed):
+        if taskId == self.taskId and self.task is not None:
+            self.task = None
+            self.finished.emit(completed)
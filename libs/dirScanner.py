@@ -0,0 +1,224 @@
+try:
+    from PyQt5.QtCore import *
+except ImportError:
+    from PyQt4.QtCore import *
+
+import hashlib
+import json
+import os
+import time
+
+try:
+    from os import scandir
+except ImportError:
+    scandir = None
+
+IMAGE_EXTENSIONS = ('.jpeg', '.jpg', '.png', '.bmp')
+SCAN_CACHE_VERSION = 1
+
+
+def dirStamp(st):
+    return getattr(st, 'st_mtime_ns', st.st_mtime)
+
+
+def listDir(dirpath):
+    """
+        Return the image files and sub directories of dirpath as one list of
+        names, sub directories marked by a trailing os.sep, sorted so that
+        walking it depth first visits paths in case-insensitive path order.
+    """
+    names = []
+    if scandir is not None:
+        for entry in scandir(dirpath):
+            try:
+                if entry.is_dir():
+                    # Like os.walk: symlinked directories are not followed.
+                    if not entry.is_symlink():
+                        names.append(entry.name + os.sep)
+                elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    names.append(entry.name)
+            except OSError:
+                continue
+    else:
+        for name in os.listdir(dirpath):
+            path = os.path.join(dirpath, name)
+            if os.path.isdir(path):
+                if not os.path.islink(path):
+                    names.append(name + os.sep)
+            elif name.lower().endswith(IMAGE_EXTENSIONS):
+                names.append(name)
+    names.sort(key=lambda x: x.lower())
+    return names
+
+
+def cachedListDir(dirpath, cache):
+    stamp = dirStamp(os.stat(dirpath))
+    cached = cache.get(dirpath) if cache is not None else None
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    names = listDir(dirpath)
+    if cache is not None:
+        cache[dirpath] = [stamp, names]
+    return names
+
+
+def iterImages(folderPath, cache=None, cancelled=None):
+    """
+        Yield absolute image paths under folderPath in the order
+        scanAllImages used to sort them. cache maps a directory to
+        [mtime, names]; listings of directories whose mtime is unchanged
+        are reused and fresh ones are written back.
+    """
+    root = os.path.abspath(folderPath)
+    try:
+        stack = [(root, iter(cachedListDir(root, cache)))]
+    except OSError:
+        return
+    while stack:
+        dirpath, names = stack[-1]
+        name = next(names, None)
+        if name is None:
+            stack.pop()
+        elif name.endswith(os.sep):
+            if cancelled is not None and cancelled():
+                return
+            subdir = os.path.join(dirpath, name[:-1])
+            try:
+                stack.append((subdir, iter(cachedListDir(subdir, cache))))
+            except OSError:
+                continue
+        else:
+            yield os.path.join(dirpath, name)
+
+
+def loadScanCache(path):
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    if data.get('version') != SCAN_CACHE_VERSION:
+        return {}
+    return data.get('dirs', {})
+
+
+def saveScanCache(path, dirs):
+    tmpPath = path + '.tmp'
+    try:
+        parent = os.path.dirname(path)
+        if not os.path.isdir(parent):
+            os.makedirs(parent)
+        with open(tmpPath, 'w') as f:
+            json.dump({'version': SCAN_CACHE_VERSION, 'dirs': dirs}, f)
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(tmpPath, path)
+    except (IOError, OSError):
+        pass
+
+
+class ScanSignals(QObject):
+    # (scan id, list of paths)
+    batchReady = pyqtSignal(int, object)
+    # (scan id, completed without being cancelled)
+    finished = pyqtSignal(int, bool)
+
+
+class ScanTask(QRunnable):
+    """
+        Walks a directory on a worker thread and emits the images found in
+        batches. The first image is sent on its own so it can be opened
+        while the rest of the tree is still being listed.
+    """
+    batchSize = 2000
+    batchInterval = 0.2
+
+    def __init__(self, scanId, folderPath, signals, cachePath=None):
+        super(ScanTask, self).__init__()
+        self.scanId = scanId
+        self.folderPath = folderPath
+        self.signals = signals
+        self.cachePath = cachePath
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def isCancelled(self):
+        return self.cancelled
+
+    def run(self):
+        cache = loadScanCache(self.cachePath) if self.cachePath else None
+        batch = []
+        sent = 0
+        lastEmit = time.time()
+        try:
+            for path in iterImages(self.folderPath, cache, self.isCancelled):
+                batch.append(path)
+                if sent == 0 or len(batch) >= self.batchSize or \
+                        time.time() - lastEmit > self.batchInterval:
+                    sent += len(batch)
+                    self.signals.batchReady.emit(self.scanId, batch)
+                    batch = []
+                    lastEmit = time.time()
+        except Exception:
+            self.cancelled = True
+        if batch and not self.cancelled:
+            self.signals.batchReady.emit(self.scanId, batch)
+        if self.cachePath and not self.cancelled:
+            saveScanCache(self.cachePath, cache)
+        self.signals.finished.emit(self.scanId, not self.cancelled)
+
+
+class DirScanner(QObject):
+    """
+        Runs one ScanTask at a time. Starting a new scan cancels the
+        previous one, and batches still in flight from it are ignored.
+    """
+    batchReady = pyqtSignal(object)
+    finished = pyqtSignal(bool)
+
+    def __init__(self, cacheDir=None, parent=None):
+        super(DirScanner, self).__init__(parent)
+        self.cacheDir = cacheDir
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = ScanSignals(self)
+        self.signals.batchReady.connect(self.onBatch)
+        self.signals.finished.connect(self.onFinished)
+        self.scanId = 0
+        self.task = None
+
+    def cachePath(self, folderPath):
+        if not self.cacheDir:
+            return None
+        key = os.path.abspath(folderPath).encode('utf-8')
+        return os.path.join(self.cacheDir, hashlib.sha1(key).hexdigest() + '.json')
+
+    def scan(self, folderPath):
+        self.cancel()
+        self.scanId += 1
+        self.task = ScanTask(self.scanId, folderPath, self.signals,
+                             self.cachePath(folderPath))
+        self.pool.start(self.task)
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def isScanning(self):
+        return self.task is not None
+
+    def waitForDone(self, msecs=-1):
+        self.cancel()
+        self.pool.waitForDone(msecs)
+
+    def onBatch(self, scanId, batch):
+        if scanId == self.scanId and self.task is not None:
+            self.batchReady.emit(batch)
+
+    def onFinished(self, scanId, completed):
+        if scanId == self.scanId and self.task is not None:
+            self.task = None
+            self.finished.emit(completed)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Append-only journal of the edits made to an image's annotations since they
+were last saved, so they can be recovered after a crash. Does not import Qt.
+
+A journal is a file of JSON lines, one record per edit:
+
+    ["b", sha1, count]                  the edits below apply to an annotation
+                                        file with this SHA-1 ('' for none)
+                                        holding count shapes
+    ["n", label, difficult, isRotated, direction, points]   shape appended
+    ["m", index, direction, points]     shape moved, resized or rotated
+    ["l", index, label, difficult]      shape relabelled
+    ["d", index]                        shape deleted
+
+index is the shape's position at that point in the order an annotation file
+lists shapes, boxes before rotated boxes, and points are its corners
+flattened to [x0, y0, ... x3, y3]. A "b" record is also written whenever the
+shapes are saved; once that save is on disk the journal is cut back to it by
+truncateJournal().
+"""
+import hashlib
+import json
+import os
+
+from pascal_voc_io import writeFileAtomic
+
+JOURNAL_EXT = '.journal'
+
+
+def journalPath(folder, imagePath):
+    key = hashlib.sha1(imagePath.encode('utf8')).hexdigest()
+    return os.path.join(folder, key + JOURNAL_EXT)
+
+
+def dataDigest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def fileDigest(path):
+    """Return the SHA-1 of the file at path, or '' if there is none."""
+    try:
+        with open(path, 'rb') as f:
+            return dataDigest(f.read())
+    except (IOError, OSError):
+        return ''
+
+
+def encodeRecords(records):
+    return ''.join(json.dumps(record, separators=(',', ':')) + '\n'
+                   for record in records)
+
+
+def readRecords(path):
+    records = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                if not isinstance(record, list) or not record:
+                    # The last line may be torn by a crash mid-write.
+                    break
+                records.append(record)
+    except (IOError, OSError):
+        pass
+    return records
+
+
+def pendingEdits(path, digest, count):
+    """
+        Return the edits in the journal at path made on top of an annotation
+        file with digest holding count shapes; [] if there are none or the
+        journal was written against other content.
+    """
+    records = readRecords(path)
+    start = None
+    for i, record in enumerate(records):
+        if record[0] == 'b' and record[1] == digest:
+            start = i
+    if start is None or records[start][2] != count:
+        return []
+    return [record for record in records[start + 1:] if record[0] != 'b']
+
+
+def truncateJournal(path):
+    """
+        Drop the records before the last "b" record, the save that has just
+        reached the disk. The file is removed if no edits follow it.
+    """
+    records = readRecords(path)
+    starts = [i for i, record in enumerate(records) if record[0] == 'b']
+    tail = records[starts[-1]:] if starts else []
+    try:
+        if len(tail) > 1:
+            writeFileAtomic(path, encodeRecords(tail).encode('ascii'))
+        else:
+            os.remove(path)
+    except (IOError, OSError):
+        pass
+
+
+class EditJournal(object):
+    """
+        Collects the records for one journal file and appends them to it in
+        a single write per flush(). A record added with the same key as the
+        one before it, like successive moves of one shape, replaces it while
+        it is still buffered.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._buffer = []
+        self._lastKey = None
+
+    def append(self, record, key=None):
+        if key is not None and key == self._lastKey and self._buffer:
+            self._buffer[-1] = record
+            return
+        self._buffer.append(record)
+        self._lastKey = key
+
+    def flush(self):
+        if not self._buffer:
+            return
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        with open(self.path, 'a') as f:
+            f.write(encodeRecords(self._buffer))
+        self._buffer = []
+        self._lastKey = None
+
+    def discard(self):
+        self._buffer = []
+        self._lastKey = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
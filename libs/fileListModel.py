@@ -0,0 +1,166 @@
+try:
+    from PyQt5.QtGui import *
+    from PyQt5.QtCore import *
+    from PyQt5.QtWidgets import *
+except ImportError:
+    from PyQt4.QtGui import *
+    from PyQt4.QtCore import *
+
+import os.path
+
+from datasetIndex import STATUS_NONE, STATUS_ANNOTATED, STATUS_VERIFIED
+from imageList import ImageList
+from lib import newIcon
+
+
+class FileListModel(QAbstractListModel):
+    """
+        List model over an ImageList. Nothing is computed per row up front:
+        names and annotation status are produced in data() for the rows the
+        view actually shows, and the status is remembered until refreshed.
+    """
+    PathRole = Qt.UserRole
+
+    def __init__(self, statusFunc=None, parent=None):
+        super(FileListModel, self).__init__(parent)
+        self.imageList = ImageList()
+        # statusFunc(path) returns one of the STATUS_* values.
+        self.statusFunc = statusFunc
+        self._status = {}
+        self._rows = None
+        self._rowOf = None
+        # The view asks for rowCount() for every row while laying out.
+        self._count = 0
+        self._filterText = u''
+        # Optional set of paths the filter is restricted to.
+        self._filterPaths = None
+        self._icons = None
+
+    def setImageList(self, imageList):
+        self.beginResetModel()
+        self.imageList = imageList
+        self._status = {}
+        self._rows = self._rowOf = None
+        self._applyFilter()
+        self.endResetModel()
+
+    def appendPaths(self, paths):
+        """Add paths to the end of the image list, inserting only new rows."""
+        start = len(self.imageList)
+        if not self.imageList.extend(paths):
+            return
+        if self._rows is None:
+            first, last = self._count, len(self.imageList) - 1
+            self.beginInsertRows(QModelIndex(), first, last)
+            self._count = len(self.imageList)
+            self.endInsertRows()
+            return
+        accept = self._filterFunc()
+        added = [i for i in range(start, len(self.imageList))
+                 if accept(self.imageList[i])]
+        if not added:
+            return
+        self.beginInsertRows(QModelIndex(), self._count,
+                             self._count + len(added) - 1)
+        for sourceRow in added:
+            self._rowOf[sourceRow] = len(self._rows)
+            self._rows.append(sourceRow)
+        self._count = len(self._rows)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._count
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        sourceRow = self.sourceRow(index.row())
+        path = self.imageList[sourceRow]
+        if role == Qt.DisplayRole:
+            return os.path.basename(path)
+        if role == Qt.ToolTipRole or role == self.PathRole:
+            return path
+        if role == Qt.DecorationRole and self.statusFunc is not None:
+            status = self._status.get(sourceRow)
+            if status is None:
+                status = self._status[sourceRow] = self.statusFunc(path)
+            return self.statusIcon(status)
+        return None
+
+    def statusIcon(self, status):
+        if self._icons is None:
+            self._icons = {STATUS_ANNOTATED: newIcon('labels'),
+                           STATUS_VERIFIED: newIcon('done')}
+        return self._icons.get(status)
+
+    def sourceRow(self, row):
+        """Map a view row to its position in the image list."""
+        if self._rows is not None:
+            return self._rows[row]
+        return row
+
+    def rowForPath(self, path):
+        """Return the view row showing path, or None if it is filtered out."""
+        sourceRow = self.imageList.get(path)
+        if sourceRow is None or self._rowOf is None:
+            return sourceRow
+        return self._rowOf.get(sourceRow)
+
+    def pathAt(self, row):
+        return self.imageList[self.sourceRow(row)]
+
+    def refresh(self, path):
+        """Forget the cached status of path and repaint its row."""
+        sourceRow = self.imageList.get(path)
+        if sourceRow is None:
+            return
+        self._status.pop(sourceRow, None)
+        row = self.rowForPath(path)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+    def refreshAll(self):
+        """Forget every cached status and repaint all rows."""
+        self._status = {}
+        if self._count:
+            self.dataChanged.emit(self.index(0), self.index(self._count - 1))
+
+    def setFilterText(self, text, paths=None):
+        """
+            Show only files whose name contains text and, when paths is
+            given, that are in the paths set.
+        """
+        text = text.strip().lower()
+        if text == self._filterText and paths is None and \
+                self._filterPaths is None:
+            return
+        self.beginResetModel()
+        self._filterText = text
+        self._filterPaths = paths
+        self._applyFilter()
+        self.endResetModel()
+
+    def _filterFunc(self):
+        text = self._filterText
+        paths = self._filterPaths
+        basename = os.path.basename
+        if paths is None:
+            return lambda path: text in basename(path).lower()
+        if not text:
+            return lambda path: path in paths
+        return lambda path: path in paths and text in basename(path).lower()
+
+    def _applyFilter(self):
+        if not self._filterText and self._filterPaths is None:
+            self._rows = self._rowOf = None
+            self._count = len(self.imageList)
+            return
+        accept = self._filterFunc()
+        self._rows = [i for i, path in enumerate(self.imageList)
+                      if accept(path)]
+        self._rowOf = dict((sourceRow, row)
+                           for row, sourceRow in enumerate(self._rows))
+        self._count = len(self._rows)
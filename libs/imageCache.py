@@ -0,0 +1,92 @@
+import os
+from collections import OrderedDict
+
+
+def fileStamp(path):
+    """Return a (mtime, size) tuple identifying the file's current content."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (getattr(st, 'st_mtime_ns', st.st_mtime), st.st_size)
+
+
+class ImageCache(object):
+    """
+        Cache of decoded images and parsed annotations bounded by an
+        approximate byte budget. Every entry remembers the stamp of the file
+        it was read from and is dropped on lookup if the file has changed.
+
+        Entries may carry their position in the image list. Once
+        currentIndex is set, eviction removes the entry farthest from it,
+        falling back to least recently used order among equals.
+    """
+
+    def __init__(self, maxBytes=512 * 1024 * 1024):
+        self.maxBytes = maxBytes
+        self.totalBytes = 0
+        self.currentIndex = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __contains__(self, path):
+        return path in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, path):
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] != fileStamp(path):
+            self.discard(path)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        del self._entries[path]
+        self._entries[path] = entry
+        return entry[1]
+
+    def put(self, path, value, nbytes, stamp, index=None):
+        if stamp is None or nbytes > self.maxBytes:
+            return
+        self.discard(path)
+        self._entries[path] = (stamp, value, nbytes, index)
+        self.totalBytes += nbytes
+        while self.totalBytes > self.maxBytes:
+            self.discard(self._victim())
+
+    def _victim(self):
+        victim, farthest = None, -1
+        for path, entry in self._entries.items():
+            index = entry[3]
+            if index is None or self.currentIndex is None:
+                distance = 0
+            else:
+                distance = abs(index - self.currentIndex)
+            if distance > farthest:
+                victim, farthest = path, distance
+        return victim
+
+    def setMaxBytes(self, maxBytes):
+        self.maxBytes = maxBytes
+        while self.totalBytes > self.maxBytes:
+            self.discard(self._victim())
+
+    def stats(self):
+        """Return a one-line summary of the hit rate and memory use."""
+        lookups = self.hits + self.misses
+        return '%d/%d hits, %.0f of %.0f MB' % (
+            self.hits, lookups, self.totalBytes / 1048576.0,
+            self.maxBytes / 1048576.0)
+
+    def discard(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.totalBytes -= entry[2]
+
+    def clear(self):
+        self._entries.clear()
+        self.totalBytes = 0
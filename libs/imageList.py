@@ -0,0 +1,63 @@
+class ImageList(object):
+    """
+        Ordered sequence of image paths with constant time path lookups.
+        It also remembers which entry is currently open, so stepping to the
+        next or previous image never scans the list.
+    """
+
+    def __init__(self, paths=()):
+        self._paths = list(paths)
+        self._indexes = dict((path, i) for i, path in enumerate(self._paths))
+        self.currentIndex = None
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __getitem__(self, index):
+        return self._paths[index]
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __contains__(self, path):
+        return path in self._indexes
+
+    def extend(self, paths):
+        """Append paths that are not in the list yet; returns how many were added."""
+        start = len(self._paths)
+        for path in paths:
+            if path not in self._indexes:
+                self._indexes[path] = len(self._paths)
+                self._paths.append(path)
+        return len(self._paths) - start
+
+    def index(self, path):
+        try:
+            return self._indexes[path]
+        except KeyError:
+            raise ValueError('%r is not in the image list' % (path,))
+
+    def get(self, path, default=None):
+        return self._indexes.get(path, default)
+
+    def setCurrent(self, path):
+        """Mark path as the open image; returns its index or None."""
+        self.currentIndex = self._indexes.get(path)
+        return self.currentIndex
+
+    def current(self):
+        if self.currentIndex is None:
+            return None
+        return self._paths[self.currentIndex]
+
+    def next(self):
+        """Return the path after the current one, the first path if none is open."""
+        index = 0 if self.currentIndex is None else self.currentIndex + 1
+        if index < len(self._paths):
+            return self._paths[index]
+        return None
+
+    def prev(self):
+        if self.currentIndex is None or self.currentIndex == 0:
+            return None
+        return self._paths[self.currentIndex - 1]
@@ -0,0 +1,154 @@
+try:
+    from PyQt5.QtGui import *
+    from PyQt5.QtCore import *
+except ImportError:
+    from PyQt4.QtGui import *
+    from PyQt4.QtCore import *
+
+import math
+
+# Smaller images are decoded in one go; a preview would not be noticeably
+# faster than the full decode.
+PREVIEW_PIXELS = 2048 * 2048
+# Formats whose readers decode less data when asked for a scaled size.
+# Others decode in full and then scale, which is slower than not asking.
+PREVIEW_FORMATS = (b'jpeg', b'jpg')
+
+
+def _reader(data):
+    buffer = QBuffer()
+    buffer.setData(QByteArray(data))
+    buffer.open(QIODevice.ReadOnly)
+    reader = QImageReader(buffer)
+    # The reader does not own the buffer.
+    reader.buffer = buffer
+    return reader
+
+
+def decodeData(data):
+    """
+        Decode an encoded image into a QImage. Unlike QImage.fromData this
+        goes through QImageReader.read, which releases the GIL while it
+        decodes, so decoding on a worker thread does not stall the GUI.
+    """
+    return _reader(data).read()
+
+
+def previewSize(data):
+    """
+        Return the full size of the encoded image in data if a reduced
+        preview decode of it is worth making, otherwise None.
+    """
+    reader = _reader(data)
+    size = reader.size()
+    if not size.isValid() or size.width() * size.height() <= PREVIEW_PIXELS:
+        return None
+    if bytes(reader.format()).lower() not in PREVIEW_FORMATS:
+        return None
+    return size
+
+
+def decodePreview(data, scale):
+    """Decode data at scale (< 1) of its full size; returns a QImage."""
+    reader = _reader(data)
+    size = reader.size()
+    reader.setScaledSize(QSize(max(1, int(math.ceil(size.width() * scale))),
+                               max(1, int(math.ceil(size.height() * scale)))))
+    return reader.read()
+
+
+class PreviewImage(object):
+    """
+        A reduced decode standing in for an image of fullSize until the full
+        resolution one arrives. It answers the size queries of QPixmap with
+        the full size, so zoom and shapes stay in image coordinates, and
+        paint() stretches the preview over them.
+    """
+
+    def __init__(self, preview, fullSize):
+        self.preview = QPixmap.fromImage(preview)
+        self.fullSize = QSize(fullSize)
+
+    def width(self):
+        return self.fullSize.width()
+
+    def height(self):
+        return self.fullSize.height()
+
+    def size(self):
+        return QSize(self.fullSize)
+
+    def rect(self):
+        return QRect(QPoint(0, 0), self.fullSize)
+
+    def isNull(self):
+        return self.preview.isNull()
+
+    def paint(self, painter, exposed, scale):
+        """Draw the part of the preview under exposed, in full image coordinates."""
+        target = exposed & QRectF(self.rect())
+        if target.isEmpty():
+            return
+        sx = float(self.preview.width()) / self.width()
+        sy = float(self.preview.height()) / self.height()
+        source = QRectF(target.x() * sx, target.y() * sy,
+                        target.width() * sx, target.height() * sy)
+        painter.drawPixmap(target, self.preview, source)
+
+
+class LoadSignals(QObject):
+    finished = pyqtSignal(int, object)
+
+
+class LoadTask(QRunnable):
+
+    def __init__(self, taskId, data, signals):
+        super(LoadTask, self).__init__()
+        self.taskId = taskId
+        self.data = data
+        self.signals = signals
+
+    def run(self):
+        self.signals.finished.emit(self.taskId, decodeData(self.data))
+
+
+class ImageLoader(QObject):
+    """
+        Decodes the full resolution image behind a preview on a worker
+        thread. Only the result of the latest load() is reported, through
+        imageReady(path, image); earlier ones are dropped.
+    """
+    imageReady = pyqtSignal(object, object)
+
+    def __init__(self, parent=None):
+        super(ImageLoader, self).__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = LoadSignals(self)
+        self.signals.finished.connect(self.taskFinished)
+        self.taskId = 0
+        self.path = None
+
+    def load(self, path, data):
+        self.cancel()
+        self.path = path
+        self.pool.start(LoadTask(self.taskId, data, self.signals))
+
+    def cancel(self):
+        self.taskId += 1
+        self.path = None
+        if hasattr(self.pool, 'clear'):
+            self.pool.clear()
+
+    def isLoading(self):
+        return self.path is not None
+
+    def waitForDone(self, msecs=-1):
+        self.cancel()
+        self.pool.waitForDone(msecs)
+
+    def taskFinished(self, taskId, image):
+        if taskId != self.taskId or self.path is None:
+            return
+        path, self.path = self.path, None
+        self.imageReady.emit(path, image)
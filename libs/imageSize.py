@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Read image width, height and depth from file headers without decoding pixels.
+
+PNG, JPEG, BMP and TIFF headers are parsed directly. Other formats go through
+QImageReader (still header only) when Qt is available; Qt is only imported
+then, so reading sizes does not require it. Results are cached per path and
+invalidated when the file's mtime or size changes.
+"""
+import os
+import struct
+
+from imageCache import fileStamp
+
+# path -> (fileStamp(path), [height, width, depth])
+_shapeCache = {}
+
+
+def readImageShape(path):
+    """
+        Return [height, width, depth] for the image at `path`, or None when
+        the size cannot be determined. depth is 1 for grayscale, 3 otherwise.
+        It comes from the header, so unlike QImage.isGrayscale() a colour
+        file whose pixels all happen to be gray still has depth 3.
+    """
+    key = fileStamp(path)
+    if key is None:
+        return None
+    cached = _shapeCache.get(path)
+    if cached is not None and cached[0] == key:
+        return list(cached[1])
+
+    try:
+        with open(path, 'rb') as f:
+            shape = parseHeader(f)
+    except (IOError, OSError, struct.error):
+        shape = None
+    if shape is None:
+        shape = readQtHeader(path)
+    if shape is not None:
+        _shapeCache[path] = (key, shape)
+        return list(shape)
+    return None
+
+
+def clearCache():
+    _shapeCache.clear()
+
+
+def parseHeader(f):
+    head = f.read(26)
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return parsePNG(f, head)
+    if head.startswith(b'\xff\xd8'):
+        return parseJPEG(f)
+    if head.startswith(b'BM'):
+        return parseBMP(f, head)
+    if head[:4] in (b'II*\x00', b'MM\x00*'):
+        return parseTIFF(f, head)
+    return None
+
+
+def isGrayPalette(data, stride):
+    for i in range(0, len(data) - 2, stride):
+        if not (data[i] == data[i + 1] == data[i + 2]):
+            return False
+    return True
+
+
+def parsePNG(f, head):
+    if head[12:16] != b'IHDR':
+        return None
+    width, height = struct.unpack('>II', head[16:24])
+    bitDepth, colorType = bytearray(head[24:26])
+    if bitDepth == 1:
+        # Qt loads these as QImage.Format_Mono, which is never grayscale.
+        return [height, width, 3]
+    if colorType in (0, 4):
+        return [height, width, 1]
+    if colorType != 3:
+        return [height, width, 3]
+    # Indexed: Qt reports grayscale when every palette entry is gray.
+    f.seek(33)
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return [height, width, 3]
+        length, kind = struct.unpack('>I4s', chunk)
+        if kind == b'PLTE':
+            palette = bytearray(f.read(length))
+            return [height, width, 1 if isGrayPalette(palette, 3) else 3]
+        if kind in (b'IDAT', b'IEND'):
+            return [height, width, 3]
+        f.seek(length + 4, os.SEEK_CUR)
+
+
+def parseJPEG(f):
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = ord(byte)
+        if marker == 0x01 or 0xd0 <= marker <= 0xd8:
+            continue
+        if marker == 0xd9:
+            return None
+        length = struct.unpack('>H', f.read(2))[0]
+        if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+            _, height, width, components = struct.unpack('>BHHB', f.read(6))
+            return [height, width, 1 if components == 1 else 3]
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def parseBMP(f, head):
+    headerSize = struct.unpack('<I', head[14:18])[0]
+    if headerSize == 12:
+        f.seek(18)
+        width, height, _, bitCount = struct.unpack('<HHHH', f.read(8))
+        colorsUsed, entrySize = 0, 3
+    else:
+        f.seek(18)
+        width, height, _, bitCount = struct.unpack('<iiHH', f.read(12))
+        f.seek(46)
+        colorsUsed = struct.unpack('<I', f.read(4))[0]
+        entrySize = 4
+    height = abs(height)
+    if bitCount == 1 or bitCount > 8:
+        return [height, width, 3]
+    f.seek(14 + headerSize)
+    palette = bytearray(f.read(entrySize * (colorsUsed or 1 << bitCount)))
+    return [height, width, 1 if isGrayPalette(palette, entrySize) else 3]
+
+
+TIFF_TYPES = {3: 'H', 4: 'I'}
+
+
+def parseTIFF(f, head):
+    order = '<' if head[:2] == b'II' else '>'
+    offset = struct.unpack(order + 'I', head[4:8])[0]
+    f.seek(offset)
+    count = struct.unpack(order + 'H', f.read(2))[0]
+    tags = {}
+    for _ in range(count):
+        tag, kind, _, value = struct.unpack(order + 'HHI4s', f.read(12))
+        if kind in TIFF_TYPES and tag in (256, 257, 258, 262, 277):
+            tags[tag] = struct.unpack(order + TIFF_TYPES[kind],
+                                      value[:struct.calcsize(TIFF_TYPES[kind])])[0]
+    if 256 not in tags or 257 not in tags:
+        return None
+    gray = tags.get(277, 1) == 1 and tags.get(258, 1) > 1 and \
+        tags.get(262) in (0, 1)
+    return [tags[257], tags[256], 1 if gray else 3]
+
+
+def qtGui():
+    """Return the QtGui module, imported on first use, or None without Qt."""
+    try:
+        from PyQt5 import QtGui
+    except ImportError:
+        try:
+            from PyQt4 import QtGui
+        except ImportError:
+            QtGui = None
+    return QtGui
+
+
+def readQtHeader(path):
+    QtGui = qtGui()
+    if QtGui is None:
+        return None
+    QImage, QImageReader = QtGui.QImage, QtGui.QImageReader
+    reader = QImageReader(path)
+    size = reader.size()
+    if not size.isValid():
+        return None
+    gray = reader.imageFormat() == getattr(QImage, 'Format_Grayscale8', None)
+    return [size.height(), size.width(), 1 if gray else 3]
+
+
+def decodeImageShape(path):
+    """
+        Return [height, width, depth] by decoding the whole image with Qt,
+        for files whose header cannot be read; None without Qt.
+    """
+    QtGui = qtGui()
+    if QtGui is None:
+        return None
+    image = QtGui.QImage()
+    image.load(path)
+    return [image.height(), image.width(), 1 if image.isGrayscale() else 3]
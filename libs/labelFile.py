@@ -1,17 +1,14 @@
 # Copyright (c) 2016 Tzutalin
 # Create by TzuTaLin <tzu.ta.lin@gmail.com>
 
-try:
-    from PyQt5.QtGui import QImage
-except ImportError:
-    from PyQt4.QtGui import QImage
-
 from base64 import b64encode, b64decode
 from pascal_voc_io import PascalVocWriter
 from pascal_voc_io import XML_EXT
+from shapeStore import ShapeStore
+from boxGeometry import boxSides, normalizeAngle
+from imageSize import readImageShape, decodeImageShape
 import os.path
 import sys
-import math
 
 class LabelFileError(Exception):
     pass
@@ -29,20 +26,31 @@ class LabelFile(object):
         self.verified = False
 
     def savePascalVocFormat(self, filename, shapes, imagePath, imageData,
-                            lineColor=None, fillColor=None, databaseSrc=None):
+                            lineColor=None, fillColor=None, databaseSrc=None,
+                            imageShape=None):
+        writer = self.pascalVocWriter(shapes, imagePath, imageShape)
+        writer.save(targetFile=filename)
+
+    def pascalVocWriter(self, shapes, imagePath, imageShape=None):
+        """Return a PascalVocWriter holding shapes, ready to save or serialise."""
         imgFolderPath = os.path.dirname(imagePath)
         imgFolderName = os.path.split(imgFolderPath)[-1]
         imgFileName = os.path.basename(imagePath)
         imgFileNameWithoutExt = os.path.splitext(imgFileName)[0]
-        # Read from file path because self.imageData might be empty if saving to
-        # Pascal format
-        image = QImage()
-        image.load(imagePath)
-        imageShape = [image.height(), image.width(),
-                      1 if image.isGrayscale() else 3]
+        # Only the image header is needed for the size; decoding the whole
+        # file is the last resort for formats the probe does not know.
+        if imageShape is None:
+            imageShape = readImageShape(imagePath)
+        if imageShape is None:
+            imageShape = decodeImageShape(imagePath)
+        if imageShape is None:
+            raise LabelFileError('Cannot read the size of %s' % imagePath)
         writer = PascalVocWriter(imgFolderName, imgFileNameWithoutExt,
                                  imageShape, localImgPath=imagePath)
         writer.verified = self.verified
+        if isinstance(shapes, ShapeStore):
+            writer.addStore(shapes)
+            shapes = ()
 
         for shape in shapes:
             points = shape['points']
@@ -61,13 +69,19 @@ class LabelFile(object):
                 robndbox = LabelFile.convertPoints2RotatedBndBox(shape)
                 writer.addRotatedBndBox(robndbox[0],robndbox[1],
                     robndbox[2],robndbox[3],robndbox[4],label,difficult)
-
-        writer.save(targetFile=filename)
-        return
+        return writer
 
     def toggleVerify(self):
         self.verified = not self.verified
 
+    @staticmethod
+    def annotationPath(imagePath, saveDir=None):
+        """Return the xml path the labels of imagePath are stored in."""
+        if saveDir is not None:
+            basename = os.path.basename(os.path.splitext(imagePath)[0])
+            return os.path.join(saveDir, basename + XML_EXT)
+        return imagePath.split(".")[0] + XML_EXT
+
     @staticmethod
     def isLabelFile(filename):
         fileSuffix = os.path.splitext(filename)[1].lower()
@@ -107,13 +121,7 @@ class LabelFile(object):
 
         cx = center.x()
         cy = center.y()
-        
-        w = math.sqrt((points[0][0]-points[1][0]) ** 2 +
-            (points[0][1]-points[1][1]) ** 2)
-
-        h = math.sqrt((points[2][0]-points[1][0]) ** 2 +
-            (points[2][1]-points[1][1]) ** 2)
-
-        angle = direction % math.pi
+        w, h = boxSides(points)
+        angle = normalizeAngle(direction)
 
         return (round(cx,4),round(cy,4),round(w,4),round(h,4),round(angle,6))
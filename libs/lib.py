@@ -1,3 +1,4 @@
+import os
 from math import sqrt
 
 try:
@@ -8,9 +9,58 @@ except ImportError:
     from PyQt4.QtGui import *
     from PyQt4.QtCore import *
 
+# Binary resource file built by `make rcc`; mapped from disk when present
+# instead of importing the generated resources.py module.
+RESOURCE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'resources.rcc')
+_resourcesLoaded = False
+
+
+def loadResources():
+    """Register the icon resources under :/ the first time they are needed."""
+    global _resourcesLoaded
+    if _resourcesLoaded:
+        return
+    if not (os.path.exists(RESOURCE_FILE) and QResource.registerResource(RESOURCE_FILE)):
+        import resources
+    _resourcesLoaded = True
+
+
+class LazyIconEngine(QIconEngine):
+    """
+        Icon engine that registers the resources and loads the named icon
+        the first time the icon is drawn, so building actions stays cheap.
+    """
+
+    def __init__(self, name):
+        super(LazyIconEngine, self).__init__()
+        self.name = name
+        self._icon = None
+
+    def icon(self):
+        if self._icon is None:
+            loadResources()
+            self._icon = QIcon(':/' + self.name)
+        return self._icon
+
+    def paint(self, painter, rect, mode, state):
+        self.icon().paint(painter, rect, Qt.AlignCenter, mode, state)
+
+    def pixmap(self, size, mode, state):
+        return self.icon().pixmap(size, mode, state)
+
+    def actualSize(self, size, mode, state):
+        return self.icon().actualSize(size, mode, state)
+
+    def availableSizes(self, mode=QIcon.Normal, state=QIcon.Off):
+        return self.icon().availableSizes(mode, state)
+
+    def clone(self):
+        return LazyIconEngine(self.name)
+
 
 def newIcon(icon):
-    return QIcon(':/' + icon)
+    return QIcon(LazyIconEngine(icon))
 
 
 def newButton(text, icon=None, slot=None):
@@ -1,39 +1,118 @@
 #!/usr/bin/env python
 # -*- coding: utf8 -*-
+import itertools
+import os
+from io import BytesIO
 import sys
 from xml.etree import ElementTree
 from xml.etree.ElementTree import Element, SubElement
 
-try:
-  from lxml import etree
-  print("running with lxml.etree")
-except ImportError:
+# The XML backend is imported on first use rather than with this module,
+# so scripts that only need the core annotation I/O start quickly, and it
+# is recorded in ETREE_BACKEND rather than printed.
+etree = None
+ETREE_BACKEND = None
+
+
+def loadEtree():
+  global etree, ETREE_BACKEND
+  if etree is not None:
+    return etree
   try:
-    # Python 2.5
-    import xml.etree.cElementTree as etree
-    print("running with cElementTree on Python 2.5+")
+    from lxml import etree
+    ETREE_BACKEND = "lxml.etree"
   except ImportError:
     try:
       # Python 2.5
-      import xml.etree.ElementTree as etree
-      print("running with ElementTree on Python 2.5+")
+      import xml.etree.cElementTree as etree
+      ETREE_BACKEND = "cElementTree"
     except ImportError:
       try:
-        # normal cElementTree install
-        import cElementTree as etree
-        print("running with cElementTree")
+        # Python 2.5
+        import xml.etree.ElementTree as etree
+        ETREE_BACKEND = "ElementTree"
       except ImportError:
         try:
+          # normal cElementTree install
+          import cElementTree as etree
+          ETREE_BACKEND = "cElementTree"
+        except ImportError:
           # normal ElementTree install
           import elementtree.ElementTree as etree
-          print("running with ElementTree")
-        except ImportError:
-          print("Failed to import ElementTree from any known place")
+          ETREE_BACKEND = "ElementTree"
+  return etree
 
-import codecs
-import math
+from shapeStore import ShapeStore, ROTATED
+import boxGeometry
+import tracing
 
 XML_EXT = '.xml'
+HEADER_TAGS = frozenset(['folder', 'filename', 'path', 'width', 'height', 'depth'])
+# Annotation files larger than this are parsed incrementally.
+STREAM_BYTES = 1024 * 1024
+
+
+def escapeText(text):
+    """
+        Escape element text the way the pretty printer does; non-ASCII
+        characters become numeric references when the result is encoded.
+    """
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    if '\r' in text:
+        # Line endings are normalised when the rough string is re-parsed.
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def textElement(indent, tag, text):
+    if not text:
+        return '%s<%s/>\n' % (indent, tag)
+    return '%s<%s>%s</%s>\n' % (indent, tag, escapeText(text), tag)
+
+_tmpNames = itertools.count()
+_replace = getattr(os, 'replace', os.rename)
+
+
+def writeFileAtomic(path, data):
+    """
+        Write data to path through a temporary file next to it that is
+        flushed to disk and renamed over path, so path always holds either
+        the old or the new content, even if the process dies mid-write.
+        An existing file keeps its permissions.
+    """
+    tmpPath = '%s.%d-%d.tmp' % (path, os.getpid(), next(_tmpNames))
+    fd = os.open(tmpPath, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0),
+                 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmpPath, os.stat(path).st_mode & 0o7777)
+        except OSError:
+            pass
+        _replace(tmpPath, path)
+    except BaseException:
+        try:
+            os.remove(tmpPath)
+        except OSError:
+            pass
+        raise
+
+def readVerified(filepath):
+    """
+        Return the verified flag of an annotation file by parsing only up to
+        its root element.
+    """
+    for event, elem in ElementTree.iterparse(filepath, events=('start',)):
+        return elem.get('verified') == 'yes'
+    return False
 
 class PascalVocWriter:
 
@@ -46,6 +125,7 @@ class PascalVocWriter:
         self.roboxlist = []
         self.localImgPath = localImgPath
         self.verified = False
+        self.stores = []
 
 
     def prettify(self, elem):
@@ -53,6 +133,7 @@ class PascalVocWriter:
             Return a pretty-printed XML string for the Element.
         """
         rough_string = ElementTree.tostring(elem, 'utf8')
+        etree = loadEtree()
         root = etree.fromstring(rough_string)
         try:
             return etree.tostring(root, pretty_print=True)
@@ -114,8 +195,39 @@ class PascalVocWriter:
         robndbox['difficult'] = difficult
         self.roboxlist.append(robndbox)
 
-    def appendObjects(self, top):
+    def addStore(self, store):
+        """Add every box of a ShapeStore, written straight from its columns."""
+        self.stores.append(store)
+
+    def iterBoxes(self):
+        """Yield (name, difficult, xmin, ymin, xmax, ymax) of the bndboxes."""
         for each_object in self.boxlist:
+            yield (each_object['name'], each_object['difficult'],
+                   each_object['xmin'], each_object['ymin'],
+                   each_object['xmax'], each_object['ymax'])
+        for store in self.stores:
+            flags = store.flags
+            for i in range(len(store)):
+                if not flags[i] & ROTATED:
+                    yield (store.label(i), store.isDifficult(i)) + store.box(i)
+
+    def iterRotatedBoxes(self):
+        """Yield (name, difficult, cx, cy, w, h, angle) of the robndboxes."""
+        for each_object in self.roboxlist:
+            yield (each_object['name'], each_object['difficult'],
+                   each_object['cx'], each_object['cy'], each_object['w'],
+                   each_object['h'], each_object['angle'])
+        for store in self.stores:
+            flags = store.flags
+            for i in range(len(store)):
+                if flags[i] & ROTATED:
+                    yield (store.label(i), store.isDifficult(i), store.cx[i],
+                           store.cy[i], store.w[i], store.h[i], store.angle[i])
+
+    def appendObjects(self, top):
+        for each_object in self.iterBoxes():
+            each_object = dict(zip(('name', 'difficult', 'xmin', 'ymin',
+                                    'xmax', 'ymax'), each_object))
             object_item = SubElement(top, 'object')
             typeItem = SubElement(object_item, 'type')
             typeItem.text = "bndbox"
@@ -148,7 +260,9 @@ class PascalVocWriter:
 
         # You Hao 2017/06/21
         # add to store robndbox
-        for each_object in self.roboxlist:
+        for each_object in self.iterRotatedBoxes():
+            each_object = dict(zip(('name', 'difficult', 'cx', 'cy', 'w', 'h',
+                                    'angle'), each_object))
             object_item = SubElement(top, 'object')
             typeItem = SubElement(object_item, 'type')
             typeItem.text = "robndbox"
@@ -181,34 +295,116 @@ class PascalVocWriter:
             angle = SubElement(robndbox, 'angle')
             angle.text = str(each_object['angle'])
 
-    def save(self, targetFile=None):
-        root = self.genXML()
-        self.appendObjects(root)
-        out_file = None
-        if targetFile is None:
-            out_file = codecs.open(
-                self.filename + XML_EXT, 'w', encoding='utf-8')
-        else:
-            out_file = codecs.open(targetFile, 'w', encoding='utf-8')
+    def toXML(self):
+        """
+            Return the indented XML document as bytes, built in one pass.
+            The output is byte for byte what prettify() produces with lxml.
+        """
+        if self.filename is None or \
+                self.foldername is None or \
+                self.imgSize is None:
+            return None
 
-        prettifyResult = self.prettify(root)
-        out_file.write(prettifyResult.decode('utf8'))
-        out_file.close()
+        depth = self.imgSize[2] if len(self.imgSize) == 3 else 1
+        parts = ['<annotation verified="%s">\n' % ('yes' if self.verified else 'no'),
+                 textElement('  ', 'folder', self.foldername),
+                 textElement('  ', 'filename', self.filename),
+                 textElement('  ', 'path', self.localImgPath),
+                 '  <source>\n',
+                 textElement('    ', 'database', self.databaseSrc),
+                 '  </source>\n'
+                 '  <size>\n'
+                 '    <width>%s</width>\n'
+                 '    <height>%s</height>\n'
+                 '    <depth>%s</depth>\n'
+                 '  </size>\n'
+                 '  <segmented>0</segmented>\n' % (self.imgSize[1], self.imgSize[0], depth)]
+        append = parts.append
+
+        height = int(self.imgSize[0])
+        width = int(self.imgSize[1])
+        for name, difficult, xmin, ymin, xmax, ymax in self.iterBoxes():
+            if int(ymax) == height or int(ymin) == 1 or \
+                    int(xmax) == width or int(xmin) == 1:
+                truncated = 1
+            else:
+                truncated = 0
+            append('  <object>\n'
+                   '    <type>bndbox</type>\n')
+            append(textElement('    ', 'name', name))
+            append('    <pose>Unspecified</pose>\n'
+                   '    <truncated>%d</truncated>\n'
+                   '    <difficult>%d</difficult>\n'
+                   '    <bndbox>\n'
+                   '      <xmin>%s</xmin>\n'
+                   '      <ymin>%s</ymin>\n'
+                   '      <xmax>%s</xmax>\n'
+                   '      <ymax>%s</ymax>\n'
+                   '    </bndbox>\n'
+                   '  </object>\n' % (truncated, bool(difficult) & 1,
+                                       xmin, ymin, xmax, ymax))
+
+        for name, difficult, cx, cy, w, h, angle in self.iterRotatedBoxes():
+            append('  <object>\n'
+                   '    <type>robndbox</type>\n')
+            append(textElement('    ', 'name', name))
+            append('    <pose>Unspecified</pose>\n'
+                   '    <truncated>0</truncated>\n'
+                   '    <difficult>%d</difficult>\n'
+                   '    <robndbox>\n'
+                   '      <cx>%s</cx>\n'
+                   '      <cy>%s</cy>\n'
+                   '      <w>%s</w>\n'
+                   '      <h>%s</h>\n'
+                   '      <angle>%s</angle>\n'
+                   '    </robndbox>\n'
+                   '  </object>\n' % (bool(difficult) & 1, cx, cy, w, h, angle))
+
+        append('</annotation>\n')
+        return ''.join(parts).encode('ascii', 'xmlcharrefreplace')
+
+    def save(self, targetFile=None):
+        with tracing.span('PascalVocWriter.save'):
+            data = self.toXML()
+            if data is None:
+                return
+            if targetFile is None:
+                targetFile = self.filename + XML_EXT
+            writeFileAtomic(targetFile, data)
 
 
 class PascalVocReader:
 
-    def __init__(self, filepath):
+    def __init__(self, filepath, streaming=False, data=None):
         # shapes type:
         # [labbel, [(x1,y1), (x2,y2), (x3,y3), (x4,y4)], color, color, difficult]
         self.shapes = []
         self.filepath = filepath
+        # Content of filepath not yet on disk, parsed instead of the file.
+        self.data = data
         self.verified = False
-        self.parseXML()
+        # Text of the folder, filename, path and size fields, filled in by
+        # iterObjects().
+        self.header = {}
+        # In streaming mode nothing is parsed up front; shapes are produced
+        # by iterShapes() and only collected when getShapes() asks for them.
+        self.streaming = streaming
+        self._parsed = False
+        if not streaming:
+            self.parseXML()
+            self._parsed = True
 
     def getShapes(self):
+        if not self._parsed:
+            self.shapes = list(self.iterShapes())
+            self._parsed = True
         return self.shapes
 
+    def source(self):
+        if self.data is not None:
+            return BytesIO(self.data)
+        return self.filepath
+
     def addShape(self, label, bndbox, difficult):
         xmin = int(bndbox.find('xmin').text)
         ymin = int(bndbox.find('ymin').text)
@@ -226,61 +422,159 @@ class PascalVocReader:
         h = float(robndbox.find('h').text)
         angle = float(robndbox.find('angle').text)
 
-        p0x,p0y = self.rotatePoint(cx,cy, cx - w/2, cy - h/2, -angle)
-        p1x,p1y = self.rotatePoint(cx,cy, cx + w/2, cy - h/2, -angle)
-        p2x,p2y = self.rotatePoint(cx,cy, cx + w/2, cy + h/2, -angle)
-        p3x,p3y = self.rotatePoint(cx,cy, cx - w/2, cy + h/2, -angle)
-
-        points = [(p0x, p0y), (p1x, p1y), (p2x, p2y), (p3x, p3y)]
+        points = self.rotatedPoints(cx, cy, w, h, angle)
         self.shapes.append((label, points, angle, True, None, None, difficult))
 
-    def rotatePoint(self, xc,yc, xp,yp, theta):        
-        xoff = xp-xc;
-        yoff = yp-yc;
+    def rotatedPoints(self, cx, cy, w, h, angle):
+        return boxGeometry.boxCorners(cx, cy, w, h, angle)
 
-        cosTheta = math.cos(theta)
-        sinTheta = math.sin(theta)
-        pResx = cosTheta * xoff + sinTheta * yoff
-        pResy = - sinTheta * xoff + cosTheta * yoff
-        # pRes = (xc + pResx, yc + pResy)
-        return xc+pResx,yc+pResy
+    def rotatePoint(self, xc,yc, xp,yp, theta):
+        return boxGeometry.rotatePoint(xc, yc, xp, yp, theta)
 
     def parseXML(self):
+        with tracing.span('PascalVocReader.parseXML'):
+            assert self.filepath.endswith(XML_EXT), "Unsupport file format"
+            parser = loadEtree().XMLParser(encoding='utf-8')
+            xmltree = ElementTree.parse(self.source(), parser=parser).getroot()
+            filename = xmltree.find('filename').text
+            try:
+                verified = xmltree.attrib['verified']
+                if verified == 'yes':
+                    self.verified = True
+            except KeyError:
+                self.verified = False
+
+            for object_iter in xmltree.findall('object'):
+                typeItem = object_iter.find('type')
+
+                # print(typeItem.text)
+                if typeItem.text == 'bndbox':
+                    bndbox = object_iter.find("bndbox")
+                    label = object_iter.find('name').text
+                    # Add chris
+                    difficult = False
+                    if object_iter.find('difficult') is not None:
+                        difficult = bool(int(object_iter.find('difficult').text))
+                    self.addShape(label, bndbox, difficult)
+
+                # You Hao 2017/06/21
+                # add to load robndbox
+                elif typeItem.text == 'robndbox':
+                    robndbox = object_iter.find('robndbox')
+                    label = object_iter.find('name').text
+                    difficult = False
+                    if object_iter.find('difficult') is not None:
+                        difficult = bool(int(object_iter.find('difficult').text))
+                    self.addRotatedShape(label, robndbox, difficult)
+                
+                else: 
+                    pass
+
+            return True
+
+    def iterObjects(self):
+        """
+            Yield (type, label, difficult, box fields) for every bndbox or
+            robndbox object. Files up to STREAM_BYTES are parsed whole, which
+            is several times faster; larger ones are parsed incrementally and
+            each <object> element is dropped from the tree once it has been
+            read, so memory stays flat regardless of the object count.
+        """
         assert self.filepath.endswith(XML_EXT), "Unsupport file format"
-        parser = etree.XMLParser(encoding='utf-8')
-        xmltree = ElementTree.parse(self.filepath, parser=parser).getroot()
-        filename = xmltree.find('filename').text
-        try:
-            verified = xmltree.attrib['verified']
-            if verified == 'yes':
-                self.verified = True
-        except KeyError:
-            self.verified = False
-
-        for object_iter in xmltree.findall('object'):
-            typeItem = object_iter.find('type')
-
-            # print(typeItem.text)
-            if typeItem.text == 'bndbox':
-                bndbox = object_iter.find("bndbox")
-                label = object_iter.find('name').text
-                # Add chris
-                difficult = False
-                if object_iter.find('difficult') is not None:
-                    difficult = bool(int(object_iter.find('difficult').text))
-                self.addShape(label, bndbox, difficult)
-
-            # You Hao 2017/06/21
-            # add to load robndbox
-            elif typeItem.text == 'robndbox':
-                robndbox = object_iter.find('robndbox')
-                label = object_iter.find('name').text
-                difficult = False
-                if object_iter.find('difficult') is not None:
-                    difficult = bool(int(object_iter.find('difficult').text))
-                self.addRotatedShape(label, robndbox, difficult)
-            
-            else: 
-                pass
-
-        return True
+        if self.data is not None:
+            size = len(self.data)
+        else:
+            size = os.path.getsize(self.filepath)
+        if size <= STREAM_BYTES:
+            objects = self._treeObjects()
+        else:
+            objects = self._streamObjects()
+        for elem in objects:
+            fields = {}
+            box = None
+            for child in elem:
+                if child.tag == 'bndbox' or child.tag == 'robndbox':
+                    box = dict((c.tag, c.text) for c in child)
+                else:
+                    fields[child.tag] = child.text
+            typeText = fields.get('type')
+            if box is None or typeText not in ('bndbox', 'robndbox'):
+                continue
+            difficult = False
+            if fields.get('difficult') is not None:
+                difficult = bool(int(fields['difficult']))
+            yield typeText, fields.get('name'), difficult, box
+
+    def _treeObjects(self):
+        parser = loadEtree().XMLParser(encoding='utf-8')
+        root = ElementTree.parse(self.source(), parser=parser).getroot()
+        self.verified = root.get('verified') == 'yes'
+        for elem in root:
+            if elem.tag == 'object':
+                yield elem
+                continue
+            for child in elem.iter():
+                if child.tag in HEADER_TAGS:
+                    self.header[child.tag] = child.text
+
+    def _streamObjects(self):
+        root = None
+        inObject = False
+        for event, elem in ElementTree.iterparse(self.source(),
+                                                 events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                    self.verified = elem.get('verified') == 'yes'
+                elif elem.tag == 'object':
+                    inObject = True
+                continue
+            if elem.tag != 'object':
+                if not inObject and elem.tag in HEADER_TAGS:
+                    self.header[elem.tag] = elem.text
+                continue
+            inObject = False
+            yield elem
+            # Release the consumed object and everything before it.
+            root.clear()
+
+    def iterShapes(self):
+        """
+            Yield shapes one by one, in the order of iterObjects(): files
+            larger than STREAM_BYTES are parsed incrementally as the shapes
+            are consumed, smaller ones are parsed whole first.
+        """
+        for typeText, label, difficult, box in self.iterObjects():
+            if typeText == 'bndbox':
+                xmin = int(box['xmin'])
+                ymin = int(box['ymin'])
+                xmax = int(box['xmax'])
+                ymax = int(box['ymax'])
+                points = [(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)]
+                yield (label, points, 0, False, None, None, difficult)
+            else:
+                cx = float(box['cx'])
+                cy = float(box['cy'])
+                w = float(box['w'])
+                h = float(box['h'])
+                angle = float(box['angle'])
+                yield (label, self.rotatedPoints(cx, cy, w, h, angle), angle,
+                       True, None, None, difficult)
+
+    def getStore(self):
+        """
+            Parse the file straight into a ShapeStore, without building the
+            point lists and tuples of getShapes().
+        """
+        store = ShapeStore()
+        with tracing.span('PascalVocReader.getStore'):
+            for typeText, label, difficult, box in self.iterObjects():
+                if typeText == 'bndbox':
+                    store.appendBox(int(box['xmin']), int(box['ymin']),
+                                    int(box['xmax']), int(box['ymax']),
+                                    label, difficult)
+                else:
+                    store.append(float(box['cx']), float(box['cy']),
+                                 float(box['w']), float(box['h']),
+                                 float(box['angle']), label, True, difficult)
+        return store
@@ -0,0 +1,130 @@
+try:
+    from PyQt5.QtGui import *
+    from PyQt5.QtCore import *
+except ImportError:
+    from PyQt4.QtGui import *
+    from PyQt4.QtCore import *
+
+import os.path
+
+from imageCache import ImageCache, fileStamp
+from imageLoader import decodeData
+from pascal_voc_io import PascalVocReader
+
+def imageBytes(image):
+    try:
+        return image.sizeInBytes()
+    except AttributeError:
+        return image.byteCount()
+
+
+def annotationBytes(store):
+    return store.nbytes()
+
+
+def decodeImage(path):
+    """Read and decode an image file; returns (stamp, data, image) or None."""
+    stamp = fileStamp(path)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except (IOError, OSError):
+        return None
+    image = decodeData(data)
+    if image.isNull():
+        return None
+    return stamp, data, image
+
+
+def parseAnnotation(xmlPath):
+    """Parse an annotation file; returns (stamp, (store, verified)) or None."""
+    if not xmlPath or not os.path.isfile(xmlPath):
+        return None
+    stamp = fileStamp(xmlPath)
+    reader = PascalVocReader(xmlPath, streaming=True)
+    store = reader.getStore()
+    return stamp, (store, reader.verified)
+
+
+class PrefetchSignals(QObject):
+    finished = pyqtSignal(object)
+
+
+class PrefetchTask(QRunnable):
+
+    def __init__(self, imagePath, xmlPath, index, signals):
+        super(PrefetchTask, self).__init__()
+        self.imagePath = imagePath
+        self.xmlPath = xmlPath
+        self.index = index
+        self.signals = signals
+
+    def run(self):
+        try:
+            image = decodeImage(self.imagePath)
+            annotation = parseAnnotation(self.xmlPath)
+        except Exception:
+            image = annotation = None
+        self.signals.finished.emit((self.imagePath, self.xmlPath, self.index,
+                                    image, annotation))
+
+
+class Prefetcher(QObject):
+    """
+        Decodes images around the current one on a thread pool and keeps
+        them, along with their parsed annotations, in an ImageCache.
+        Results are stored from the GUI thread, so the cache needs no lock.
+    """
+
+    def __init__(self, cache=None, ahead=2, behind=1, parent=None):
+        super(Prefetcher, self).__init__(parent)
+        self.cache = cache if cache is not None else ImageCache()
+        self.ahead = ahead
+        self.behind = behind
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.pending = set()
+        self.signals = PrefetchSignals(self)
+        self.signals.finished.connect(self.taskFinished)
+
+    def prefetch(self, imageList, index, annotationPath):
+        """
+            Queue the `ahead` images after and the `behind` images before
+            imageList[index]. annotationPath maps an image path to the path
+            of its annotation file, or None.
+        """
+        self.cancel()
+        order = [index + i for i in range(1, self.ahead + 1)] + \
+                [index - i for i in range(1, self.behind + 1)]
+        for i in order:
+            if not 0 <= i < len(imageList):
+                continue
+            path = imageList[i]
+            if path in self.pending or path in self.cache:
+                continue
+            self.pending.add(path)
+            self.pool.start(PrefetchTask(path, annotationPath(path), i,
+                                         self.signals))
+
+    def cancel(self):
+        """Drop queued tasks that have not started yet."""
+        if hasattr(self.pool, 'clear'):
+            self.pool.clear()
+        # Tasks still running may be queued again; that only costs a decode.
+        self.pending.clear()
+
+    def waitForDone(self, msecs=-1):
+        self.cancel()
+        self.pool.waitForDone(msecs)
+
+    def taskFinished(self, result):
+        imagePath, xmlPath, index, image, annotation = result
+        self.pending.discard(imagePath)
+        if image is not None:
+            stamp, data, qimage = image
+            self.cache.put(imagePath, (data, qimage),
+                           imageBytes(qimage) + len(data), stamp, index)
+        if annotation is not None:
+            stamp, value = annotation
+            self.cache.put(xmlPath, value, annotationBytes(value[0]), stamp,
+                           index)
@@ -10,6 +10,7 @@ except ImportError:
     from PyQt4.QtCore import *
 
 from lib import distance
+import boxGeometry
 import math
 
 DEFAULT_LINE_COLOR = QColor(0, 255, 0, 128)
@@ -25,10 +26,17 @@ class Shape(object):
 
     MOVE_VERTEX, NEAR_VERTEX = range(2)
 
+    __slots__ = ('label', '_points', 'fill', 'selected', 'difficult',
+                 'direction', 'center', 'isRotated', '_closed',
+                 '_line_color', '_fill_color',
+                 '_highlightIndex', '_highlightMode',
+                 '_path', '_lines', '_boundingRect', '_vertexPath',
+                 '_vertexPathKey')
+
     # The following class variables influence the drawing
     # of _all_ shape objects.
-    line_color = DEFAULT_LINE_COLOR
-    fill_color = DEFAULT_FILL_COLOR
+    default_line_color = DEFAULT_LINE_COLOR
+    default_fill_color = DEFAULT_FILL_COLOR
     select_line_color = DEFAULT_SELECT_LINE_COLOR
     select_fill_color = DEFAULT_SELECT_FILL_COLOR
     vertex_fill_color = DEFAULT_VERTEX_FILL_COLOR
@@ -36,9 +44,21 @@ class Shape(object):
     point_type = P_ROUND
     point_size = 8
     scale = 1.0
+    # Size factor and handle type of a highlighted vertex, by mode.
+    _highlightSettings = {
+        NEAR_VERTEX: (4, P_ROUND),
+        MOVE_VERTEX: (1.5, P_SQUARE),
+    }
 
     def __init__(self, label=None, line_color=None,difficult = False):
         self.label = label
+        # Geometry derived from the points, built on first use and dropped
+        # by invalidate() whenever the points change.
+        self._path = None
+        self._lines = None
+        self._boundingRect = None
+        self._vertexPath = None
+        self._vertexPathKey = None
         self.points = []
         self.fill = False
         self.selected = False
@@ -50,39 +70,67 @@ class Shape(object):
 
         self._highlightIndex = None
         self._highlightMode = self.NEAR_VERTEX
-        self._highlightSettings = {
-            self.NEAR_VERTEX: (4, self.P_ROUND),
-            self.MOVE_VERTEX: (1.5, self.P_SQUARE),
-        }
 
         self._closed = False
 
-        if line_color is not None:
-            # Override the class line_color attribute
-            # with an object attribute. Currently this
-            # is used for drawing the pending line a different color.
-            self.line_color = line_color
-
+        # Colours left at None follow the class defaults. Currently an
+        # override is used for drawing the pending line a different color.
+        self._line_color = line_color
+        self._fill_color = None
+
+    @property
+    def line_color(self):
+        if self._line_color is None:
+            return Shape.default_line_color
+        return self._line_color
+
+    @line_color.setter
+    def line_color(self, color):
+        self._line_color = color
+
+    @property
+    def fill_color(self):
+        if self._fill_color is None:
+            return Shape.default_fill_color
+        return self._fill_color
+
+    @fill_color.setter
+    def fill_color(self, color):
+        self._fill_color = color
+
+    @property
+    def points(self):
+        return self._points
+
+    @points.setter
+    def points(self, points):
+        self._points = points
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget the cached paths; call after changing the points in place."""
+        self._path = None
+        self._lines = None
+        self._boundingRect = None
+        self._vertexPath = None
 
     def rotate(self, theta):
         for i, p in enumerate(self.points):
             self.points[i] = self.rotatePoint(p, theta)
+        self.invalidate()
         self.direction -= theta
         self.direction = self.direction % (2 * math.pi)
 
     def rotatePoint(self, p, theta):
-        order = p-self.center;
-        cosTheta = math.cos(theta)
-        sinTheta = math.sin(theta)
-        pResx = cosTheta * order.x() + sinTheta * order.y()
-        pResy = - sinTheta * order.x() + cosTheta * order.y()
-        pRes = QPointF(self.center.x() + pResx, self.center.y() + pResy)
-        return pRes
+        x, y = boxGeometry.rotatePoint(self.center.x(), self.center.y(),
+                                       p.x(), p.y(), theta)
+        return QPointF(x, y)
 
     def close(self):
         self.center = QPointF((self.points[0].x()+self.points[2].x()) / 2, (self.points[0].y()+self.points[2].y()) / 2)
         # print("refresh center!")
         self._closed = True
+        self.invalidate()
 
     def reachMaxPoints(self):
         if len(self.points) >= 4:
@@ -94,9 +142,11 @@ class Shape(object):
             self.close()
         else:
             self.points.append(point)
+            self.invalidate()
 
     def popPoint(self):
         if self.points:
+            self.invalidate()
             return self.points.pop()
         return None
 
@@ -105,6 +155,7 @@ class Shape(object):
 
     def setOpen(self):
         self._closed = False
+        self.invalidate()
 
     def paint(self, painter):
         if self.points:
@@ -114,21 +165,8 @@ class Shape(object):
             pen.setWidth(max(1, int(round(2.0 / self.scale))))
             painter.setPen(pen)
 
-            line_path = QPainterPath()
-            vrtx_path = QPainterPath()
-
-            line_path.moveTo(self.points[0])
-            # Uncommenting the following line will draw 2 paths
-            # for the 1st vertex, and make it non-filled, which
-            # may be desirable.
-            #self.drawVertex(vrtx_path, 0)
-
-            for i, p in enumerate(self.points):
-                line_path.lineTo(p)
-                # print('shape paint points (%d, %d)' % (p.x(), p.y()))
-                self.drawVertex(vrtx_path, i)
-            if self.isClosed():
-                line_path.lineTo(self.points[0])
+            line_path = self.outlinePath()
+            vrtx_path = self.vertexPath()
 
             # dir_path = QPainterPath()
             # tempP = self.points[0]+QPointF(10,10)
@@ -137,9 +175,10 @@ class Shape(object):
             # dir_path.lineTo(tempP + QPointF(10, (10-tempP.x())* math.tan(self.direction)+tempP.y()))
             # painter.drawPath(dir_path)
 
+            vertex_fill_color = self.vertexFillColor()
             painter.drawPath(line_path)
             painter.drawPath(vrtx_path)
-            painter.fillPath(vrtx_path, self.vertex_fill_color)
+            painter.fillPath(vrtx_path, vertex_fill_color)
             if self.fill:
                 color = self.select_fill_color if self.selected else self.fill_color
                 painter.fillPath(line_path, color)
@@ -150,7 +189,7 @@ class Shape(object):
                 center_path.addRect(self.center.x() - d / 2, self.center.y() - d / 2, d, d)
                 painter.drawPath(center_path)
                 if self.isRotated:
-                    painter.fillPath(center_path, self.vertex_fill_color)
+                    painter.fillPath(center_path, vertex_fill_color)
                 else:
                     painter.fillPath(center_path, QColor(0, 0, 0))
 
@@ -170,10 +209,6 @@ class Shape(object):
         if i == self._highlightIndex:
             size, shape = self._highlightSettings[self._highlightMode]
             d *= size
-        if self._highlightIndex is not None:
-            self.vertex_fill_color = self.hvertex_fill_color
-        else:
-            self.vertex_fill_color = Shape.vertex_fill_color
         if shape == self.P_SQUARE:
             path.addRect(point.x() - d / 2, point.y() - d / 2, d, d)
         elif shape == self.P_ROUND:
@@ -190,7 +225,7 @@ class Shape(object):
         return None
 
     def containsPoint(self, point):
-        return self.makePath().contains(point)
+        return self.outlinePath().contains(point)
 
     def makePath(self):
         path = QPainterPath(self.points[0])
@@ -198,14 +233,59 @@ class Shape(object):
             path.lineTo(p)
         return path
 
+    def outlinePath(self):
+        """The outline as painted, closed once the shape is closed."""
+        if self._path is None:
+            path = QPainterPath()
+            path.moveTo(self.points[0])
+            for p in self.points:
+                path.lineTo(p)
+            if self.isClosed():
+                path.lineTo(self.points[0])
+            self._path = path
+        return self._path
+
+    def outlineLines(self):
+        """The edges of the outline as QLineF, for batched drawLines calls."""
+        if self._lines is None:
+            points = self.points
+            count = len(points) if self.isClosed() else len(points) - 1
+            self._lines = [QLineF(points[i], points[(i + 1) % len(points)])
+                           for i in range(count)]
+        return self._lines
+
+    def vertexPath(self):
+        """Handles for every vertex at the current scale and highlight."""
+        key = (self.scale, self.point_size, self.point_type,
+               self._highlightIndex, self._highlightMode)
+        if self._vertexPath is None or self._vertexPathKey != key:
+            path = QPainterPath()
+            # Uncommenting the following line will draw 2 paths
+            # for the 1st vertex, and make it non-filled, which
+            # may be desirable.
+            #self.drawVertex(path, 0)
+            for i in range(len(self.points)):
+                self.drawVertex(path, i)
+            self._vertexPath = path
+            self._vertexPathKey = key
+        return self._vertexPath
+
+    def vertexFillColor(self):
+        if self._highlightIndex is not None:
+            return self.hvertex_fill_color
+        return self.vertex_fill_color
+
     def boundingRect(self):
-        return self.makePath().boundingRect()
+        if self._boundingRect is None:
+            self._boundingRect = self.outlinePath().boundingRect()
+        return self._boundingRect
 
     def moveBy(self, offset):
         self.points = [p + offset for p in self.points]
 
     def moveVertexBy(self, i, offset):
         self.points[i] = self.points[i] + offset
+        self.invalidate()
 
     def highlightVertex(self, i, action):
         self._highlightIndex = i
@@ -215,21 +295,30 @@ class Shape(object):
         self._highlightIndex = None
 
     def copy(self):
-        shape = Shape("%s" % self.label)
-        shape.points = [p for p in self.points]
-        
-        shape.center = self.center
-        shape.direction = self.direction
-        shape.isRotated = self.isRotated
-
+        """
+            Return a copy of the shape. Shapes replace their points rather
+            than change them in place, so the copy shares the QPointF
+            objects and the cached geometry.
+        """
+        shape = Shape.__new__(Shape)
+        shape.label = "%s" % self.label
+        shape._points = list(self._points)
         shape.fill = self.fill
         shape.selected = self.selected
+        shape.difficult = self.difficult
+        shape.direction = self.direction
+        shape.center = self.center
+        shape.isRotated = self.isRotated
         shape._closed = self._closed
-        if self.line_color != Shape.line_color:
-            shape.line_color = self.line_color
-        if self.fill_color != Shape.fill_color:
-            shape.fill_color = self.fill_color
-        shape.difficult = self.difficult 
+        shape._line_color = self._line_color
+        shape._fill_color = self._fill_color
+        shape._highlightIndex = None
+        shape._highlightMode = self.NEAR_VERTEX
+        shape._path = self._path
+        shape._lines = self._lines
+        shape._boundingRect = self._boundingRect
+        shape._vertexPath = None
+        shape._vertexPathKey = None
         return shape
 
     def __len__(self):
@@ -240,3 +329,4 @@ class Shape(object):
 
     def __setitem__(self, key, value):
         self.points[key] = value
+        self.invalidate()
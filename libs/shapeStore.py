@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Column store of annotation boxes: one typed array per field instead of a
+tuple, dict or Shape per object.
+"""
+from array import array
+
+from boxGeometry import (boxCorners, boxEnvelopeArray, boxSides, envelope,
+                         loadNumpy, normalizeAngle)
+
+ROTATED = 1
+DIFFICULT = 2
+# Below this many boxes, importing numpy takes longer than the loop it
+# would replace.
+NUMPY_MIN_BOXES = 50000
+
+
+class ShapeStore(object):
+    """
+        Boxes as parallel arrays of centre, size, angle, label id and flags.
+        Axis-aligned boxes have angle 0 and no ROTATED flag; they are kept
+        as the whole-pixel box written to the file. Label names are stored
+        once in self.labels and referred to by index.
+
+        The columns are array.array objects; arrays() wraps them in numpy
+        arrays without a copy where numpy is available.
+    """
+
+    def __init__(self):
+        self.cx = array('d')
+        self.cy = array('d')
+        self.w = array('d')
+        self.h = array('d')
+        self.angle = array('d')
+        self.labelIds = array('i')
+        self.flags = array('B')
+        self.labels = []
+        self._labelIds = {}
+
+    def __len__(self):
+        return len(self.flags)
+
+    def labelId(self, label):
+        labelId = self._labelIds.get(label)
+        if labelId is None:
+            labelId = self._labelIds[label] = len(self.labels)
+            self.labels.append(label)
+        return labelId
+
+    def append(self, cx, cy, w, h, angle, label, rotated=False, difficult=False):
+        self.cx.append(cx)
+        self.cy.append(cy)
+        self.w.append(w)
+        self.h.append(h)
+        self.angle.append(angle)
+        self.labelIds.append(self.labelId(label))
+        self.flags.append((ROTATED if rotated else 0) |
+                          (DIFFICULT if difficult else 0))
+
+    def appendBox(self, xmin, ymin, xmax, ymax, label, difficult=False):
+        self.append((xmin + xmax) / 2.0, (ymin + ymax) / 2.0,
+                    xmax - xmin, ymax - ymin, 0.0, label, False, difficult)
+
+    def appendShape(self, shape):
+        """
+            Add a canvas Shape the way it is saved: rotated boxes by their
+            centre, side lengths and direction, others as the whole-pixel
+            box around their points, clamped to start at 1.
+        """
+        points = [(p.x(), p.y()) for p in shape.points]
+        if shape.isRotated:
+            w, h = boxSides(points)
+            center = shape.center
+            self.append(round(center.x(), 4), round(center.y(), 4),
+                        round(w, 4), round(h, 4),
+                        round(normalizeAngle(shape.direction), 6),
+                        shape.label, True, shape.difficult)
+            return
+        xmin, ymin, xmax, ymax = envelope(points)
+        # Martin Kersner, 2015/11/12
+        # 0-valued coordinates of BB caused an error while
+        # training faster-rcnn object detector.
+        self.appendBox(int(max(1, xmin)), int(max(1, ymin)),
+                       int(xmax), int(ymax), shape.label, shape.difficult)
+
+    @classmethod
+    def fromShapes(cls, shapes):
+        store = cls()
+        for shape in shapes:
+            store.appendShape(shape)
+        return store
+
+    def label(self, i):
+        return self.labels[self.labelIds[i]]
+
+    def isRotated(self, i):
+        return bool(self.flags[i] & ROTATED)
+
+    def isDifficult(self, i):
+        return bool(self.flags[i] & DIFFICULT)
+
+    def box(self, i):
+        """Return (xmin, ymin, xmax, ymax) of an axis-aligned box."""
+        cx, cy, w, h = self.cx[i], self.cy[i], self.w[i], self.h[i]
+        return (int(cx - w / 2.0), int(cy - h / 2.0),
+                int(cx + w / 2.0), int(cy + h / 2.0))
+
+    def corners(self, i):
+        """Return the four corners, clockwise from the top left one."""
+        if not self.flags[i] & ROTATED:
+            xmin, ymin, xmax, ymax = self.box(i)
+            return [(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)]
+        return boxCorners(self.cx[i], self.cy[i], self.w[i], self.h[i],
+                          self.angle[i])
+
+    def bounds(self, i):
+        """Return the axis-aligned (x1, y1, x2, y2) around box i."""
+        return envelope(self.corners(i))
+
+    def arrays(self):
+        """Return the cx, cy, w, h and angle columns as numpy arrays."""
+        numpy = loadNumpy()
+        return [numpy.frombuffer(column, dtype=numpy.float64) if column else
+                numpy.zeros(0) for column in
+                (self.cx, self.cy, self.w, self.h, self.angle)]
+
+    def envelopes(self):
+        """
+            Return the bounds() of every box, computed in one go with numpy
+            for large stores.
+        """
+        if len(self) < NUMPY_MIN_BOXES or loadNumpy() is None:
+            return [self.bounds(i) for i in range(len(self))]
+        return [tuple(rect) for rect in boxEnvelopeArray(*self.arrays()).tolist()]
+
+    def tuples(self):
+        """
+            Yield boxes in the tuple format of PascalVocReader.getShapes:
+            (label, points, angle, isRotated, None, None, difficult).
+        """
+        for i in range(len(self)):
+            rotated = self.isRotated(i)
+            yield (self.label(i), self.corners(i),
+                   self.angle[i] if rotated else 0, rotated, None, None,
+                   self.isDifficult(i))
+
+    def labelCounts(self):
+        counts = [0] * len(self.labels)
+        for labelId in self.labelIds:
+            counts[labelId] += 1
+        return dict(zip(self.labels, counts))
+
+    def nbytes(self):
+        """Approximate memory held by the columns and label table."""
+        columns = (self.cx, self.cy, self.w, self.h, self.angle,
+                   self.labelIds, self.flags)
+        return sum(column.itemsize * len(column) for column in columns) + \
+            sum(64 + len(label or '') for label in self.labels)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Uniform grid over axis-aligned bounding rectangles, used by the canvas to
+find the shapes near the cursor without testing every shape.
+"""
+import math
+
+
+class SpatialGrid(object):
+    """
+        Buckets items by the grid cells their bounding rect (x1, y1, x2, y2)
+        covers. Items spanning more than maxCells cells are kept in a
+        separate list that every query checks, so huge boxes do not fill the
+        grid. Items remember the order they were inserted in; query()
+        returns the most recently inserted first.
+    """
+
+    def __init__(self, cellSize=64.0, maxCells=256):
+        self.cellSize = float(cellSize)
+        self.maxCells = maxCells
+        self._cells = {}
+        self._large = set()
+        # item -> (sequence number, rect, cell keys or None when large)
+        self._items = {}
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def clear(self):
+        self._cells.clear()
+        self._large.clear()
+        self._items.clear()
+
+    def _cellRange(self, x1, y1, x2, y2):
+        size = self.cellSize
+        return (int(math.floor(x1 / size)), int(math.floor(y1 / size)),
+                int(math.floor(x2 / size)), int(math.floor(y2 / size)))
+
+    def insert(self, item, rect):
+        """Add item, or move it to rect keeping its order if already present."""
+        entry = self._items.get(item)
+        if entry is not None:
+            if entry[1] == rect:
+                return
+            sequence = entry[0]
+            self.remove(item)
+        else:
+            self._sequence += 1
+            sequence = self._sequence
+        cx1, cy1, cx2, cy2 = self._cellRange(*rect)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > self.maxCells:
+            self._large.add(item)
+            keys = None
+        else:
+            keys = []
+            for cx in range(cx1, cx2 + 1):
+                for cy in range(cy1, cy2 + 1):
+                    key = (cx, cy)
+                    self._cells.setdefault(key, set()).add(item)
+                    keys.append(key)
+        self._items[item] = (sequence, rect, keys)
+
+    update = insert
+
+    def remove(self, item):
+        entry = self._items.pop(item, None)
+        if entry is None:
+            return
+        keys = entry[2]
+        if keys is None:
+            self._large.discard(item)
+            return
+        for key in keys:
+            bucket = self._cells[key]
+            bucket.discard(item)
+            if not bucket:
+                del self._cells[key]
+
+    def query(self, x, y, margin=0.0):
+        """
+            Return the items whose rect, grown by margin, contains (x, y),
+            most recently inserted first.
+        """
+        cx1, cy1, cx2, cy2 = self._cellRange(x - margin, y - margin,
+                                             x + margin, y + margin)
+        candidates = set(self._large)
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                bucket = self._cells.get((cx, cy))
+                if bucket:
+                    candidates.update(bucket)
+        found = []
+        for item in candidates:
+            sequence, rect, keys = self._items[item]
+            if rect[0] - margin <= x <= rect[2] + margin and \
+                    rect[1] - margin <= y <= rect[3] + margin:
+                found.append((sequence, item))
+        found.sort(key=lambda entry: entry[0], reverse=True)
+        return [item for sequence, item in found]
+
+    def queryRect(self, x1, y1, x2, y2):
+        """Return the items whose rect intersects the given one, oldest first."""
+        cx1, cy1, cx2, cy2 = self._cellRange(x1, y1, x2, y2)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self._cells):
+            # Cheaper to look at every item than at every cell.
+            candidates = self._items
+        else:
+            candidates = set(self._large)
+            for cx in range(cx1, cx2 + 1):
+                for cy in range(cy1, cy2 + 1):
+                    bucket = self._cells.get((cx, cy))
+                    if bucket:
+                        candidates.update(bucket)
+        found = []
+        for item in candidates:
+            sequence, rect, keys = self._items[item]
+            if rect[0] <= x2 and x1 <= rect[2] and \
+                    rect[1] <= y2 and y1 <= rect[3]:
+                found.append((sequence, item))
+        found.sort(key=lambda entry: entry[0])
+        return [item for sequence, item in found]
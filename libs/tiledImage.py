@@ -0,0 +1,163 @@
+try:
+    from PyQt5.QtGui import *
+    from PyQt5.QtCore import *
+except ImportError:
+    from PyQt4.QtGui import *
+    from PyQt4.QtCore import *
+
+import itertools
+import math
+from collections import OrderedDict
+
+TILE_SIZE = 512
+# Images with more pixels than this are drawn through a TiledImage.
+TILED_PIXELS = 4096 * 4096
+
+_tokens = itertools.count()
+
+
+class TileCache(object):
+    """Least recently used cache of tile pixmaps bounded by their byte size."""
+
+    def __init__(self, maxBytes=256 * 1024 * 1024):
+        self.maxBytes = maxBytes
+        self.totalBytes = 0
+        self._tiles = OrderedDict()
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def get(self, key):
+        entry = self._tiles.pop(key, None)
+        if entry is None:
+            return None
+        self._tiles[key] = entry
+        return entry[0]
+
+    def put(self, key, pixmap):
+        nbytes = pixmap.width() * pixmap.height() * max(1, pixmap.depth() // 8)
+        old = self._tiles.pop(key, None)
+        if old is not None:
+            self.totalBytes -= old[1]
+        self._tiles[key] = (pixmap, nbytes)
+        self.totalBytes += nbytes
+        while self.totalBytes > self.maxBytes and len(self._tiles) > 1:
+            victim, (_, size) = self._tiles.popitem(last=False)
+            self.totalBytes -= size
+
+    def clear(self):
+        self._tiles.clear()
+        self.totalBytes = 0
+
+
+class LevelSignals(QObject):
+    finished = pyqtSignal(object)
+
+
+class LevelTask(QRunnable):
+    """Halves an image repeatedly on a worker thread until it fits one tile."""
+
+    def __init__(self, image, tileSize, signals):
+        super(LevelTask, self).__init__()
+        self.image = image
+        self.tileSize = tileSize
+        self.signals = signals
+
+    def run(self):
+        levels = []
+        image = self.image
+        while max(image.width(), image.height()) > self.tileSize:
+            image = image.scaled(max(1, image.width() // 2),
+                                 max(1, image.height() // 2),
+                                 Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            levels.append(image)
+        self.signals.finished.emit(levels)
+
+
+class TiledImage(QObject):
+    """
+        A large image drawn from a pyramid of tiles. Level 0 is the image
+        itself and every further level halves it; the reduced levels are
+        computed in the background and, until they arrive, tiles are cut
+        from level 0. Only the tiles under the exposed rect are drawn, at
+        the coarsest level that still has a pixel per screen pixel.
+
+        It answers the size queries of QPixmap so the canvas can hold it in
+        place of one.
+    """
+    levelsReady = pyqtSignal()
+
+    def __init__(self, image, cache, tileSize=TILE_SIZE, parent=None):
+        super(TiledImage, self).__init__(parent)
+        self.levels = [image]
+        self.cache = cache
+        self.tileSize = tileSize
+        self.token = next(_tokens)
+        self.signals = LevelSignals()
+        self.signals.finished.connect(self.setLevels)
+        QThreadPool.globalInstance().start(
+            LevelTask(image, tileSize, self.signals))
+
+    def setLevels(self, levels):
+        self.levels = self.levels[:1] + levels
+        self.levelsReady.emit()
+
+    def width(self):
+        return self.levels[0].width()
+
+    def height(self):
+        return self.levels[0].height()
+
+    def size(self):
+        return self.levels[0].size()
+
+    def rect(self):
+        return self.levels[0].rect()
+
+    def isNull(self):
+        return self.levels[0].isNull()
+
+    def level(self, scale):
+        if scale >= 1.0:
+            return 0
+        level = int(math.floor(math.log(1.0 / scale, 2)))
+        return min(level, len(self.levels) - 1)
+
+    def tile(self, level, tx, ty):
+        """
+            Return (pixmap, source rect) for a tile. The pixmap carries a
+            one pixel border from its neighbours so smooth scaling does not
+            show seams; the source rect is the tile proper inside it.
+        """
+        key = (self.token, level, tx, ty)
+        pixmap = self.cache.get(key)
+        size = self.tileSize
+        image = self.levels[level]
+        rect = QRect(tx * size, ty * size, size, size) & image.rect()
+        padded = rect.adjusted(-1, -1, 1, 1) & image.rect()
+        if pixmap is None:
+            pixmap = QPixmap.fromImage(image.copy(padded))
+            self.cache.put(key, pixmap)
+        return pixmap, QRectF(rect.translated(-padded.topLeft()))
+
+    def paint(self, painter, exposed, scale):
+        """Draw the tiles covering exposed, a rect in level 0 coordinates."""
+        level = self.level(scale)
+        image = self.levels[level]
+        sx = float(self.width()) / image.width()
+        sy = float(self.height()) / image.height()
+        size = self.tileSize
+        x1 = max(0, int(exposed.left() / sx) // size)
+        y1 = max(0, int(exposed.top() / sy) // size)
+        x2 = min((image.width() - 1) // size, int(exposed.right() / sx) // size)
+        y2 = min((image.height() - 1) // size, int(exposed.bottom() / sy) // size)
+        # Antialiased tile edges would leave seams between the tiles.
+        antialiasing = painter.testRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        for ty in range(y1, y2 + 1):
+            for tx in range(x1, x2 + 1):
+                pixmap, source = self.tile(level, tx, ty)
+                target = QRectF(tx * size * sx, ty * size * sy,
+                                source.width() * sx, source.height() * sy)
+                painter.drawPixmap(target, pixmap, source)
+        painter.setRenderHint(QPainter.Antialiasing, antialiasing)
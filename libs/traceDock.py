@@ -0,0 +1,79 @@
+try:
+    from PyQt5.QtGui import *
+    from PyQt5.QtCore import *
+    from PyQt5.QtWidgets import *
+except ImportError:
+    from PyQt4.QtGui import *
+    from PyQt4.QtCore import *
+
+import os
+
+from ustr import ustr
+import tracing
+
+REFRESH_MSECS = 1000
+
+
+class TraceDock(QDockWidget):
+    """
+        Debug panel listing the tracing timers and counters. Tracing is on
+        while the panel is shown; the table is refreshed once a second.
+    """
+
+    def __init__(self, parent=None):
+        super(TraceDock, self).__init__(u'Timings', parent)
+        self.setObjectName(u'Timings')
+        self.table = QTreeWidget()
+        self.table.setRootIsDecorated(False)
+        self.table.setHeaderLabels([u'Name', u'Calls', u'Total ms', u'Mean ms', u'Max ms'])
+        resetButton = QPushButton(u'Reset')
+        resetButton.clicked.connect(self.reset)
+        saveButton = QPushButton(u'Save Trace...')
+        saveButton.clicked.connect(self.saveTrace)
+        buttons = QHBoxLayout()
+        buttons.addWidget(resetButton)
+        buttons.addWidget(saveButton)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+        container = QWidget()
+        container.setLayout(layout)
+        self.setWidget(container)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_MSECS)
+        self.timer.timeout.connect(self.refresh)
+        self.visibilityChanged.connect(self.setActive)
+
+    def setActive(self, visible):
+        # A session traced into a file keeps tracing with the panel closed.
+        tracing.enable(visible or bool(os.environ.get(tracing.TRACE_ENV)))
+        if visible:
+            self.refresh()
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def refresh(self):
+        spans, counters = tracing.summary()
+        self.table.clear()
+        for name, calls, total, longest in spans:
+            self.table.addTopLevelItem(QTreeWidgetItem([
+                name, str(calls), '%.1f' % (total * 1000),
+                '%.2f' % (total * 1000 / calls), '%.1f' % (longest * 1000)]))
+        for name in sorted(counters):
+            self.table.addTopLevelItem(QTreeWidgetItem([name, str(counters[name])]))
+        self.table.resizeColumnToContents(0)
+
+    def reset(self):
+        tracing.clear()
+        self.refresh()
+
+    def saveTrace(self):
+        path = QFileDialog.getSaveFileName(self, u'Save Trace', 'trace.json',
+                                           u'Chrome trace (*.json)')
+        if isinstance(path, tuple):
+            path = path[0]
+        if path:
+            tracing.saveChromeTrace(ustr(path))
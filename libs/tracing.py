@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Lightweight timers and counters for seeing where time goes.
+
+    with tracing.span('loadFile.decode'):
+        image = QImage.fromData(data)
+    tracing.count('prefetch.hit')
+
+Nothing is recorded until enable() is called; until then span() hands back
+a shared do-nothing context manager and count() returns at once. Recorded
+spans are summed per name by summary() and can be written out with
+saveChromeTrace() for chrome://tracing or Perfetto. Does not import Qt.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Oldest events are dropped past this many; summary() keeps counting.
+MAX_EVENTS = 200000
+# Setting this to a file name traces the whole session into that file.
+TRACE_ENV = 'ROLABELIMG_TRACE'
+
+_enabled = False
+_lock = threading.Lock()
+_events = deque(maxlen=MAX_EVENTS)
+# name -> [calls, total seconds, longest seconds]
+_stats = {}
+_counters = {}
+# Python 2 has no perf_counter.
+now = getattr(time, 'perf_counter', time.time)
+_origin = now()
+
+
+class _Span(object):
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = now()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, self.start)
+        return False
+
+
+class _NoSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_noSpan = _NoSpan()
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = bool(on)
+
+
+def isEnabled():
+    return _enabled
+
+
+def span(name):
+    """Return a context manager that times its block as name."""
+    if not _enabled:
+        return _noSpan
+    return _Span(name)
+
+
+def record(name, start, end=None):
+    """
+        Record a span that started at start, a now() value, and ends now or
+        at end. For work that does not fit in one block, like a scan that
+        finishes in a later callback.
+    """
+    if not _enabled:
+        return
+    if end is None:
+        end = now()
+    duration = end - start
+    with _lock:
+        _events.append(('X', name, start, duration, threading.current_thread().ident))
+        stat = _stats.get(name)
+        if stat is None:
+            _stats[name] = [1, duration, duration]
+        else:
+            stat[0] += 1
+            stat[1] += duration
+            if duration > stat[2]:
+                stat[2] = duration
+
+
+def count(name, value=1):
+    """Add value to the counter name."""
+    if not _enabled:
+        return
+    with _lock:
+        total = _counters[name] = _counters.get(name, 0) + value
+        _events.append(('C', name, now(), total, threading.current_thread().ident))
+
+
+def clear():
+    with _lock:
+        _events.clear()
+        _stats.clear()
+        _counters.clear()
+
+
+def summary():
+    """
+        Return ([(name, calls, total, longest)], {counter: value}), spans
+        sorted by total time, longest first; times are in seconds.
+    """
+    with _lock:
+        spans = [(name, calls, total, longest)
+                 for name, (calls, total, longest) in _stats.items()]
+        counters = dict(_counters)
+    spans.sort(key=lambda item: -item[2])
+    return spans, counters
+
+
+def chromeTrace():
+    """Return the recorded events in the Chrome trace event format."""
+    pid = os.getpid()
+    with _lock:
+        events = list(_events)
+    traceEvents = []
+    for kind, name, start, value, tid in events:
+        event = {'name': name, 'ph': kind, 'pid': pid, 'tid': tid,
+                 'ts': round((start - _origin) * 1e6, 3)}
+        if kind == 'X':
+            event['dur'] = round(value * 1e6, 3)
+        else:
+            event['args'] = {name: value}
+        traceEvents.append(event)
+    return {'traceEvents': traceEvents, 'displayTimeUnit': 'ms'}
+
+
+def saveChromeTrace(path):
+    with open(path, 'w') as f:
+        json.dump(chromeTrace(), f)
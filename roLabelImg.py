@@ -3,8 +3,8 @@
 import codecs
 import os.path
 import re
+import sqlite3
 import sys
-import subprocess
 
 from functools import partial
 from collections import defaultdict
@@ -24,7 +24,6 @@ except ImportError:
     from PyQt4.QtGui import *
     from PyQt4.QtCore import *
 
-import resources
 # Add internal libs
 dir_name = os.path.abspath(os.path.dirname(__file__))
 libs_path = os.path.join(dir_name, 'libs')
@@ -39,10 +38,29 @@ from labelFile import LabelFile, LabelFileError
 from toolBar import ToolBar
 from pascal_voc_io import PascalVocReader
 from pascal_voc_io import XML_EXT
+from pascal_voc_io import readVerified
+from shapeStore import ShapeStore
+from imageSize import readImageShape
+from prefetcher import Prefetcher, imageBytes, annotationBytes
+from imageCache import fileStamp
+from imageLoader import ImageLoader, previewSize, decodePreview
+from imageList import ImageList
+from dirScanner import DirScanner, iterImages
+from datasetIndex import DatasetIndex, parseQuery
+from datasetIndexer import DatasetIndexer
+from annotationSaver import AnnotationSaver
+from editJournal import EditJournal, journalPath, pendingEdits, truncateJournal, \
+    dataDigest, fileDigest
+from fileListModel import FileListModel, STATUS_NONE, STATUS_ANNOTATED, STATUS_VERIFIED
 from ustr import ustr
+from traceDock import TraceDock
+import tracing
 
 __appname__ = 'roLabelImg'
 
+# Journaled edits are written to disk at most this long after they are made.
+JOURNAL_FLUSH_MSECS = 2000
+
 # Utility functions and classes.
 
 
@@ -94,7 +112,7 @@ class MainWindow(QMainWindow, WindowMixin):
         self.defaultSaveDir = None
         self.usingPascalVocFormat = True
         # For loading all image under a directory
-        self.mImgList = []
+        self.mImgList = ImageList()
         self.dirname = None
         self.labelHist = []
         self.lastOpenDir = None
@@ -107,14 +125,60 @@ class MainWindow(QMainWindow, WindowMixin):
 
         # Enble auto saving if pressing next
         self.autoSaving = True
+        # Annotation files are written on a worker thread; xml path -> image
+        # path of the saves not yet reported back.
+        self.annotationSaver = AnnotationSaver(self)
+        self.annotationSaver.saved.connect(self.annotationSaved)
+        self.annotationSaver.saveFailed.connect(self.annotationSaveFailed)
+        self.savingImages = {}
+        # Decode neighbouring images in the background
+        self.prefetcher = Prefetcher(parent=self)
+        self.imageCache = self.prefetcher.cache
+        # Large images are shown from a reduced decode first while the full
+        # resolution one is decoded here.
+        self.imageLoader = ImageLoader(self)
+        self.imageLoader.imageReady.connect(self.fullImageLoaded)
+        self.loadingStamp = None
+        # List opened directories in the background, remembering listings
+        # between sessions so unchanged folders are not walked again.
+        dataDir = os.path.join(os.path.expanduser('~'), '.roLabelImg')
+        self.dirScanner = DirScanner(os.path.join(dataDir, 'scan'), self)
+        self.dirScanner.batchReady.connect(self.addScannedImages)
+        self.dirScanner.finished.connect(self.scanFinished)
+        self.openFirstScanned = False
+        self.scanStarted = None
+        # Annotation status and label counts of every image seen, refreshed
+        # in the background once a directory has been listed.
+        indexPath = os.path.join(dataDir, 'index.sqlite')
+        try:
+            self.datasetIndex = DatasetIndex(indexPath)
+        except (sqlite3.Error, OSError):
+            self.datasetIndex = None
+        self.datasetIndexer = DatasetIndexer(indexPath, self)
+        self.datasetIndexer.updated.connect(self.indexUpdated)
+        self.datasetIndexer.finished.connect(self.indexFinished)
+        # Unsaved edits are journaled so a crash does not lose them. The
+        # next journal starts from journalBase, (digest, shape count) of the
+        # annotations shown; a digest of None is read from the file.
+        self.journalDir = os.path.join(dataDir, 'journal')
+        self.journal = None
+        self.journalBase = None
+        # (shape, journalIndex) of the shape last moved, as drags move
+        # the same shape many times.
+        self.journalMoving = None
+        self.journalTimer = QTimer(self)
+        self.journalTimer.setSingleShot(True)
+        self.journalTimer.setInterval(JOURNAL_FLUSH_MSECS)
+        self.journalTimer.timeout.connect(self.flushJournal)
         self._noSelectionSlot = False
         self._beginner = True
         self.screencastViewer = "firefox"
         self.screencast = "https://youtu.be/7D5lvol_QRA"
         # For a demo of original labelImg, please see "https://youtu.be/p0nR2YsCY_U"
 
-        # Main widgets and related state.
-        self.labelDialog = LabelDialog(parent=self, listItem=self.labelHist)
+        # Main widgets and related state. The label dialog is created the
+        # first time it is shown.
+        self.labelDialog = None
         
         self.itemsToShapes = {}
         self.shapesToItems = {}
@@ -161,11 +225,23 @@ class MainWindow(QMainWindow, WindowMixin):
         self.dock.setWidget(labelListContainer)
 
         # Tzutalin 20160906 : Add file list and dock to move faster
-        self.fileListWidget = QListWidget()
-        self.fileListWidget.itemDoubleClicked.connect(self.fileitemDoubleClicked)
+        # The file list is a view over mImgList; rows are only materialised
+        # when they are painted.
+        self.fileListModel = FileListModel(statusFunc=self.annotationStatus, parent=self)
+        self.fileListView = QListView()
+        self.fileListView.setUniformItemSizes(True)
+        self.fileListView.setLayoutMode(QListView.Batched)
+        self.fileListView.setBatchSize(1000)
+        self.fileListView.setModel(self.fileListModel)
+        self.fileListView.activated.connect(self.fileitemDoubleClicked)
+        self.fileListFilter = QLineEdit()
+        self.fileListFilter.setPlaceholderText(
+            u'Filter files, label:NAME, is:unlabeled|annotated|verified')
+        self.fileListFilter.textChanged.connect(self.filterFileList)
         filelistLayout = QVBoxLayout()
         filelistLayout.setContentsMargins(0, 0, 0, 0)
-        filelistLayout.addWidget(self.fileListWidget)
+        filelistLayout.addWidget(self.fileListFilter)
+        filelistLayout.addWidget(self.fileListView)
         fileListContainer = QWidget()
         fileListContainer.setLayout(filelistLayout)
         self.filedock = QDockWidget(u'File List', self)
@@ -188,7 +264,7 @@ class MainWindow(QMainWindow, WindowMixin):
         self.canvas.scrollRequest.connect(self.scrollRequest)
 
         self.canvas.newShape.connect(self.newShape)
-        self.canvas.shapeMoved.connect(self.setDirty)
+        self.canvas.shapeMoved.connect(self.shapeMoved)
         self.canvas.selectionChanged.connect(self.shapeSelectionChanged)
         self.canvas.drawingPolygon.connect(self.toggleDrawingSensitive)
         self.canvas.status.connect(self.status)
@@ -321,6 +397,12 @@ class MainWindow(QMainWindow, WindowMixin):
         labels.setText('Show/Hide Label Panel')
         labels.setShortcut('Ctrl+Shift+L')
 
+        # Debug panel of load, save and paint timings; built when first shown.
+        self.traceDock = None
+        timings = action('Show &Timings', self.toggleTraceDock,
+                         tip=u'Show where loading, saving and painting spend time',
+                         checkable=True)
+
         # Lavel list context menu.
         labelMenu = QMenu()
         addActions(labelMenu, (edit, delete))
@@ -364,7 +446,8 @@ class MainWindow(QMainWindow, WindowMixin):
             labels, advancedMode, None,
             hideAll, showAll, None,
             zoomIn, zoomOut, zoomOrg, None,
-            fitWindow, fitWidth))
+            fitWindow, fitWidth, None,
+            timings))
 
         self.menus.file.aboutToShow.connect(self.updateFileMenu)
 
@@ -386,6 +469,8 @@ class MainWindow(QMainWindow, WindowMixin):
 
         self.statusBar().showMessage('%s started.' % __appname__)
         self.statusBar().show()
+        self.cacheStatus = QLabel()
+        self.statusBar().addPermanentWidget(self.cacheStatus)
 
         # Application state.
         self.image = QImage()
@@ -440,6 +525,8 @@ class MainWindow(QMainWindow, WindowMixin):
         position = settings.get('window/position', QPoint(0, 0))
         self.resize(size)
         self.move(position)
+        self.imageCache.setMaxBytes(
+            int(settings.get('cache/maxMB', 512)) * 1024 * 1024)
         saveDir = ustr(settings.get('savedir', None))
         self.lastOpenDir = ustr(settings.get('lastOpenDir', None))
         if saveDir is not None and os.path.exists(saveDir):
@@ -451,12 +538,10 @@ class MainWindow(QMainWindow, WindowMixin):
         # or simply:
         # self.restoreGeometry(settings['window/geometry']
         self.restoreState(settings.get('window/state', QByteArray()))
-        self.lineColor = QColor(settings.get('line/color', Shape.line_color))
-        self.fillColor = QColor(settings.get('fill/color', Shape.fill_color))
-        Shape.line_color = self.lineColor
-        Shape.fill_color = self.fillColor
-        # Add chris
-        Shape.difficult = self.difficult
+        self.lineColor = QColor(settings.get('line/color', Shape.default_line_color))
+        self.fillColor = QColor(settings.get('fill/color', Shape.default_fill_color))
+        Shape.default_line_color = self.lineColor
+        Shape.default_fill_color = self.fillColor
 
         def xbool(x):
             if isinstance(x, QVariant):
@@ -553,12 +638,15 @@ class MainWindow(QMainWindow, WindowMixin):
         self.statusBar().show()
 
     def resetState(self):
+        self.closeJournal()
         self.itemsToShapes.clear()
         self.shapesToItems.clear()
         self.labelList.clear()
         self.filePath = None
         self.imageData = None
         self.labelFile = None
+        self.imageLoader.cancel()
+        self.loadingStamp = None
         self.canvas.resetState()
 
     def currentItem(self):
@@ -582,6 +670,7 @@ class MainWindow(QMainWindow, WindowMixin):
 
     ## Callbacks ##
     def tutorial(self):
+        import subprocess
         subprocess.Popen([self.screencastViewer, self.screencast])
 
     # create Normal Rect
@@ -645,22 +734,39 @@ class MainWindow(QMainWindow, WindowMixin):
     def popLabelListMenu(self, point):
         self.menus.labelList.exec_(self.labelList.mapToGlobal(point))
 
+    def getLabelDialog(self):
+        if self.labelDialog is None:
+            self.labelDialog = LabelDialog(parent=self, listItem=self.labelHist)
+        return self.labelDialog
+
     def editLabel(self, item=None):
         if not self.canvas.editing():
             return
         item = item if item else self.currentItem()
-        text = self.labelDialog.popUp(item.text())
+        text = self.getLabelDialog().popUp(item.text())
         if text is not None:
             item.setText(text)
             self.setDirty()
 
     # Tzutalin 20160906 : Add file list and dock to move faster
-    def fileitemDoubleClicked(self, item=None):
-        currIndex = self.mImgList.index(ustr(item.text()))
-        if currIndex < len(self.mImgList):
-            filename = self.mImgList[currIndex]
-            if filename:
-                self.loadFile(filename)
+    def fileitemDoubleClicked(self, index=None):
+        if index is None or not index.isValid():
+            return
+        filename = self.fileListModel.pathAt(index.row())
+        if filename in self.mImgList:
+            self.loadFile(filename)
+
+    def filterFileList(self, text):
+        nameText, label, status = parseQuery(ustr(text))
+        paths = None
+        if label is not None or status is not None:
+            paths = set()
+            if self.datasetIndex is not None:
+                paths = self.datasetIndex.paths(label, status)
+        self.fileListModel.setFilterText(nameText, paths)
+        row = self.fileListModel.rowForPath(self.filePath)
+        if row is not None:
+            self.fileListView.setCurrentIndex(self.fileListModel.index(row))
 
     # Add chris
     def btnstate(self, item= None):
@@ -683,6 +789,7 @@ class MainWindow(QMainWindow, WindowMixin):
         try:
             if difficult != shape.difficult:
                 shape.difficult = difficult
+                self.journalLabel(shape)
                 self.setDirty()
             else:  # User probably changed item visibility
                 self.canvas.setShapeVisible(shape, item.checkState() == Qt.Checked)
@@ -690,6 +797,10 @@ class MainWindow(QMainWindow, WindowMixin):
             pass
 
     # React to canvas signals.
+    def shapeMoved(self, shape):
+        self.journalMove(shape)
+        self.setDirty()
+
     def shapeSelectionChanged(self, selected=False):
         if self._noSelectionSlot:
             self._noSelectionSlot = False
@@ -744,6 +855,20 @@ class MainWindow(QMainWindow, WindowMixin):
 
         self.canvas.loadShapes(s)
 
+    def loadStore(self, store):
+        """Load the boxes of a ShapeStore as canvas shapes."""
+        s = []
+        for i in range(len(store)):
+            shape = Shape(label=store.label(i))
+            shape.points = [QPointF(x, y) for x, y in store.corners(i)]
+            shape.difficult = store.isDifficult(i)
+            shape.isRotated = store.isRotated(i)
+            shape.direction = store.angle[i] if shape.isRotated else 0
+            shape.close()
+            s.append(shape)
+            self.addLabel(shape)
+        self.canvas.loadShapes(s, store.envelopes())
+
     def saveLabels(self, annotationFilePath):
         annotationFilePath = ustr(annotationFilePath)
         if self.labelFile is None:
@@ -765,24 +890,47 @@ class MainWindow(QMainWindow, WindowMixin):
                         center = s.center,
                         isRotated = s.isRotated)
 
-        shapes = [format_shape(shape) for shape in self.canvas.shapes]
-        # Can add differrent annotation formats here
-        try:
-            if self.usingPascalVocFormat is True:
-                print ('Img: ' + self.filePath + ' -> Its xml: ' + annotationFilePath)
-                self.labelFile.savePascalVocFormat(annotationFilePath, shapes, self.filePath, self.imageData,
-                                                   self.lineColor.getRgb(), self.fillColor.getRgb())
-            else:
-                self.labelFile.save(annotationFilePath, shapes, self.filePath, self.imageData,
-                                    self.lineColor.getRgb(), self.fillColor.getRgb())
-            return True
-        except LabelFileError as e:
-            self.errorMessage(u'Error saving label data',
-                              u'<b>%s</b>' % e)
-            return False
+        with tracing.span('saveLabels'):
+            # Can add differrent annotation formats here
+            try:
+                if self.usingPascalVocFormat is True:
+                    shapes = ShapeStore.fromShapes(self.canvas.shapes)
+                    # The header probe is cached per file; fall back to the image
+                    # already in memory rather than decoding the file again.
+                    imageShape = readImageShape(self.filePath)
+                    if imageShape is None:
+                        imageShape = [self.canvas.pixmap.height(), self.canvas.pixmap.width(),
+                                      1 if self.image.isGrayscale() else 3]
+                    elif imageShape[2] == 3 and self.image.isGrayscale():
+                        # The header only gives the colour type; colour files
+                        # whose pixels are all gray have always been saved
+                        # with depth 1.
+                        imageShape[2] = 1
+                    # Serialised now, so later edits do not leak into the
+                    # file; the saver writes it in the background.
+                    writer = self.labelFile.pascalVocWriter(shapes, self.filePath, imageShape)
+                    data = writer.toXML()
+                    self.journalSaved(dataDigest(data))
+                    # The index is updated from these once the file is written.
+                    contents = (writer.verified, shapes.labelCounts())
+                    self.savingImages[annotationFilePath] = (self.filePath, contents)
+                    self.annotationSaver.save(annotationFilePath, data)
+                else:
+                    shapes = [format_shape(shape) for shape in self.canvas.shapes]
+                    self.labelFile.save(annotationFilePath, shapes, self.filePath, self.imageData,
+                                        self.lineColor.getRgb(), self.fillColor.getRgb())
+                    self.savingImages[annotationFilePath] = (self.filePath, None)
+                    self.annotationSaved(annotationFilePath)
+                return True
+            except LabelFileError as e:
+                self.errorMessage(u'Error saving label data',
+                                  u'<b>%s</b>' % e)
+                return False
 
     def copySelectedShape(self):
-        self.addLabel(self.canvas.copySelectedShape())
+        shape = self.canvas.copySelectedShape()
+        self.addLabel(shape)
+        self.journalNew(shape)
         # fix copy and delete
         self.shapeSelectionChanged(True)
 
@@ -800,6 +948,7 @@ class MainWindow(QMainWindow, WindowMixin):
         label = item.text()
         if label != shape.label:
             shape.label = item.text()
+            self.journalLabel(shape)
             self.setDirty()
         else:  # User probably changed item visibility
             self.canvas.setShapeVisible(shape, item.checkState() == Qt.Checked)
@@ -815,7 +964,7 @@ class MainWindow(QMainWindow, WindowMixin):
                 self.labelDialog = LabelDialog(
                     parent=self, listItem=self.labelHist)
 
-            text = self.labelDialog.popUp(text=self.prevLabelText)
+            text = self.getLabelDialog().popUp(text=self.prevLabelText)
         else:
             text = self.defaultLabelTextLine.text()
 
@@ -823,7 +972,9 @@ class MainWindow(QMainWindow, WindowMixin):
         self.diffcButton.setChecked(False)
         if text is not None:
             self.prevLabelText = text
-            self.addLabel(self.canvas.setLastLabel(text))
+            shape = self.canvas.setLastLabel(text)
+            self.addLabel(shape)
+            self.journalNew(shape)
             if self.beginner():  # Switch to edit mode.
                 self.canvas.setEditing(True)
                 self.actions.create.setEnabled(self.isEnableCreate)
@@ -869,85 +1020,159 @@ class MainWindow(QMainWindow, WindowMixin):
         self.zoomMode = self.FIT_WIDTH if value else self.MANUAL_ZOOM
         self.adjustScale()
 
+    def toggleTraceDock(self, value=True):
+        if self.traceDock is None:
+            self.traceDock = TraceDock(self)
+            self.traceDock.setFeatures(self.traceDock.features() ^ self.dockFeatures)
+            self.addDockWidget(Qt.BottomDockWidgetArea, self.traceDock)
+        self.traceDock.setVisible(value)
+
     def togglePolygons(self, value):
         for item, shape in self.itemsToShapes.items():
             item.setCheckState(Qt.Checked if value else Qt.Unchecked)
 
     def loadFile(self, filePath=None):
         """Load the specified file, or the last opened file if None."""
-        self.resetState()
-        self.canvas.setEnabled(False)
-        if filePath is None:
-            filePath = self.settings.get('filename')
-
-        unicodeFilePath = ustr(filePath)
-        # Tzutalin 20160906 : Add file list and dock to move faster
-        # Highlight the file item
-        if unicodeFilePath and self.fileListWidget.count() > 0:
-            index = self.mImgList.index(unicodeFilePath)
-            fileWidgetItem = self.fileListWidget.item(index)
-            fileWidgetItem.setSelected(True)
-
-        if unicodeFilePath and os.path.exists(unicodeFilePath):
-            if LabelFile.isLabelFile(unicodeFilePath):
-                try:
-                    self.labelFile = LabelFile(unicodeFilePath)
-                except LabelFileError as e:
+        with tracing.span('loadFile'):
+            self.resetState()
+            self.canvas.setEnabled(False)
+            if filePath is None:
+                filePath = self.settings.get('filename')
+
+            unicodeFilePath = ustr(filePath)
+            # Tzutalin 20160906 : Add file list and dock to move faster
+            # Highlight the file item
+            index = self.mImgList.get(unicodeFilePath)
+            row = self.fileListModel.rowForPath(unicodeFilePath)
+            if row is not None:
+                self.fileListView.setCurrentIndex(self.fileListModel.index(row))
+
+            if unicodeFilePath and os.path.exists(unicodeFilePath):
+                if LabelFile.isLabelFile(unicodeFilePath):
+                    try:
+                        self.labelFile = LabelFile(unicodeFilePath)
+                    except LabelFileError as e:
+                        self.errorMessage(u'Error opening file',
+                                          (u"<p><b>%s</b></p>"
+                                           u"<p>Make sure <i>%s</i> is a valid label file.")
+                                          % (e, unicodeFilePath))
+                        self.status("Error reading %s" % unicodeFilePath)
+                        return False
+                    self.imageData = self.labelFile.imageData
+                    self.lineColor = QColor(*self.labelFile.lineColor)
+                    self.fillColor = QColor(*self.labelFile.fillColor)
+                    image = QImage.fromData(self.imageData)
+                else:
+                    # Load image:
+                    # read data first and store for saving into label file.
+                    cached = self.imageCache.get(unicodeFilePath)
+                    if cached is not None:
+                        tracing.count('loadFile.cacheHit')
+                        self.imageData, image = cached
+                    else:
+                        tracing.count('loadFile.cacheMiss')
+                        stamp = fileStamp(unicodeFilePath)
+                        with tracing.span('loadFile.read'):
+                            self.imageData = read(unicodeFilePath, None)
+                        fullSize = previewSize(self.imageData) if self.imageData else None
+                        scale = 1.0
+                        if fullSize is not None:
+                            scale = self.fitWindowScale(fullSize.width(), fullSize.height())
+                        if scale < 1:
+                            # Show a decode at the fit-window zoom now and swap
+                            # in the full image once it is decoded.
+                            with tracing.span('loadFile.decodePreview'):
+                                image = decodePreview(self.imageData, scale)
+                            self.loadingStamp = stamp
+                        else:
+                            with tracing.span('loadFile.decode'):
+                                image = QImage.fromData(self.imageData)
+                            if not image.isNull():
+                                self.imageCache.put(unicodeFilePath, (self.imageData, image),
+                                                    imageBytes(image) + len(self.imageData),
+                                                    stamp, index)
+                    self.labelFile = None
+                if image.isNull():
                     self.errorMessage(u'Error opening file',
-                                      (u"<p><b>%s</b></p>"
-                                       u"<p>Make sure <i>%s</i> is a valid label file.")
-                                      % (e, unicodeFilePath))
+                                      u"<p>Make sure <i>%s</i> is a valid image file." % unicodeFilePath)
                     self.status("Error reading %s" % unicodeFilePath)
                     return False
-                self.imageData = self.labelFile.imageData
-                self.lineColor = QColor(*self.labelFile.lineColor)
-                self.fillColor = QColor(*self.labelFile.fillColor)
-            else:
-                # Load image:
-                # read data first and store for saving into label file.
-                self.imageData = read(unicodeFilePath, None)
-                self.labelFile = None
-            image = QImage.fromData(self.imageData)
-            if image.isNull():
-                self.errorMessage(u'Error opening file',
-                                  u"<p>Make sure <i>%s</i> is a valid image file." % unicodeFilePath)
-                self.status("Error reading %s" % unicodeFilePath)
-                return False
-            self.status("Loaded %s" % os.path.basename(unicodeFilePath))
-            self.image = image
-            self.filePath = unicodeFilePath
-            self.canvas.loadPixmap(QPixmap.fromImage(image))
-            if self.labelFile:
-                self.loadLabels(self.labelFile.shapes)
-            self.setClean()
-            self.canvas.setEnabled(True)
-            self.adjustScale(initial=True)
-            self.paintCanvas()
-            self.addRecentFile(self.filePath)
-            self.toggleActions(True)
-
-            # Label xml file and show bound box according to its filename
-            if self.usingPascalVocFormat is True:
-                if self.defaultSaveDir is not None:
-                    basename = os.path.basename(
-                        os.path.splitext(self.filePath)[0]) + XML_EXT
-                    xmlPath = os.path.join(self.defaultSaveDir, basename)
-                    self.loadPascalXMLByFilename(xmlPath)
-                else:
-                    xmlPath = filePath.split(".")[0] + XML_EXT
-                    if os.path.isfile(xmlPath):
+                self.status("Loaded %s" % os.path.basename(unicodeFilePath))
+                self.mImgList.setCurrent(unicodeFilePath)
+                self.imageCache.currentIndex = index
+                self.image = image
+                self.filePath = unicodeFilePath
+                with tracing.span('loadFile.pixmap'):
+                    if self.loadingStamp is not None:
+                        self.canvas.loadPreview(image, fullSize)
+                        self.imageLoader.load(unicodeFilePath, self.imageData)
+                    else:
+                        self.canvas.loadImage(image)
+                if self.labelFile:
+                    with tracing.span('loadFile.labels'):
+                        self.loadLabels(self.labelFile.shapes)
+                self.setClean()
+                self.canvas.setEnabled(True)
+                with tracing.span('loadFile.adjustScale'):
+                    self.adjustScale(initial=True)
+                self.paintCanvas()
+                self.addRecentFile(self.filePath)
+                self.toggleActions(True)
+
+                # Label xml file and show bound box according to its filename
+                xmlPath = self.annotationPath(self.filePath)
+                if xmlPath is not None:
+                    with tracing.span('loadFile.annotations'):
                         self.loadPascalXMLByFilename(xmlPath)
+                    self.recoverEdits(xmlPath)
 
-            self.setWindowTitle(__appname__ + ' ' + filePath)
+                self.setWindowTitle(__appname__ + ' ' + filePath)
 
-            # Default : select last item if there is at least one item
-            if self.labelList.count():
-                self.labelList.setCurrentItem(self.labelList.item(self.labelList.count()-1))
-                # self.labelList.setItemSelected(self.labelList.item(self.labelList.count()-1), True)
+                if index is not None:
+                    self.prefetcher.prefetch(self.mImgList, index,
+                                             self.annotationPath)
+                self.cacheStatus.setText(u'Cache: %s' % self.imageCache.stats())
 
-            self.canvas.setFocus(True)
-            return True
-        return False
+                # Default : select last item if there is at least one item
+                if self.labelList.count():
+                    self.labelList.setCurrentItem(self.labelList.item(self.labelList.count()-1))
+                    # self.labelList.setItemSelected(self.labelList.item(self.labelList.count()-1), True)
+
+                self.canvas.setFocus(True)
+                return True
+            return False
+
+    def fullImageLoaded(self, path, image):
+        stamp, self.loadingStamp = self.loadingStamp, None
+        if path != self.filePath or image.isNull():
+            return
+        self.image = image
+        self.canvas.swapImage(image)
+        self.imageCache.put(path, (self.imageData, image),
+                            imageBytes(image) + len(self.imageData),
+                            stamp, self.imageCache.currentIndex)
+        self.cacheStatus.setText(u'Cache: %s' % self.imageCache.stats())
+
+    def annotationStatus(self, imagePath):
+        xmlPath = self.annotationPath(imagePath)
+        if xmlPath is None:
+            return STATUS_NONE
+        if self.datasetIndex is not None:
+            status = self.datasetIndex.status(imagePath, xmlPath)
+            if status is not None:
+                return status
+        if not os.path.isfile(xmlPath):
+            return STATUS_NONE
+        try:
+            return STATUS_VERIFIED if readVerified(xmlPath) else STATUS_ANNOTATED
+        except (IOError, OSError, SyntaxError):
+            return STATUS_ANNOTATED
+
+    def annotationPath(self, imagePath):
+        """Return the xml path the labels of imagePath are loaded from."""
+        if self.usingPascalVocFormat is not True:
+            return None
+        return LabelFile.annotationPath(imagePath, self.defaultSaveDir)
 
     def resizeEvent(self, event):
         if self.canvas and not self.image.isNull()\
@@ -967,13 +1192,17 @@ class MainWindow(QMainWindow, WindowMixin):
 
     def scaleFitWindow(self):
         """Figure out the size of the pixmap in order to fit the main widget."""
+        return self.fitWindowScale(self.canvas.pixmap.width(),
+                                   self.canvas.pixmap.height())
+
+    def fitWindowScale(self, width, height):
         e = 2.0  # So that no scrollbars are generated.
         w1 = self.centralWidget().width() - e
         h1 = self.centralWidget().height() - e
         a1 = w1 / h1
         # Calculate a new scale value based on the pixmap's aspect ratio.
-        w2 = self.canvas.pixmap.width() - 0.0
-        h2 = self.canvas.pixmap.height() - 0.0
+        w2 = width - 0.0
+        h2 = height - 0.0
         a2 = w2 / h2
         return w1 / w2 if a2 >= a1 else h1 / h2
 
@@ -985,6 +1214,15 @@ class MainWindow(QMainWindow, WindowMixin):
     def closeEvent(self, event):
         if not self.mayContinue():
             event.ignore()
+            return
+        self.prefetcher.waitForDone()
+        self.imageLoader.waitForDone()
+        # Pyramid levels of a tiled image are built on the global pool.
+        QThreadPool.globalInstance().waitForDone()
+        self.dirScanner.waitForDone()
+        self.datasetIndexer.waitForDone()
+        self.annotationSaver.waitForDone()
+        self.flushJournal()
         s = self.settings
         # If it loads images from dir, don't load it at the begining
         if self.dirname is None:
@@ -998,6 +1236,7 @@ class MainWindow(QMainWindow, WindowMixin):
         s['line/color'] = self.lineColor
         s['fill/color'] = self.fillColor
         s['recentFiles'] = self.recentFiles
+        s['cache/maxMB'] = self.imageCache.maxBytes // (1024 * 1024)
         s['advanced'] = not self._beginner
         if self.defaultSaveDir is not None and len(self.defaultSaveDir) > 1:
             s['savedir'] = ustr(self.defaultSaveDir)
@@ -1016,17 +1255,38 @@ class MainWindow(QMainWindow, WindowMixin):
             self.loadFile(filename)
 
     def scanAllImages(self, folderPath):
-        extensions = ['.jpeg', '.jpg', '.png', '.bmp']
-        images = []
-
-        for root, dirs, files in os.walk(folderPath):
-            for file in files:
-                if file.lower().endswith(tuple(extensions)):
-                    relatviePath = os.path.join(root, file)
-                    path = ustr(os.path.abspath(relatviePath))
-                    images.append(path)
-        images.sort(key=lambda x: x.lower())
-        return images
+        with tracing.span('scanAllImages'):
+            return [ustr(path) for path in iterImages(folderPath)]
+
+    def addScannedImages(self, paths):
+        tracing.count('scanAllImages.images', len(paths))
+        self.fileListModel.appendPaths([ustr(path) for path in paths])
+        # Show the first image while the rest of the folder is still listed.
+        if self.openFirstScanned and len(self.mImgList) > 0:
+            self.openFirstScanned = False
+            if self.filePath is None:
+                self.loadFile(self.mImgList[0])
+
+    def scanFinished(self, completed):
+        if self.scanStarted is not None:
+            tracing.record('scanAllImages', self.scanStarted)
+        if completed:
+            self.statusBar().showMessage('Found %d images in %s' %
+                                         (len(self.mImgList), self.dirname))
+            self.refreshIndex()
+
+    def refreshIndex(self):
+        if self.datasetIndex is None or self.usingPascalVocFormat is not True:
+            return
+        self.datasetIndexer.refresh(self.mImgList, self.defaultSaveDir)
+
+    def indexUpdated(self, paths):
+        self.fileListModel.refreshAll()
+
+    def indexFinished(self, completed):
+        # Label and status filters only see images that are indexed.
+        if completed and self.fileListFilter.text():
+            self.filterFileList(self.fileListFilter.text())
 
     def changeSavedir(self, _value=False):
         if self.defaultSaveDir is not None:
@@ -1040,6 +1300,8 @@ class MainWindow(QMainWindow, WindowMixin):
 
         if dirpath is not None and len(dirpath) > 1:
             self.defaultSaveDir = dirpath
+            self.fileListModel.setImageList(self.mImgList)
+            self.refreshIndex()
 
         self.statusBar().showMessage('%s . Annotation will be saved to %s' %
                                      ('Change saved folder', self.defaultSaveDir))
@@ -1077,14 +1339,19 @@ class MainWindow(QMainWindow, WindowMixin):
         if dirpath is not None and len(dirpath) > 1:
             self.lastOpenDir = dirpath
 
+        self.importDirImages(dirpath)
+
+    def importDirImages(self, dirpath):
+        """List the images under dirpath and open the first one found."""
         self.dirname = dirpath
         self.filePath = None
-        self.fileListWidget.clear()
-        self.mImgList = self.scanAllImages(dirpath)
-        self.openNextImg()
-        for imgPath in self.mImgList:
-            item = QListWidgetItem(imgPath)
-            self.fileListWidget.addItem(item)
+        self.datasetIndexer.cancel()
+        self.mImgList = ImageList()
+        self.fileListModel.setImageList(self.mImgList)
+        self.openFirstScanned = True
+        self.statusBar().showMessage('Scanning %s ...' % dirpath)
+        self.scanStarted = tracing.now()
+        self.dirScanner.scan(dirpath)
 
     def verifyImg(self, _value=False):
         # Proceding next image without dialog if having any label
@@ -1112,11 +1379,9 @@ class MainWindow(QMainWindow, WindowMixin):
         if self.filePath is None:
             return
 
-        currIndex = self.mImgList.index(self.filePath)
-        if currIndex - 1 >= 0:
-            filename = self.mImgList[currIndex - 1]
-            if filename:
-                self.loadFile(filename)
+        filename = self.mImgList.prev()
+        if filename:
+            self.loadFile(filename)
 
     def openNextImg(self, _value=False):
         # Proceding next image without dialog if having any label
@@ -1136,9 +1401,7 @@ class MainWindow(QMainWindow, WindowMixin):
         if self.filePath is None:
             filename = self.mImgList[0]
         else:
-            currIndex = self.mImgList.index(self.filePath)
-            if currIndex + 1 < len(self.mImgList):
-                filename = self.mImgList[currIndex + 1]
+            filename = self.mImgList.next()
 
         if filename:
             self.loadFile(filename)
@@ -1192,8 +1455,183 @@ class MainWindow(QMainWindow, WindowMixin):
     def _saveFile(self, annotationFilePath):
         if annotationFilePath and self.saveLabels(annotationFilePath):
             self.setClean()
-            self.statusBar().showMessage('Saved to  %s' % annotationFilePath)
-            self.statusBar().show()
+
+    def takeSavingImage(self, annotationFilePath):
+        """Return (image path, saved contents or None) of the latest save, or None."""
+        # A newer save of the same file may already be queued.
+        if self.annotationSaver.isSaving(annotationFilePath):
+            return self.savingImages.get(annotationFilePath)
+        return self.savingImages.pop(annotationFilePath, None)
+
+    def annotationSaved(self, annotationFilePath):
+        saving = self.takeSavingImage(annotationFilePath)
+        self.imageCache.discard(annotationFilePath)
+        if saving is not None:
+            imagePath, contents = saving
+            if not self.annotationSaver.isSaving(annotationFilePath):
+                self.dropSavedEdits(imagePath)
+            if self.datasetIndex is not None:
+                try:
+                    self.datasetIndex.update(imagePath, annotationFilePath,
+                                             contents=contents)
+                except sqlite3.Error:
+                    pass
+            self.fileListModel.refresh(imagePath)
+        self.statusBar().showMessage('Saved to  %s' % annotationFilePath)
+        self.statusBar().show()
+
+    def annotationSaveFailed(self, annotationFilePath, message):
+        saving = self.takeSavingImage(annotationFilePath)
+        if saving is not None and saving[0] == self.filePath:
+            # Still showing these shapes: keep them marked unsaved.
+            self.dirty = True
+            self.actions.save.setEnabled(True)
+        self.statusBar().showMessage(u'Error saving %s: %s' % (annotationFilePath, message))
+        self.statusBar().show()
+
+    def journalEdit(self, record, key=None):
+        if self.filePath is None or self.journalBase is None:
+            return
+        if self.journal is None:
+            digest, count = self.journalBase
+            if digest is None:
+                digest = self.annotationDigest(self.annotationPath(self.filePath) or '')
+            self.journal = EditJournal(journalPath(self.journalDir, self.filePath))
+            self.journal.append(['b', digest, count])
+        if record[0] in ('n', 'd'):
+            self.journalMoving = None
+        self.journal.append(record, key)
+        if not self.journalTimer.isActive():
+            self.journalTimer.start()
+
+    def journalIndex(self, shape):
+        """
+            Return the position of shape in the order an annotation file
+            lists the shapes: boxes first, then rotated boxes.
+        """
+        shapes = self.canvas.shapes
+        before = shapes[:shapes.index(shape)]
+        if shape.isRotated:
+            return sum(1 for s in shapes if not s.isRotated) + \
+                sum(1 for s in before if s.isRotated)
+        return sum(1 for s in before if not s.isRotated)
+
+    def journalNew(self, shape):
+        self.journalEdit(['n', ustr(shape.label), int(shape.difficult), bool(shape.isRotated),
+                          shape.direction, [c for p in shape.points for c in (p.x(), p.y())]])
+
+    def journalMove(self, shape):
+        if self.journalMoving is None or self.journalMoving[0] is not shape:
+            self.journalMoving = (shape, self.journalIndex(shape))
+        index = self.journalMoving[1]
+        # Only the last position of a drag is kept until the next flush.
+        self.journalEdit(['m', index, shape.direction,
+                          [c for p in shape.points for c in (p.x(), p.y())]], ('m', index))
+
+    def journalLabel(self, shape):
+        index = self.journalIndex(shape)
+        self.journalEdit(['l', index, ustr(shape.label), int(shape.difficult)], ('l', index))
+
+    def journalSaved(self, digest):
+        """Mark the shapes as saved with content digest from here on."""
+        self.journalBase = (digest, len(self.canvas.shapes))
+        if self.journal is not None:
+            self.journal.append(['b', digest, len(self.canvas.shapes)])
+
+    def flushJournal(self):
+        if self.journal is None:
+            return
+        try:
+            self.journal.flush()
+        except (IOError, OSError) as e:
+            self.status(u'Cannot write the edit journal: %s' % e)
+
+    def closeJournal(self):
+        self.flushJournal()
+        self.journal = None
+        self.journalBase = None
+        self.journalMoving = None
+
+    def discardJournal(self):
+        if self.journal is not None:
+            self.journal.discard()
+            self.journal = None
+
+    def dropSavedEdits(self, imagePath):
+        """Drop the journaled edits of imagePath that are now saved."""
+        path = journalPath(self.journalDir, imagePath)
+        current = self.journal is not None and self.journal.path == path
+        if current:
+            self.flushJournal()
+        truncateJournal(path)
+        if current and not os.path.exists(path):
+            self.journal = None
+
+    def annotationDigest(self, xmlPath):
+        """Digest of xmlPath as it will be once the saves queued for it are written."""
+        data = self.annotationSaver.pendingData(xmlPath)
+        if data is not None:
+            return dataDigest(data)
+        return fileDigest(xmlPath)
+
+    def recoverEdits(self, xmlPath):
+        """Offer the edits journaled but never saved for this image, e.g. before a crash."""
+        self.journalBase = (None, len(self.canvas.shapes))
+        path = journalPath(self.journalDir, self.filePath)
+        if not os.path.exists(path):
+            return
+        edits = pendingEdits(path, self.annotationDigest(xmlPath), len(self.canvas.shapes))
+        if not edits or not self.recoverEditsDialog(len(edits)):
+            EditJournal(path).discard()
+            return
+        # Loaded from the file, so already in journalIndex order.
+        shapes = list(self.canvas.shapes)
+        try:
+            for record in edits:
+                kind = record[0]
+                if kind == 'n':
+                    shape = Shape(label=record[1])
+                    shape.difficult = bool(record[2])
+                    shape.isRotated = record[3]
+                    shape.direction = record[4]
+                    if shape.isRotated:
+                        shapes.append(shape)
+                    else:
+                        shapes.insert(sum(1 for s in shapes if not s.isRotated), shape)
+                    points = record[5]
+                elif kind == 'd':
+                    del shapes[record[1]]
+                    continue
+                else:
+                    # Edited shapes are copied so a bad journal leaves the
+                    # loaded ones untouched.
+                    shape = shapes[record[1]] = shapes[record[1]].copy()
+                    if kind == 'l':
+                        shape.label = record[2]
+                        shape.difficult = bool(record[3])
+                        continue
+                    shape.direction = record[2]
+                    points = record[3]
+                shape.points = [QPointF(points[i], points[i + 1]) for i in range(0, 8, 2)]
+                shape.close()
+        except (IndexError, TypeError, ValueError):
+            self.status(u'The journal of unsaved edits could not be read')
+            EditJournal(path).discard()
+            return
+        for shape in self.canvas.shapes:
+            self.remLabel(shape)
+        for shape in shapes:
+            self.addLabel(shape)
+        self.canvas.loadShapes(shapes)
+        self.journal = EditJournal(path)
+        self.setDirty()
+        self.status(u'Recovered %d unsaved edits' % len(edits))
+
+    def recoverEditsDialog(self, count):
+        yes, no = QMessageBox.Yes, QMessageBox.No
+        msg = u'%d edits to this image were not saved before %s last closed. ' \
+              u'Recover them?' % (count, __appname__)
+        return yes == QMessageBox.question(self, u'Unsaved edits', msg, yes | no)
 
     def closeFile(self, _value=False):
         if not self.mayContinue():
@@ -1205,7 +1643,12 @@ class MainWindow(QMainWindow, WindowMixin):
         self.actions.saveAs.setEnabled(False)
 
     def mayContinue(self):
-        return not (self.dirty and not self.discardChangesDialog())
+        if not self.dirty:
+            return True
+        if not self.discardChangesDialog():
+            return False
+        self.discardJournal()
+        return True
 
     def discardChangesDialog(self):
         yes, no = QMessageBox.Yes, QMessageBox.No
@@ -1225,7 +1668,7 @@ class MainWindow(QMainWindow, WindowMixin):
         if color:
             self.lineColor = color
             # Change the color for all shape lines:
-            Shape.line_color = self.lineColor
+            Shape.default_line_color = self.lineColor
             self.canvas.update()
             self.setDirty()
 
@@ -1234,11 +1677,13 @@ class MainWindow(QMainWindow, WindowMixin):
                                           default=DEFAULT_FILL_COLOR)
         if color:
             self.fillColor = color
-            Shape.fill_color = self.fillColor
+            Shape.default_fill_color = self.fillColor
             self.canvas.update()
             self.setDirty()
 
     def deleteSelectedShape(self):
+        if self.canvas.selectedShape is not None:
+            self.journalEdit(['d', self.journalIndex(self.canvas.selectedShape)])
         self.remLabel(self.canvas.deleteSelected())
         self.setDirty()
         if self.noShapes():
@@ -1264,10 +1709,12 @@ class MainWindow(QMainWindow, WindowMixin):
     def copyShape(self):
         self.canvas.endMove(copy=True)
         self.addLabel(self.canvas.selectedShape)
+        self.journalNew(self.canvas.selectedShape)
         self.setDirty()
 
     def moveShape(self):
         self.canvas.endMove(copy=False)
+        self.journalMove(self.canvas.selectedShape)
         self.setDirty()
 
     def loadPredefinedClasses(self, predefClassesFile):
@@ -1283,13 +1730,29 @@ class MainWindow(QMainWindow, WindowMixin):
     def loadPascalXMLByFilename(self, xmlPath):
         if self.filePath is None:
             return
-        if os.path.isfile(xmlPath) is False:
+        # A save still queued or being written is read from memory rather
+        # than waiting for the saver.
+        data = self.annotationSaver.pendingData(xmlPath)
+        if data is None and os.path.isfile(xmlPath) is False:
             return
 
-        tVocParseReader = PascalVocReader(xmlPath)
-        shapes = tVocParseReader.getShapes()
-        self.loadLabels(shapes)
-        self.canvas.verified = tVocParseReader.verified
+        cached = self.imageCache.get(xmlPath) if data is None else None
+        if cached is not None:
+            store, verified = cached
+        elif data is not None:
+            tVocParseReader = PascalVocReader(xmlPath, streaming=True, data=data)
+            store = tVocParseReader.getStore()
+            verified = tVocParseReader.verified
+        else:
+            stamp = fileStamp(xmlPath)
+            tVocParseReader = PascalVocReader(xmlPath, streaming=True)
+            store = tVocParseReader.getStore()
+            verified = tVocParseReader.verified
+            self.imageCache.put(xmlPath, (store, verified), annotationBytes(store),
+                                stamp, self.imageCache.currentIndex)
+        with tracing.span('loadStore'):
+            self.loadStore(store)
+        self.canvas.verified = verified
 
 
 class Settings(object):
@@ -1349,16 +1812,23 @@ def get_main_app(argv=[]):
     app.setWindowIcon(newIcon("app"))
     # Tzutalin 201705+: Accept extra agruments to change predefined class file
     # Usage : labelImg.py image predefClassFile
-    win = MainWindow(argv[1] if len(argv) >= 2 else None,
-                     argv[2] if len(argv) >= 3 else os.path.join('data', 'predefined_classes.txt'))
+    with tracing.span('MainWindow'):
+        win = MainWindow(argv[1] if len(argv) >= 2 else None,
+                         argv[2] if len(argv) >= 3 else os.path.join('data', 'predefined_classes.txt'))
     win.show()
     return app, win
 
 
 def main(argv=[]):
     '''construct main app and run it'''
+    tracePath = os.environ.get(tracing.TRACE_ENV)
+    if tracePath:
+        tracing.enable()
     app, _win = get_main_app(argv)
-    return app.exec_()
+    status = app.exec_()
+    if tracePath:
+        tracing.saveChromeTrace(tracePath)
+    return status
 
 if __name__ == '__main__':
     sys.exit(main(sys.argv))
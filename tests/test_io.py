@@ -18,3 +18,686 @@ writer.save('tests/test.xml')
 
 reader = PascalVocReader('tests/test.xml')
 shapes = reader.getShapes()
+
+class TestPascalVocReader(TestCase):
+
+    def setUp(self):
+        writer = PascalVocWriter('tests', 'test', (512, 512, 1), localImgPath='tests/test.bmp')
+        writer.verified = True
+        writer.addBndBox(60, 40, 430, 504, 'person', 1)
+        writer.addRotatedBndBox(200.5, 180.25, 80.0, 40.0, 0.5236, 'car', 0)
+        writer.save('tests/test.xml')
+
+    def test_streaming_matches_tree(self):
+        tree = PascalVocReader('tests/test.xml')
+        stream = PascalVocReader('tests/test.xml', streaming=True)
+        self.assertEqual(stream.getShapes(), tree.getShapes())
+        self.assertTrue(stream.verified)
+        self.assertEqual(len(tree.getShapes()), 2)
+
+    def test_iter_shapes(self):
+        reader = PascalVocReader('tests/test.xml', streaming=True)
+        labels = [shape[0] for shape in reader.iterShapes()]
+        self.assertEqual(labels, ['person', 'car'])
+        self.assertEqual(reader.shapes, [])
+
+    def test_incremental_parse_matches_tree(self):
+        import pascal_voc_io
+        tree = PascalVocReader('tests/test.xml', streaming=True)
+        limit, pascal_voc_io.STREAM_BYTES = pascal_voc_io.STREAM_BYTES, 0
+        try:
+            stream = PascalVocReader('tests/test.xml', streaming=True)
+            self.assertEqual(stream.getShapes(), tree.getShapes())
+            self.assertEqual(stream.header, tree.header)
+            self.assertEqual(stream.header['width'], '512')
+        finally:
+            pascal_voc_io.STREAM_BYTES = limit
+
+
+class TestPascalVocWriter(TestCase):
+
+    def makeWriter(self):
+        writer = PascalVocWriter('tests', 'test', (512, 512, 1), localImgPath=None)
+        writer.addBndBox(1, 40, 430, 512, u'臉 & <face>', 1)
+        writer.addRotatedBndBox(200.5, 180.25, 80.0, 40.0, 0.5236, 'car', 0)
+        return writer
+
+    def test_matches_prettify(self):
+        try:
+            import lxml
+        except ImportError:
+            self.skipTest('prettify only indents with lxml')
+        writer = self.makeWriter()
+        root = writer.genXML()
+        writer.appendObjects(root)
+        self.assertEqual(writer.toXML(), writer.prettify(root))
+
+    def test_round_trip(self):
+        self.makeWriter().save('tests/test.xml')
+        shapes = PascalVocReader('tests/test.xml').getShapes()
+        self.assertEqual([s[0] for s in shapes], [u'臉 & <face>', 'car'])
+
+
+class TestImageSize(TestCase):
+
+    def test_headers(self):
+        from imageSize import readImageShape
+        self.assertEqual(readImageShape(os.path.join(dir_name, 'test.bmp')), [512, 512, 3])
+        self.assertEqual(readImageShape(os.path.join(dir_name, u'臉書.jpg')), [32, 33, 3])
+        self.assertEqual(readImageShape(os.path.join(dir_name, '..', 'demo', 'demo.png')), [290, 512, 3])
+        self.assertIsNone(readImageShape(os.path.join(dir_name, 'missing.png')))
+        # RGBA, but every pixel is gray; only a decode can tell.
+        self.assertEqual(readImageShape(os.path.join(dir_name, '..', 'icons', 'zoom.png')), [24, 24, 3])
+
+    def test_cache_stamp(self):
+        import shutil
+        import struct
+        import tempfile
+        from imageSize import readImageShape
+        if sys.version_info < (3, 3):
+            self.skipTest('os.utime takes nanoseconds from Python 3.3')
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'a.bmp')
+            with open(os.path.join(dir_name, 'test.bmp'), 'rb') as f:
+                data = f.read()
+            with open(path, 'wb') as f:
+                f.write(data)
+            stamp = 1500000000123456789
+            os.utime(path, ns=(stamp, stamp))
+            self.assertEqual(readImageShape(path), [512, 512, 3])
+            # Same size, and an mtime equal as a float.
+            with open(path, 'wb') as f:
+                f.write(data[:22] + struct.pack('<i', 256) + data[26:])
+            os.utime(path, ns=(stamp + 1, stamp + 1))
+            self.assertEqual(readImageShape(path), [256, 512, 3])
+        finally:
+            shutil.rmtree(tmp)
+
+
+class TestImageCache(TestCase):
+
+    def test_budget_and_stamp(self):
+        from imageCache import ImageCache, fileStamp
+        path = os.path.join(dir_name, 'test.bmp')
+        cache = ImageCache(maxBytes=100)
+        cache.put('a', 'A', 60, fileStamp(path))
+        cache.put(path, 'B', 60, fileStamp(path))
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.get(path), 'B')
+        cache.put(path, 'C', 60, (0, 0))
+        self.assertIsNone(cache.get(path))
+        self.assertEqual(cache.totalBytes, 0)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_farthest(self):
+        from imageCache import ImageCache, fileStamp
+        stamp = fileStamp(os.path.join(dir_name, 'test.bmp'))
+        cache = ImageCache(maxBytes=100)
+        cache.currentIndex = 5
+        cache.put('near', 1, 40, stamp, 6)
+        cache.put('far', 2, 40, stamp, 0)
+        cache.put('next', 3, 40, stamp, 4)
+        self.assertEqual(sorted(cache._entries), ['near', 'next'])
+
+
+class TestDirScanner(TestCase):
+
+    def test_order_and_cache(self):
+        from dirScanner import iterImages
+        root = os.path.join(dir_name, '..')
+        expected = []
+        for dirpath, dirs, files in os.walk(root):
+            for name in files:
+                if name.lower().endswith(('.jpeg', '.jpg', '.png', '.bmp')):
+                    expected.append(os.path.abspath(os.path.join(dirpath, name)))
+        expected.sort(key=lambda x: x.lower())
+        cache = {}
+        self.assertEqual(list(iterImages(root, cache)), expected)
+        self.assertIn(os.path.abspath(dir_name), cache)
+        self.assertEqual(list(iterImages(root, cache)), expected)
+
+
+class TestImageList(TestCase):
+
+    def test_order_and_lookup(self):
+        from imageList import ImageList
+        names = ['b.jpg', 'A.png', 'c.bmp', 'a2.jpg']
+        names.sort(key=lambda x: x.lower())
+        images = ImageList(names[:2])
+        self.assertEqual(images.extend(names + ['A.png']), 2)
+        self.assertEqual(list(images), ['A.png', 'a2.jpg', 'b.jpg', 'c.bmp'])
+        self.assertEqual(images.index('b.jpg'), 2)
+        self.assertIsNone(images.get('d.jpg'))
+        self.assertRaises(ValueError, images.index, 'd.jpg')
+
+        self.assertEqual(images.next(), 'A.png')
+        images.setCurrent('b.jpg')
+        self.assertEqual((images.prev(), images.next()), ('a2.jpg', 'c.bmp'))
+        self.assertEqual(images.current(), 'b.jpg')
+        self.assertIsNone(images.setCurrent('d.jpg'))
+        self.assertIsNone(images.prev())
+        self.assertNotIn('d.jpg', images)
+
+
+class TestFileListModel(TestCase):
+
+    def test_rows_and_filter(self):
+        from fileListModel import FileListModel
+        from imageList import ImageList
+        paths = ['/data/frame_%02d.jpg' % n for n in range(20)]
+        model = FileListModel()
+        model.setImageList(ImageList(paths))
+        self.assertEqual(model.rowCount(), 20)
+        index = model.index(3)
+        self.assertEqual(model.data(index), 'frame_03.jpg')
+        self.assertEqual(model.data(index, FileListModel.PathRole), paths[3])
+
+        model.setFilterText(' FRAME_1')
+        self.assertEqual(model.rowCount(), 10)
+        self.assertEqual(model.data(model.index(0)), 'frame_10.jpg')
+        self.assertEqual(model.rowForPath(paths[12]), 2)
+        self.assertIsNone(model.rowForPath(paths[3]))
+        model.appendPaths(['/data/frame_1x.jpg', '/data/other.jpg', paths[0]])
+        self.assertEqual(model.rowCount(), 11)
+        self.assertEqual(model.pathAt(10), '/data/frame_1x.jpg')
+
+        model.setFilterText('')
+        self.assertEqual(model.rowCount(), 22)
+        self.assertEqual(model.pathAt(21), '/data/other.jpg')
+
+
+class TestDatasetIndex(TestCase):
+
+    def test_refresh_and_query(self):
+        import shutil
+        import tempfile
+        from datasetIndex import DatasetIndex, STATUS_NONE, STATUS_ANNOTATED, STATUS_VERIFIED
+        tmp = tempfile.mkdtemp()
+        try:
+            demo = os.path.join(dir_name, '..', 'demo')
+            image = os.path.abspath(os.path.join(demo, 'demo3.jpg'))
+            xml = os.path.abspath(os.path.join(demo, 'demo3.xml'))
+            index = DatasetIndex(os.path.join(tmp, 'index.sqlite'))
+            items = [(image, xml), (image + '.png', None)]
+            self.assertEqual(sum(len(c) for c in index.refresh(items)), 2)
+            self.assertEqual(list(index.refresh(items)), [])
+            self.assertEqual(index.status(image), STATUS_VERIFIED)
+            self.assertEqual(index.status(image + '.png'), STATUS_NONE)
+            self.assertIsNone(index.status(image, os.path.join(tmp, 'x.xml')))
+            self.assertEqual(index.paths(label='dog'), set([image]))
+            record = index.record(image)
+            self.assertEqual((record['width'], record['height']), (799, 401))
+            self.assertEqual(record['objects'], sum(record['labels'].values()))
+            # Known contents are taken as given; the file is not read.
+            index.update(image, xml, contents=(False, {'cat': 2}))
+            self.assertEqual(index.status(image), STATUS_ANNOTATED)
+            self.assertEqual(index.record(image)['labels'], {'cat': 2})
+            self.assertEqual(index.record(image)['objects'], 2)
+            index.close()
+        finally:
+            shutil.rmtree(tmp)
+
+
+class TestSpatialGrid(TestCase):
+
+    def test_matches_scan(self):
+        import random
+        from spatialIndex import SpatialGrid
+        rng = random.Random(0)
+        grid = SpatialGrid(cellSize=32, maxCells=16)
+        rects = {}
+        for item in range(300):
+            x, y = rng.uniform(0, 1000), rng.uniform(0, 1000)
+            rects[item] = (x, y, x + rng.uniform(1, 300), y + rng.uniform(1, 300))
+            grid.insert(item, rects[item])
+        for item in range(0, 300, 3):
+            grid.remove(item)
+            del rects[item]
+        grid.update(1, (0, 0, 5, 5))
+        rects[1] = (0, 0, 5, 5)
+        for _ in range(200):
+            x, y = rng.uniform(0, 1200), rng.uniform(0, 1200)
+            expected = [i for i in sorted(rects, reverse=True)
+                        if rects[i][0] - 4 <= x <= rects[i][2] + 4 and
+                        rects[i][1] - 4 <= y <= rects[i][3] + 4]
+            self.assertEqual(grid.query(x, y, 4), expected)
+        for _ in range(50):
+            x, y = rng.uniform(0, 1000), rng.uniform(0, 1000)
+            w, h = rng.uniform(0, 600), rng.uniform(0, 600)
+            expected = [i for i in sorted(rects)
+                        if rects[i][0] <= x + w and x <= rects[i][2] and
+                        rects[i][1] <= y + h and y <= rects[i][3]]
+            self.assertEqual(grid.queryRect(x, y, x + w, y + h), expected)
+
+
+class TestShapeGeometry(TestCase):
+
+    def test_cache_follows_edits(self):
+        from PyQt5.QtCore import QPointF
+        from shape import Shape
+        shape = Shape('box')
+        for x, y in ((0, 0), (10, 0), (10, 10), (0, 10)):
+            shape.addPoint(QPointF(x, y))
+        shape.close()
+        self.assertTrue(shape.containsPoint(QPointF(5, 5)))
+        self.assertIs(shape.boundingRect(), shape.boundingRect())
+        shape.moveBy(QPointF(20, 0))
+        self.assertFalse(shape.containsPoint(QPointF(5, 5)))
+        self.assertEqual(shape.boundingRect().left(), 20)
+        shape[2] = QPointF(40, 40)
+        self.assertEqual(shape.boundingRect().bottom(), 40)
+        shape.points = [QPointF(0, 0), QPointF(1, 0), QPointF(1, 1), QPointF(0, 1)]
+        self.assertEqual(shape.boundingRect().right(), 1)
+
+
+class TestTileCache(TestCase):
+
+    def test_byte_budget(self):
+        from PyQt5.QtGui import QImage
+        from tiledImage import TileCache
+        tile = QImage(64, 64, QImage.Format_RGB32)
+        cache = TileCache(maxBytes=3 * 64 * 64 * 4)
+        for key in range(3):
+            cache.put(key, tile)
+        cache.get(0)
+        cache.put(3, tile)
+        self.assertEqual(len(cache), 3)
+        self.assertIsNone(cache.get(1))
+        self.assertIs(cache.get(0), tile)
+        self.assertEqual(cache.totalBytes, 3 * 64 * 64 * 4)
+
+
+class TestShapeStore(TestCase):
+
+    def test_round_trip(self):
+        from shapeStore import ShapeStore
+        writer = PascalVocWriter('tests', 'test', (512, 512, 1), localImgPath='tests/test.bmp')
+        writer.addBndBox(60, 40, 430, 504, 'person', 1)
+        writer.addRotatedBndBox(200.5, 180.25, 80.0, 40.0, 0.5236, 'car', 0)
+        writer.save('tests/test.xml')
+        expected = open('tests/test.xml', 'rb').read()
+
+        reader = PascalVocReader('tests/test.xml', streaming=True)
+        store = reader.getStore()
+        self.assertEqual(list(store.tuples()), PascalVocReader('tests/test.xml').getShapes())
+        self.assertEqual(store.labelCounts(), {'person': 1, 'car': 1})
+
+        writer = PascalVocWriter('tests', 'test', (512, 512, 1), localImgPath='tests/test.bmp')
+        writer.addStore(store)
+        self.assertEqual(writer.toXML(), expected)
+
+        # Canvas shapes built from the store save back to the same file.
+        from PyQt5.QtCore import QPointF
+        from shape import Shape
+        shapes = []
+        for i in range(len(store)):
+            shape = Shape(label=store.label(i), difficult=store.isDifficult(i))
+            shape.points = [QPointF(x, y) for x, y in store.corners(i)]
+            shape.isRotated = store.isRotated(i)
+            shape.direction = store.angle[i] if shape.isRotated else 0
+            shape.close()
+            shapes.append(shape)
+        writer = PascalVocWriter('tests', 'test', (512, 512, 1), localImgPath='tests/test.bmp')
+        writer.addStore(ShapeStore.fromShapes(shapes))
+        self.assertEqual(writer.toXML(), expected)
+
+
+class TestBoxGeometry(TestCase):
+
+    def randomBoxes(self, count=500):
+        import math
+        import random
+        rng = random.Random(0)
+        return [(rng.uniform(-1000, 1000), rng.uniform(-1000, 1000),
+                 rng.uniform(0.5, 300), rng.uniform(0.5, 300),
+                 rng.uniform(0, math.pi)) for _ in range(count)]
+
+    def test_round_trip(self):
+        import math
+        import boxGeometry as geo
+        for box in self.randomBoxes():
+            corners = geo.boxCorners(*box)
+            back = geo.cornersToBox(corners)
+            for a, b in zip(box[:4], back[:4]):
+                self.assertAlmostEqual(a, b, places=6)
+            # Angles just below pi come back just above 0.
+            delta = abs(box[4] - back[4])
+            self.assertAlmostEqual(min(delta, math.pi - delta), 0, places=6)
+            for a, b in zip(geo.boxEnvelope(*box), geo.envelope(corners)):
+                self.assertAlmostEqual(a, b, places=6)
+            self.assertTrue(geo.pointInBox(box[0], box[1], *box))
+            (ax, ay), (cx, cy) = corners[0], corners[2]
+            # Just inside and just outside the first corner.
+            self.assertTrue(geo.pointInBox(ax + (cx - ax) * 0.01, ay + (cy - ay) * 0.01, *box))
+            self.assertFalse(geo.pointInBox(ax - (cx - ax) * 0.01, ay - (cy - ay) * 0.01, *box))
+
+    def test_arrays_match_scalars(self):
+        import boxGeometry as geo
+        if geo.loadNumpy() is None:
+            self.skipTest('numpy is not installed')
+        import numpy
+        boxes = self.randomBoxes()
+        columns = numpy.array(boxes).T
+        corners = geo.boxCornersArray(*columns)
+        numpy.testing.assert_allclose(corners, [geo.boxCorners(*b) for b in boxes], atol=1e-9)
+        numpy.testing.assert_allclose(numpy.array(geo.cornersToBoxArray(corners))[:4],
+                                      columns[:4], atol=1e-6)
+        numpy.testing.assert_allclose(geo.boxEnvelopeArray(*columns),
+                                      [geo.boxEnvelope(*b) for b in boxes], atol=1e-9)
+        inside = geo.pointInBoxArray(columns[0] + 1, columns[1], *columns)
+        self.assertEqual(inside.tolist(), [geo.pointInBox(b[0] + 1, b[1], *b) for b in boxes])
+
+
+class TestBatchLoader(TestCase):
+
+    def test_columns_and_metadata(self):
+        import shutil
+        import tempfile
+        from batchLoader import loadAnnotations
+        folder = tempfile.mkdtemp()
+        try:
+            writer = PascalVocWriter('imgs', 'a', (300, 400, 3), localImgPath='imgs/a.png')
+            writer.addBndBox(10, 20, 30, 40, 'person', 1)
+            writer.addRotatedBndBox(200.5, 180.25, 80.0, 40.0, 0.5236, 'car', 0)
+            writer.save(os.path.join(folder, 'a.xml'))
+            writer = PascalVocWriter('imgs', 'b', (30, 40, 1), localImgPath='imgs/b.png')
+            writer.verified = True
+            writer.addBndBox(1, 2, 3, 4, 'car', 0)
+            writer.save(os.path.join(folder, 'b.xml'))
+            with open(os.path.join(folder, 'broken.xml'), 'w') as f:
+                f.write('<annotation>')
+
+            batch = loadAnnotations(folder, processes=1)
+            self.assertEqual(len(batch), 3)
+            self.assertEqual([info['filename'] for info in batch.images], ['a', 'b'])
+            self.assertEqual(batch.images[1]['width'], 40)
+            self.assertTrue(batch.images[1]['verified'])
+            self.assertEqual(list(batch.imageId), [0, 0, 1])
+            self.assertEqual([batch.labels[i] for i in batch.labelId], ['person', 'car', 'car'])
+            self.assertEqual(list(batch.cx), [20.0, 200.5, 2.0])
+            self.assertEqual(list(batch.difficult), [1, 0, 0])
+            self.assertEqual(list(batch.rotated), [0, 1, 0])
+            self.assertEqual(len(batch.errors), 1)
+            self.assertEqual(len(loadAnnotations(folder, processes=2)), 3)
+        finally:
+            shutil.rmtree(folder)
+
+    def test_headless_import(self):
+        import subprocess
+        out = subprocess.check_output([
+            sys.executable, '-c',
+            'import sys; sys.path.insert(0, %r); '
+            'import batchLoader, datasetIndex, editJournal, labelFile; '
+            'sys.stderr.write(str(sorted(m for m in sys.modules if "Qt" in m)))' % libs_path],
+            stderr=subprocess.STDOUT)
+        self.assertEqual(out, b'[]')
+
+
+class TestTracing(TestCase):
+
+    def tearDown(self):
+        import tracing
+        tracing.enable(False)
+        tracing.clear()
+
+    def test_disabled_records_nothing(self):
+        import tracing
+        with tracing.span('a'):
+            tracing.count('b')
+        self.assertEqual(tracing.summary(), ([], {}))
+
+    def test_spans_counters_and_chrome_trace(self):
+        import tracing
+        tracing.enable()
+        for _ in range(2):
+            with tracing.span('a'):
+                tracing.count('b', 3)
+        spans, counters = tracing.summary()
+        self.assertEqual([(name, calls) for name, calls, total, longest in spans], [('a', 2)])
+        self.assertEqual(counters, {'b': 6})
+        events = tracing.chromeTrace()['traceEvents']
+        self.assertEqual([event['ph'] for event in events], ['C', 'X', 'C', 'X'])
+        self.assertEqual(events[2]['args'], {'b': 6})
+        self.assertTrue(events[1]['dur'] >= 0 and events[3]['ts'] >= events[1]['ts'])
+
+
+class TestAtomicWrite(TestCase):
+
+    def test_replace_keeps_mode_and_leaves_no_temp(self):
+        import shutil
+        import tempfile
+        from pascal_voc_io import writeFileAtomic
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, 'a.xml')
+            writeFileAtomic(path, b'old')
+            os.chmod(path, 0o640)
+            writeFileAtomic(path, b'new')
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'new')
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+            self.assertRaises(TypeError, writeFileAtomic, path, object())
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'new')
+            self.assertEqual(os.listdir(folder), ['a.xml'])
+        finally:
+            shutil.rmtree(folder)
+
+
+class TestEditJournal(TestCase):
+
+    def test_replay_window_and_truncate(self):
+        import shutil
+        import tempfile
+        from editJournal import EditJournal, pendingEdits, truncateJournal
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, 'a.journal')
+            journal = EditJournal(path)
+            journal.append(['b', 'old', 2])
+            journal.append(['m', 0, 0, [1, 1, 2, 1, 2, 2, 1, 2]], ('m', 0))
+            journal.append(['m', 0, 0, [3, 3, 4, 3, 4, 4, 3, 4]], ('m', 0))
+            journal.append(['b', 'new', 2])
+            journal.append(['d', 1])
+            journal.flush()
+            with open(path, 'a') as f:
+                f.write('["l",0,"ca')
+            self.assertEqual(pendingEdits(path, 'old', 2),
+                             [['m', 0, 0, [3, 3, 4, 3, 4, 4, 3, 4]], ['d', 1]])
+            self.assertEqual(pendingEdits(path, 'new', 2), [['d', 1]])
+            self.assertEqual(pendingEdits(path, 'new', 3), [])
+            self.assertEqual(pendingEdits(path, 'other', 2), [])
+            truncateJournal(path)
+            self.assertEqual(pendingEdits(path, 'old', 2), [])
+            self.assertEqual(pendingEdits(path, 'new', 2), [['d', 1]])
+            journal = EditJournal(path)
+            journal.append(['b', 'newer', 1])
+            journal.flush()
+            truncateJournal(path)
+            self.assertFalse(os.path.exists(path))
+        finally:
+            shutil.rmtree(folder)
+
+
+class TestEditRecovery(TestCase):
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        from PyQt5.QtWidgets import QApplication
+        self.app = QApplication.instance() or QApplication([])
+        self.folder = tempfile.mkdtemp()
+        self.home = os.environ.get('HOME')
+        os.environ['HOME'] = self.folder
+        self.imagePath = os.path.join(self.folder, 'test.bmp')
+        shutil.copy(os.path.join(dir_name, 'test.bmp'), self.imagePath)
+        writer = PascalVocWriter(self.folder, 'test', (512, 512, 3), localImgPath=self.imagePath)
+        writer.addBndBox(60, 40, 200, 150, 'person', 0)
+        writer.addRotatedBndBox(300.0, 300.0, 120.0, 60.0, 0.5, 'car', 0)
+        writer.save(os.path.join(self.folder, 'test.xml'))
+
+    def tearDown(self):
+        import shutil
+        if self.home is None:
+            del os.environ['HOME']
+        else:
+            os.environ['HOME'] = self.home
+        shutil.rmtree(self.folder)
+
+    def openWindow(self):
+        sys.path.insert(0, os.path.join(dir_name, '..'))
+        import roLabelImg
+        win = roLabelImg.MainWindow(None, os.path.join(self.folder, 'classes.txt'))
+        win.recoverEditsDialog = lambda count: True
+        self.app.processEvents()
+        win.loadFile(self.imagePath)
+        return win
+
+    def closeWindow(self, win):
+        win.dirty = False
+        win.close()
+        win.deleteLater()
+        self.app.processEvents()
+
+    def shapeStates(self, win):
+        return [(s.label, s.isRotated, round(s.direction, 6),
+                 [(round(p.x(), 3), round(p.y(), 3)) for p in s.points])
+                for s in win.canvas.shapes]
+
+    def test_canvas_edits_are_recovered(self):
+        from PyQt5.QtCore import Qt
+        from PyQt5.QtGui import QKeyEvent
+        from PyQt5.QtCore import QEvent
+        win = self.openWindow()
+        canvas = win.canvas
+        box, rotated = canvas.shapes
+        canvas.selectShape(rotated)
+        canvas.keyPressEvent(QKeyEvent(QEvent.KeyPress, Qt.Key_Z, Qt.NoModifier))
+        # Arrow keys move the selected shape even with another one's vertex
+        # under the mouse.
+        canvas.selectShape(box)
+        canvas.hShape, canvas.hVertex = rotated, 0
+        canvas.keyPressEvent(QKeyEvent(QEvent.KeyPress, Qt.Key_Right, Qt.NoModifier))
+        canvas.keyPressEvent(QKeyEvent(QEvent.KeyPress, Qt.Key_Right, Qt.NoModifier))
+        self.assertEqual(box.points[0].x(), 62)
+        self.assertNotAlmostEqual(rotated.direction, 0.5)
+        edited = self.shapeStates(win)
+        win.flushJournal()
+        # No save and no close: the next window finds the journal as a
+        # crash would leave it.
+        recovered = self.openWindow()
+        self.assertEqual(self.shapeStates(recovered), edited)
+        self.assertTrue(recovered.dirty)
+        self.closeWindow(recovered)
+        self.closeWindow(win)
+
+    def test_reload_while_saving(self):
+        import threading
+        from PyQt5.QtCore import Qt
+        from PyQt5.QtGui import QKeyEvent
+        from PyQt5.QtCore import QEvent
+        win = self.openWindow()
+        xmlPath = os.path.join(self.folder, 'test.xml')
+        with open(xmlPath, 'rb') as f:
+            before = f.read()
+        release = threading.Event()
+        win.annotationSaver.pool.start(release.wait)
+        try:
+            win.canvas.selectShape(win.canvas.shapes[0])
+            win.canvas.keyPressEvent(QKeyEvent(QEvent.KeyPress, Qt.Key_Right, Qt.NoModifier))
+            edited = self.shapeStates(win)
+            win._saveFile(xmlPath)
+            # Reopened from the queued save, without waiting for the disk.
+            win.loadFile(self.imagePath)
+            self.assertEqual(self.shapeStates(win), edited)
+            self.assertFalse(win.dirty)
+            with open(xmlPath, 'rb') as f:
+                self.assertEqual(f.read(), before)
+        finally:
+            release.set()
+        win.annotationSaver.waitForDone()
+        self.closeWindow(win)
+
+
+class TestSaveDepth(TestCase):
+
+    def test_gray_pixels_saved_as_depth_1(self):
+        import shutil
+        import tempfile
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication([])
+        folder = tempfile.mkdtemp()
+        home = os.environ.get('HOME')
+        os.environ['HOME'] = folder
+        try:
+            sys.path.insert(0, os.path.join(dir_name, '..'))
+            import roLabelImg
+            imagePath = os.path.join(folder, 'zoom.png')
+            shutil.copy(os.path.join(dir_name, '..', 'icons', 'zoom.png'), imagePath)
+            win = roLabelImg.MainWindow(None, os.path.join(folder, 'classes.txt'))
+            app.processEvents()
+            win.loadFile(imagePath)
+            xmlPath = os.path.join(folder, 'zoom.xml')
+            win._saveFile(xmlPath)
+            win.annotationSaver.waitForDone()
+            app.processEvents()
+            with open(xmlPath, 'rb') as f:
+                self.assertIn(b'<depth>1</depth>', f.read())
+            win.close()
+            win.deleteLater()
+            app.processEvents()
+        finally:
+            if home is None:
+                del os.environ['HOME']
+            else:
+                os.environ['HOME'] = home
+            shutil.rmtree(folder)
+
+
+class TestAnnotationSaver(TestCase):
+
+    def test_coalesces_and_reports(self):
+        import shutil
+        import tempfile
+        import threading
+        from PyQt5.QtCore import QCoreApplication
+        from annotationSaver import AnnotationSaver
+        app = QCoreApplication.instance() or QCoreApplication([])
+        folder = tempfile.mkdtemp()
+        try:
+            saver = AnnotationSaver()
+            saved, failed = [], []
+            saver.saved.connect(saved.append)
+            saver.saveFailed.connect(lambda path, message: failed.append(path))
+            path = os.path.join(folder, 'a.xml')
+            # Keep the single worker busy so both saves queue up behind it.
+            release = threading.Event()
+            saver.pool.start(release.wait)
+            saver.save(path, b'first')
+            saver.save(path, b'second')
+            self.assertTrue(saver.isSaving(path))
+            release.set()
+            saver.waitForDone()
+            app.processEvents()
+            self.assertFalse(saver.isSaving(path))
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'second')
+            # One write for both saves.
+            self.assertEqual(saved, [path])
+
+            missing = os.path.join(folder, 'missing', 'b.xml')
+            saver.save(missing, b'data')
+            saver.waitForDone()
+            app.processEvents()
+            self.assertEqual(failed, [missing])
+            self.assertFalse(os.path.exists(missing))
+
+            # Not an IOError, but still reported and the path freed.
+            saver.save(path, u'text')
+            saver.waitForDone()
+            app.processEvents()
+            self.assertEqual(failed, [missing, path])
+            self.assertFalse(saver.isSaving(path))
+        finally:
+            shutil.rmtree(folder)